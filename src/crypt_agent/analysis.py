@@ -0,0 +1,70 @@
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from crypt_agent.metrics import in_context, instrumented
+
+# Matches linear USDT symbols such as BTCUSDT, 1000PEPEUSDT, "SOL/USDT" or "SOL-USDT"
+SYMBOL_PATTERN = re.compile(r"\b([A-Z0-9]{2,})[/\-]?USDT\b")
+
+# Maximum number of per-symbol analyst sub-crews running at once in parallel mode
+ANALYSIS_WORKERS = int(os.getenv("CRYPT_AGENT_ANALYSIS_WORKERS", "5"))
+
+# Heading of the analysis block appended to the strategist task
+ANALYSIS_MARKER = "\n\nTECHNICAL ANALYSIS OF THE RESEARCHED COINS (RSI 14, MACD 12/26/9, 15m candles):\n"
+
+
+def analysis_mode() -> str:
+    """
+    How the technical analysis step runs:
+        python:   indicators are computed in plain Python right after research_task
+                  and handed to the strategist, no analyst LLM call (default)
+        parallel: one analyst sub-crew per researched symbol, run concurrently,
+                  with the merged results handed to the strategist
+        agent:    the analyst agent runs analysis_task with its tools
+    """
+    return os.getenv("CRYPT_AGENT_ANALYSIS_MODE", "python").lower()
+
+
+def extract_symbols(text: str, limit: int = None) -> list:
+    """Returns the distinct USDT symbols mentioned in `text`, in order of appearance."""
+    symbols = []
+    for match in SYMBOL_PATTERN.finditer(text or ""):
+        symbol = f"{match.group(1)}USDT"
+        if symbol not in symbols:
+            symbols.append(symbol)
+    return symbols[:limit] if limit else symbols
+
+
+@instrumented("compute_analysis")
+def compute_analysis(symbols: list, intervals: list = None) -> list:
+    """Computes RSI/MACD for the watchlist deterministically (no LLM involved)."""
+    from crypt_agent.tools.custom_tool import batch_indicators
+
+    if not symbols:
+        return []
+    return [result.model_dump(exclude_none=True) for result in batch_indicators(symbols, intervals or ["15"])]
+
+
+def fan_out(symbols: list, analyze, workers: int = None) -> list:
+    """Runs `analyze(symbol)` for every symbol on a worker pool and merges the
+    results in watchlist order, so the step takes as long as the slowest symbol."""
+    if not symbols:
+        return []
+
+    def run(symbol):
+        try:
+            return {"symbol": symbol, "analysis": analyze(symbol), "status": "success"}
+        except Exception as e:
+            return {"symbol": symbol, "status": "error", "message": str(e)}
+
+    with ThreadPoolExecutor(max_workers=min(workers or ANALYSIS_WORKERS, len(symbols))) as pool:
+        return list(pool.map(in_context(run), symbols))
+
+
+def inject_analysis(task, results: list):
+    """Appends the indicator results to a task description, replacing the
+    block left there by a previous cycle."""
+    description = task.description.split(ANALYSIS_MARKER)[0]
+    task.description = description + ANALYSIS_MARKER + json.dumps(results, separators=(",", ":"))
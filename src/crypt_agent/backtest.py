@@ -0,0 +1,335 @@
+"""
+Offline backtester for the RSI/MACD strategy the strategist applies to
+calculate_technical_indicators.
+
+History is backfilled once into a separate on-disk KlineStore and replayed
+locally. Symbols are processed in chunks: every chunk is aligned on one time
+grid and its indicators, positions and fills are computed as 2-D arrays
+(symbols x candles), so months of 1-minute candles for hundreds of symbols
+fit in memory and run in minutes.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from crypt_agent.tools.indicators import macd, rsi
+from crypt_agent.tools.kline_store import INTERVAL_MINUTES, KlineStore, interval_ms
+from crypt_agent.tools.rate_limit import history_rate_limiter
+
+# Backtest history lives apart from the live kline store and is not trimmed to a few thousand rows
+history_store = KlineStore(
+    root=os.getenv("CRYPT_AGENT_HISTORY_DIR", os.path.join(".cache", "history")),
+    max_rows=int(os.getenv("CRYPT_AGENT_HISTORY_MAX_ROWS", "1000000")),
+    keep_frames=False,
+)
+
+# Maximum number of symbols backfilled at once
+HISTORY_WORKERS = int(os.getenv("CRYPT_AGENT_HISTORY_WORKERS", "8"))
+
+
+@dataclass
+class StrategyParams:
+    """
+    Indicator settings, entry/exit rules and execution costs.
+
+    A long is opened when RSI is below `rsi_buy` and the MACD histogram turns
+    up, and closed when RSI rises above `rsi_sell` or MACD crosses below its
+    signal line. Shorts (if allowed) mirror this. Orders fill at the next
+    candle's open; `fee` (Bybit taker fee) and `slippage_bps` are paid on
+    every change of position.
+    """
+
+    rsi_window: int = 14
+    macd_fast: int = 12
+    macd_slow: int = 26
+    macd_signal: int = 9
+    rsi_buy: float = 30.0
+    rsi_sell: float = 70.0
+    allow_short: bool = False
+    fee: float = 0.00055
+    slippage_bps: float = 2.0
+
+
+def load_history(symbols: list, interval: str, start: int, end: int, session=None, workers: int = None) -> dict:
+    """Returns symbol -> candle rows in [start, end], backfilling the history
+    store through `session` first (or reading it as is when session is None)."""
+
+    def load(symbol):
+        try:
+            if session is None:
+                rows = history_store.load(symbol, interval)
+                return rows[(rows[:, 0] >= start) & (rows[:, 0] <= end)]
+            return history_store.backfill(session, symbol, interval, start, end, limiter=history_rate_limiter)
+        except Exception as e:
+            print(f"Skipping {symbol}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers or HISTORY_WORKERS, len(symbols)))) as pool:
+        return {symbol: rows for symbol, rows in zip(symbols, pool.map(load, symbols)) if rows is not None and len(rows)}
+
+
+def align(rows_list: list, start: int, bars: int, interval: str):
+    """Places candle rows on a common grid of `bars` candles from `start`.
+    Returns (open, close) arrays of shape (symbols, bars), NaN where a symbol
+    has no candle."""
+    step = interval_ms(interval)
+    open_ = np.full((len(rows_list), bars), np.nan)
+    close = np.full((len(rows_list), bars), np.nan)
+    for i, rows in enumerate(rows_list):
+        index = ((rows[:, 0] - start) // step).astype(np.int64)
+        valid = (index >= 0) & (index < bars)
+        open_[i, index[valid]] = rows[valid, 1]
+        close[i, index[valid]] = rows[valid, 4]
+    return open_, close
+
+
+def _hold(events: np.ndarray) -> np.ndarray:
+    """Forward-fills the last event along each row (NaN = no event); 0 before the first one."""
+    index = np.where(np.isnan(events), 0, np.arange(events.shape[1]))
+    np.maximum.accumulate(index, axis=1, out=index)
+    return np.nan_to_num(events[np.arange(len(events))[:, None], index])
+
+
+def strategy_indicators(close: np.ndarray, params: StrategyParams):
+    """(RSI, MACD histogram) arrays the entry/exit rules are evaluated on."""
+    rsi_values = rsi(close, params.rsi_window)
+    _, _, histogram = macd(close, params.macd_fast, params.macd_slow, params.macd_signal)
+    return rsi_values, histogram
+
+
+def target_positions(close: np.ndarray, params: StrategyParams, indicators=None) -> np.ndarray:
+    """Position (1 long, -1 short, 0 flat) wanted at the close of every candle.
+    `indicators` reuses strategy_indicators output computed with the same settings."""
+    rsi_values, histogram = indicators if indicators is not None else strategy_indicators(close, params)
+    previous = np.concatenate([np.full((len(close), 1), np.nan), histogram[:, :-1]], axis=1)
+    with np.errstate(invalid="ignore"):
+        turns_up = histogram > previous
+        turns_down = histogram < previous
+        crosses_down = (histogram < 0) & (previous >= 0)
+        crosses_up = (histogram > 0) & (previous <= 0)
+        long_entry = (rsi_values < params.rsi_buy) & turns_up
+        long_exit = (rsi_values > params.rsi_sell) | crosses_down
+        position = _hold(np.where(long_entry, 1.0, np.where(long_exit, 0.0, np.nan)))
+        if params.allow_short:
+            short_entry = (rsi_values > params.rsi_sell) & turns_down
+            short_exit = (rsi_values < params.rsi_buy) | crosses_up
+            short = _hold(np.where(short_entry, 1.0, np.where(short_exit, 0.0, np.nan)))
+            position = np.where((position > 0) & (short > 0), 0.0, position - short)
+    # No position is opened on a candle that does not exist
+    return np.where(np.isnan(close), 0.0, position)
+
+
+def simulate(open_: np.ndarray, close: np.ndarray, target: np.ndarray, params: StrategyParams):
+    """
+    Fills every position change at the next candle's open.
+
+    Returns (net, held): the per-candle return on a fixed notional after fees
+    and slippage, and the position held during each candle.
+    """
+    held = np.zeros_like(target)
+    held[:, 1:] = target[:, :-1]
+    prev_held = np.zeros_like(held)
+    prev_held[:, 1:] = held[:, :-1]
+    prev_close = np.full_like(close, np.nan)
+    prev_close[:, 1:] = close[:, :-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # The gap from the previous close to this open belongs to the previous position
+        gross = np.nan_to_num(prev_held * (open_ / prev_close - 1)) + np.nan_to_num(held * (close / open_ - 1))
+    cost = np.abs(held - prev_held) * (params.fee + params.slippage_bps / 10_000)
+    return gross - cost, held
+
+
+def summarize(symbols: list, net: np.ndarray, held: np.ndarray, bars_per_year: float) -> list:
+    """Per-symbol total return, trade count, win rate, max drawdown, Sharpe and exposure."""
+    prev_held = np.zeros_like(held)
+    prev_held[:, 1:] = held[:, :-1]
+    entries = (held != 0) & (held != prev_held)
+    trade_id = np.cumsum(entries, axis=1)
+    # Every candle of a trade, including the exit candle that pays the closing cost
+    in_trade = (held != 0) | (prev_held != 0)
+    width = int(trade_id.max()) + 1 if trade_id.size else 1
+    flat_ids = (np.arange(len(net))[:, None] * width + trade_id)[in_trade]
+    trade_pnl = np.bincount(flat_ids, weights=net[in_trade], minlength=len(net) * width).reshape(len(net), width)
+    trades = entries.sum(axis=1)
+    wins = (trade_pnl[:, 1:] > 0).sum(axis=1)
+
+    equity = np.cumsum(net, axis=1)
+    drawdown = (np.maximum.accumulate(np.maximum(equity, 0), axis=1) - equity).max(axis=1)
+    std = net.std(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, net.mean(axis=1) / std * np.sqrt(bars_per_year), 0.0)
+
+    return [
+        {
+            "symbol": symbol,
+            "total_return": round(float(equity[i, -1]), 6),
+            "trades": int(trades[i]),
+            "win_rate": round(float(wins[i] / trades[i]), 4) if trades[i] else None,
+            "max_drawdown": round(float(drawdown[i]), 6),
+            "sharpe": round(float(sharpe[i]), 3),
+            "exposure": round(float((held[i] != 0).mean()), 4),
+        }
+        for i, symbol in enumerate(symbols)
+    ]
+
+
+def run_backtest(symbols: list, interval: str = "1", days: float = 30, params: StrategyParams = None,
+                 chunk_size: int = 50, session=None, end: int = None) -> dict:
+    """
+    Backtests the strategy on every symbol over the last `days` days of closed
+    candles and returns the report (per-symbol results plus an equal-weight
+    portfolio of all symbols).
+    """
+    params = params or StrategyParams()
+    interval = str(interval)
+    step = interval_ms(interval)
+    # Only closed candles: the grid ends at the last fully closed candle
+    end = int(end if end is not None else time.time() * 1000) // step * step - step
+    bars = int(days * 86_400_000 // step)
+    start = end - (bars - 1) * step
+    bars_per_year = 525_600 / INTERVAL_MINUTES[interval]
+
+    started = time.perf_counter()
+    results = []
+    portfolio_sum = np.zeros(bars)
+    portfolio_count = np.zeros(bars)
+    for offset in range(0, len(symbols), chunk_size):
+        chunk = symbols[offset:offset + chunk_size]
+        history = load_history(chunk, interval, start, end, session=session)
+        if not history:
+            continue
+        names = list(history)
+        open_, close = align([history[name] for name in names], start, bars, interval)
+        del history
+
+        net, held = simulate(open_, close, target_positions(close, params), params)
+        results.extend(summarize(names, net, held, bars_per_year))
+
+        listed = ~np.isnan(close)
+        portfolio_sum += np.where(listed, net, 0.0).sum(axis=0)
+        portfolio_count += listed.sum(axis=0)
+        print(f"Backtested {offset + len(chunk)}/{len(symbols)} symbols")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        portfolio = np.where(portfolio_count > 0, portfolio_sum / portfolio_count, 0.0)
+    equity = np.cumsum(portfolio)
+    std = portfolio.std()
+    return {
+        "interval": interval,
+        "start": start,
+        "end": end,
+        "bars": bars,
+        "params": asdict(params),
+        "symbols": sorted(results, key=lambda r: r["total_return"], reverse=True),
+        "portfolio": {
+            "symbols": len(results),
+            "total_return": round(float(equity[-1]), 6) if bars else 0.0,
+            "max_drawdown": round(float((np.maximum.accumulate(np.maximum(equity, 0)) - equity).max()), 6) if bars else 0.0,
+            "sharpe": round(float(portfolio.mean() / std * np.sqrt(bars_per_year)), 3) if std > 0 else 0.0,
+            "trades": sum(r["trades"] for r in results),
+        },
+        "elapsed_s": round(time.perf_counter() - started, 2),
+    }
+
+
+def format_report(report: dict, rows: int = 10) -> str:
+    """Renders the portfolio line plus the best and worst symbols."""
+    p = report["portfolio"]
+    lines = [
+        f"Backtest {report['bars']} x {report['interval']}m candles, {p['symbols']} symbols, "
+        f"{report['elapsed_s']}s",
+        f"Portfolio: return {p['total_return']:+.2%}  max drawdown {p['max_drawdown']:.2%}  "
+        f"sharpe {p['sharpe']:.2f}  trades {p['trades']}",
+        f"{'symbol':<16} {'return':>9} {'trades':>7} {'win':>6} {'max dd':>8} {'sharpe':>7} {'exposure':>8}",
+    ]
+    shown = report["symbols"] if len(report["symbols"]) <= 2 * rows else report["symbols"][:rows] + report["symbols"][-rows:]
+    for r in shown:
+        win = f"{r['win_rate']:.0%}" if r["win_rate"] is not None else "-"
+        lines.append(
+            f"{r['symbol']:<16} {r['total_return']:>+9.2%} {r['trades']:>7} {win:>6} "
+            f"{r['max_drawdown']:>8.2%} {r['sharpe']:>7.2f} {r['exposure']:>8.1%}"
+        )
+    return "\n".join(lines)
+
+
+def liquid_symbols(session, top: int) -> list:
+    """The `top` trading USDT perpetuals by 24h turnover."""
+    from crypt_agent.tools.instruments import instrument_cache
+    from crypt_agent.tools.tickers import ticker_snapshot
+
+    tickers = ticker_snapshot.table(session, category="linear")
+    instruments = instrument_cache.all(session)
+    symbols = [
+        symbol for symbol, info in instruments.items()
+        if info.get('status') == "Trading"
+        and info.get('contractType', "LinearPerpetual") == "LinearPerpetual"
+        and info.get('quoteCoin', "USDT") == "USDT"
+        and symbol in tickers
+    ]
+    symbols.sort(key=lambda symbol: float(tickers[symbol].get('turnover24h') or 0), reverse=True)
+    return symbols[:top]
+
+
+def stored_symbols(interval: str) -> list:
+    """Every symbol with history of `interval` already in the history store."""
+    folder = os.path.join(history_store.root, "linear", str(interval))
+    if not os.path.isdir(folder):
+        return []
+    return sorted(name[:-4] for name in os.listdir(folder) if name.endswith(".npy"))
+
+
+def parser() -> argparse.ArgumentParser:
+    defaults = StrategyParams()
+    p = argparse.ArgumentParser(prog="backtest", description="Backtest the RSI/MACD strategy on Bybit history.")
+    p.add_argument("--symbols", help="comma-separated symbols (default: the --top most liquid USDT perpetuals)")
+    p.add_argument("--top", type=int, default=100)
+    p.add_argument("--interval", default="1")
+    p.add_argument("--days", type=float, default=30)
+    p.add_argument("--chunk-size", type=int, default=50)
+    p.add_argument("--offline", action="store_true", help="only use history already in the local store")
+    p.add_argument("--rsi-buy", type=float, default=defaults.rsi_buy)
+    p.add_argument("--rsi-sell", type=float, default=defaults.rsi_sell)
+    p.add_argument("--allow-short", action="store_true")
+    p.add_argument("--fee", type=float, default=defaults.fee)
+    p.add_argument("--slippage-bps", type=float, default=defaults.slippage_bps)
+    p.add_argument("--output", default=os.path.join("output", "backtests"))
+    return p
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    params = StrategyParams(
+        rsi_buy=args.rsi_buy,
+        rsi_sell=args.rsi_sell,
+        allow_short=args.allow_short,
+        fee=args.fee,
+        slippage_bps=args.slippage_bps,
+    )
+
+    session = None
+    if not args.offline:
+        from crypt_agent.tools.session import get_session
+
+        session = get_session()
+    if args.symbols:
+        symbols = [symbol.strip().upper() for symbol in args.symbols.split(",") if symbol.strip()]
+    elif session is not None:
+        symbols = liquid_symbols(session, args.top)
+    else:
+        # Offline without a list: every symbol already in the history store
+        symbols = stored_symbols(args.interval)
+
+    report = run_backtest(symbols, args.interval, args.days, params, args.chunk_size, session=session)
+    print(format_report(report))
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"backtest_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {path}")
+    return report
@@ -0,0 +1,306 @@
+"""
+Benchmarks of the tool hot paths and of a full crew cycle.
+
+Everything runs offline: the exchange is the local SimulatedExchange (with
+a configurable per-request latency) and the crew cycle uses scripted
+stand-in LLMs, so only our own code and the simulated I/O are timed. Each
+benchmark reports latency percentiles, throughput and the peak memory
+allocated by one run (tracemalloc). Reports are saved to output/benchmarks
+and compared with the previous report to catch regressions.
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import resource
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from crewai.llms.base_llm import BaseLLM
+
+# Watchlist the scripted researcher hands over, and the strategist trades
+WATCHLIST = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "XRPUSDT", "DOGEUSDT"]
+
+# Relative increase of the median latency reported as a regression
+REGRESSION_THRESHOLD = 0.25
+
+
+class ScriptedLLM(BaseLLM):
+    """
+    Stand-in LLM answering in crewAI's ReAct format: it calls the `actions`
+    (tool name, arguments) one per turn, then gives `final` as the answer.
+    """
+
+    def __init__(self, actions: list, final: str):
+        super().__init__(model="bench/scripted")
+        self.actions = actions
+        self.final = final
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        # Every tool result comes back as one more assistant message
+        turn = sum(1 for message in messages if isinstance(message, dict) and message.get("role") == "assistant")
+        if response_model is None and turn < len(self.actions):
+            tool, args = self.actions[turn]
+            return f"Thought: I should use {tool}.\nAction: {tool}\nAction Input: {json.dumps(args)}"
+        return f"Thought: I now know the final answer\nFinal Answer: {self.final}"
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def get_context_window_size(self) -> int:
+        return 1_000_000
+
+
+def scripted_llms(quantity: str = "0.001") -> dict:
+    """Scripts of every agent for one trading cycle over WATCHLIST."""
+    orders = [{"symbol": symbol, "side": "Buy", "quantity": quantity} for symbol in WATCHLIST[:2]]
+    return {
+        "researcher": ([("scan_market_momentum", {"top_n": 10, "interval": "15", "side": "long"}),
+                        ("fetch_ticker_prices", {"symbols": WATCHLIST, "category": "linear"})],
+                       "Watchlist: " + ", ".join(WATCHLIST)),
+        "analyst": ([("calculate_batch_indicators", {"symbols": WATCHLIST, "intervals": ["15"]})],
+                    "RSI and MACD computed."),
+        "strategist": ([("fetch_ticker_prices", {"symbols": WATCHLIST, "category": "linear"}),
+                        ("check_wallet_balance", {"coin": "USDT"})],
+                       json.dumps({"orders": [{"symbol": o["symbol"], "side": o["side"], "quantity": float(o["quantity"])}
+                                              for o in orders]})),
+        "trader": ([("execute_multiple_orders", {"orders": orders})],
+                   "Orders executed."),
+        "reporter": ([], "| coin | qty |\n|---|---|\n" + "\n".join(f"| {o['symbol']} | {o['quantity']} |" for o in orders)),
+    }
+
+
+def measure(fn, repeat: int, ops: int = 1, warmup: int = 1) -> dict:
+    """Runs `fn` `warmup` + `repeat` times and once more under tracemalloc.
+    `ops` is the number of operations (orders, symbols...) one run performs."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    ms = np.array(timings) * 1000
+    return {
+        "runs": repeat,
+        "ops": ops,
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p90_ms": round(float(np.percentile(ms, 90)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "ops_per_s": round(ops * repeat / max(float(np.sum(timings)), 1e-9), 2),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def _errors(result: str) -> int:
+    """Number of failed orders or results in a tool's JSON output."""
+    data = json.loads(result)
+    if data.get("status") == "error":
+        return 1
+    return sum(1 for item in data.get("orders", data.get("slices", data.get("results", []))) if item.get("status") == "error")
+
+
+def _benchmarks(exchange, args) -> dict:
+    """name -> (function, ops per run, default repeat). Tools are imported here,
+    after main() pointed their on-disk caches at a scratch directory."""
+    from crypt_agent.tools.custom_tool import (
+        advanced_sliced_executor,
+        batch_indicators,
+        calculate_technical_indicators,
+        execute_multiple_orders,
+        get_latest_klines,
+    )
+    from crypt_agent.tools.kline_store import parse_kline_list
+
+    raw = exchange.get_kline(category="linear", symbol="BTCUSDT", interval="1", limit=1000)["result"]["list"]
+    symbols = list(exchange.instruments)[:args.symbols]
+    orders = [{"symbol": "ETHUSDT", "side": "Buy", "quantity": "0.01"}] * args.orders
+    lot = exchange.instruments["ETHUSDT"]["lotSizeFilter"]
+    slices = 4
+    sliced_qty = float(lot["maxMktOrderQty"]) * (slices - 0.5)
+
+    def tool_run(tool, **kwargs):
+        def run():
+            result = tool.func(**kwargs)
+            errors = _errors(result)
+            if errors:
+                failures[0] += errors
+            return result
+        failures = [0]
+        run.failures = failures
+        return run
+
+    return {
+        "parse_klines": (lambda: parse_kline_list(raw), len(raw), 200),
+        "get_latest_klines": (tool_run(get_latest_klines, symbol="BTCUSDT", interval="15", mode="summary", points=0), 1, 50),
+        "technical_indicators": (tool_run(calculate_technical_indicators, symbol="ETHUSDT", interval="15", rsi_window=14,
+                                          macd_fast=12, macd_slow=26, macd_signal=9), 1, 50),
+        "batch_indicators": (lambda: batch_indicators(symbols, ["15"]), len(symbols), 10),
+        "order_fanout": (tool_run(execute_multiple_orders, orders=orders), len(orders), 5),
+        "sliced_execution": (tool_run(advanced_sliced_executor, symbol="ETHUSDT", side="Buy", total_qty=sliced_qty,
+                                      tp_price="", sl_price=""), slices, 3),
+        "crew_cycle": (_crew_cycle(), 1, 3),
+    }
+
+
+def _crew_cycle():
+    """One full kickoff of the crew with scripted LLMs; built on first use
+    because importing and assembling the crew dominates a short benchmark run."""
+    crew_base = crew = None
+
+    def run():
+        nonlocal crew_base, crew
+        from crypt_agent.crew import CryptAgent
+
+        scripts = scripted_llms()
+        with contextlib.redirect_stdout(io.StringIO()):
+            if crew is None:
+                crew_base = CryptAgent(llm_factory=lambda name, model: ScriptedLLM(*scripts[name]), cache=False)
+                crew = crew_base.crew()
+                # The agents' console panels would be timed along with the cycle
+                crew.verbose = False
+                for agent in crew.agents:
+                    agent.verbose = False
+            try:
+                crew.kickoff(inputs={"topic": "benchmark", "current_year": time.strftime("%Y")})
+            finally:
+                crew_base.end_cycle()
+
+    run.failures = [0]
+    return run
+
+
+def compare(report: dict, previous: dict, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """Benchmarks whose median latency grew by more than `threshold` since `previous`."""
+    regressions = []
+    for name, result in report["benchmarks"].items():
+        before = previous.get("benchmarks", {}).get(name)
+        if not before or not before.get("p50_ms"):
+            continue
+        change = result["p50_ms"] / before["p50_ms"] - 1
+        result["p50_change"] = round(change, 3)
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def latest_report(directory: str) -> dict:
+    paths = sorted(glob.glob(os.path.join(directory, "bench_*.json")))
+    if not paths:
+        return None
+    with open(paths[-1]) as f:
+        return json.load(f)
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"Benchmarks against the simulator ({report['config']['latency_ms']} ms latency), max RSS {report['max_rss_mib']} MiB",
+        f"{'benchmark':<22} {'runs':>5} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'ops/s':>10} {'peak KiB':>9} {'errors':>6} {'vs prev':>8}",
+    ]
+    for name, r in report["benchmarks"].items():
+        change = f"{r['p50_change']:>+8.0%}" if "p50_change" in r else f"{'-':>8}"
+        lines.append(
+            f"{name:<22} {r['runs']:>5} {r['p50_ms']:>9.2f} {r['p90_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+            f"{r['ops_per_s']:>10.1f} {r['peak_kib']:>9.1f} {r['errors']:>6} {change}"
+        )
+    if report.get("regressions"):
+        lines.append(f"Regressions (p50 > +{report['config']['threshold']:.0%}): {', '.join(report['regressions'])}")
+    return "\n".join(lines)
+
+
+def parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="bench", description="Benchmark the tool hot paths and a crew cycle offline.")
+    p.add_argument("--only", help="comma-separated benchmark names (default: all)")
+    p.add_argument("--repeat", type=int, default=None, help="runs per benchmark (default: per benchmark)")
+    p.add_argument("--latency-ms", type=float, default=5.0, help="simulated latency of every exchange request")
+    p.add_argument("--symbols", type=int, default=20, help="symbols in batch_indicators")
+    p.add_argument("--orders", type=int, default=10, help="orders in order_fanout")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    p.add_argument("--baseline", help="report to compare with (default: the latest in --output)")
+    p.add_argument("--output", default=os.path.join("output", "benchmarks"))
+    p.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on a regression")
+    return p
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    output = os.path.abspath(args.output)
+
+    # Keep the simulator's candles, LLM responses and crew outputs out of the real caches
+    workdir = tempfile.mkdtemp(prefix="crypt_agent_bench_")
+    os.environ["CRYPT_AGENT_KLINE_DIR"] = os.path.join(workdir, "klines")
+    os.environ["CRYPT_AGENT_MARKET_STREAM"] = "0"
+    os.environ["CRYPT_AGENT_LLM_CACHE"] = "0"
+    os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+    os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+    from crypt_agent.tools.session import set_session
+    from crypt_agent.tools.simulator import SimulatedExchange
+
+    # A frozen clock keeps the simulated market identical across runs
+    started_at = time.time()
+    exchange = SimulatedExchange(symbols=max(args.symbols, 50), seed=args.seed, latency=args.latency_ms / 1000,
+                                 balance=1e9, clock=lambda: started_at)
+    set_session(exchange)
+
+    benchmarks = _benchmarks(exchange, args)
+    names = [name.strip() for name in args.only.split(",")] if args.only else list(benchmarks)
+    unknown = sorted(set(names) - set(benchmarks))
+    if unknown:
+        raise SystemExit(f"Unknown benchmarks: {', '.join(unknown)} (expected {', '.join(benchmarks)})")
+
+    results = {}
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for name in names:
+            fn, ops, repeat = benchmarks[name]
+            print(f"Running {name}...")
+            failures = getattr(fn, "failures", [0])
+            results[name] = measure(fn, args.repeat or repeat, ops)
+            results[name]["errors"] = failures[0]
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"latency_ms": args.latency_ms, "symbols": args.symbols, "orders": args.orders,
+                   "seed": args.seed, "threshold": args.threshold},
+        "max_rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "exchange": exchange.stats,
+        "benchmarks": results,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            previous = json.load(f)
+    else:
+        previous = latest_report(output)
+    report["regressions"] = compare(report, previous, args.threshold) if previous else []
+    print(format_report(report))
+
+    os.makedirs(output, exist_ok=True)
+    path = os.path.join(output, f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {path}")
+    if args.fail_on_regression and report["regressions"]:
+        raise SystemExit(1)
+    return report
@@ -1,6 +1,9 @@
+import json
+import os
+import time
+
 from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, output_pydantic, task
-from crewai_tools import SerperDevTool
+from crewai.project import CrewBase, after_kickoff, agent, before_kickoff, crew, output_pydantic, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from typing import List
 
@@ -15,8 +18,20 @@ class TradeOrder(BaseModel):
 class TradeSignal(BaseModel):
     orders: List[TradeOrder]
 
+from crypt_agent.metrics import (
+    MetricsRegistry,
+    cycle_breakdown,
+    cycle_scope,
+    end_cycle_scope,
+    format_breakdown,
+    record_llm_usage,
+    write_prometheus,
+)
+from crypt_agent.llms import CachedLLM, MeteredLLM, format_usage_report, llm_cache_enabled, tier_model, usage_report
+from crypt_agent.analysis import analysis_mode, compute_analysis, extract_symbols, fan_out, inject_analysis
 from crypt_agent.tools.custom_tool import (
     advanced_sliced_executor,
+    calculate_batch_indicators,
     calculate_technical_indicators,
     check_wallet_balance,
     execute_multiple_orders,
@@ -24,10 +39,10 @@ from crypt_agent.tools.custom_tool import (
     math_tool, 
     place_market_order, 
     fetch_ticker_price, 
+    fetch_ticker_prices,
+    scan_market_momentum,
 )
 
-search_tool = SerperDevTool()
-
 @CrewBase
 class CryptAgent():
     """CryptAgent crew"""
@@ -41,12 +56,108 @@ class CryptAgent():
     
     # If you would like to add tools to your agents, you can learn more about it here:
     # https://docs.crewai.com/concepts/agents#agent-tools
+    def __init__(self, llm_factory=None, output_dir: str = "output", label: str = None, cache: bool = True):
+        # Every LLM handed to an agent, so their usage can be reported after a run.
+        # Per-symbol sub-crews get transient LLMs that are dropped once reported.
+        self.metered_llms: List[MeteredLLM] = []
+        self.transient_llms: List[MeteredLLM] = []
+        # Optional llm_factory(agent_name, model) building the LLM each agent's
+        # MeteredLLM wraps, e.g. scripted stand-ins in the benchmarks
+        self.llm_factory = llm_factory
+        # Where the trade signal, report and usage logs are written; concurrent
+        # crews (e.g. trigger jobs) each get their own directory and label
+        self.output_dir = output_dir
+        self.label = label
+        # crewAI's tool result caches (the crew's and each agent's own);
+        # long-lived crews turn them off, since results cached in one cycle
+        # are stale in the next
+        self.cache = cache
+        # Start time, metrics and metrics scope token of the running cycle
+        self._cycle_started = None
+        self._cycle_metrics = None
+        self._cycle_token = None
+
+    def agent_llm(self, name: str, transient: bool = False) -> MeteredLLM:
+        """Returns the metered LLM for an agent. The model is the agent's `llm`
+        in agents.yaml, or else the model of its `llm_tier` (standard or fast);
+        it is wrapped in the response cache when the agent sets `llm_cache: true`."""
+        config = self.agents_config[name] # type: ignore[index]
+        model = config.get('llm') or tier_model(config.get('llm_tier', 'standard'))
+        llm_class = CachedLLM if llm_cache_enabled() and config.get('llm_cache') else MeteredLLM
+        inner = self.llm_factory(name, model) if self.llm_factory else None
+        llm = llm_class(model=model, agent_name=name, inner=inner)
+        (self.transient_llms if transient else self.metered_llms).append(llm)
+        return llm
+
+    def llm_report(self, reset: bool = True) -> list:
+        """Per-agent LLM calls, latency and tokens since the previous report."""
+        rows = usage_report(self.metered_llms + self.transient_llms, reset=reset)
+        if reset:
+            self.transient_llms = []
+        return rows
+
+    def output_path(self, name: str) -> str:
+        return os.path.join(self.output_dir, name)
+
+    def _log_line(self, record: dict) -> str:
+        return json.dumps(dict(record, label=self.label) if self.label else record) + "\n"
+
+    @before_kickoff
+    def start_cycle_metrics(self, inputs):
+        # Only this crew's calls are counted, even with other crews running concurrently
+        self._cycle_started = time.perf_counter()
+        self._cycle_metrics = MetricsRegistry()
+        self._cycle_token = cycle_scope(self._cycle_metrics)
+        return inputs
+
+    def _end_cycle_scope(self):
+        if self._cycle_token is not None:
+            end_cycle_scope(self._cycle_token)
+            self._cycle_token = None
+
+    def end_cycle(self):
+        """Closes a cycle whose kickoff raised, so after_kickoff never ran:
+        ends its metrics scope and drops its LLM usage, which would otherwise
+        be reported as part of the next cycle. Does nothing after a cycle
+        that was reported. Long-lived crews call it after every kickoff."""
+        if self._cycle_token is None:
+            return
+        self._end_cycle_scope()
+        self.llm_report(reset=True)
+        self._cycle_metrics = None
+        self._cycle_started = None
+
+    @after_kickoff
+    def report_cycle(self, output):
+        rows = self.llm_report()
+        print(format_usage_report(rows))
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(self.output_path('llm_usage.jsonl'), 'a') as f:
+            f.write(self._log_line({"rows": rows}))
+
+        # Where the cycle's time went: LLM, tool code or exchange I/O
+        record_llm_usage(rows)
+        self._end_cycle_scope()
+        started = self._cycle_started if self._cycle_started is not None else time.perf_counter()
+        cycle = self._cycle_metrics.snapshot() if self._cycle_metrics is not None else {}
+        breakdown = cycle_breakdown(cycle, time.perf_counter() - started)
+        print(format_breakdown(breakdown))
+        with open(self.output_path('cycle_metrics.jsonl'), 'a') as f:
+            f.write(self._log_line(breakdown))
+        write_prometheus(last_cycle=breakdown)
+        return output
+
     @agent
     def researcher(self) -> Agent:
+        # crewai_tools is slow to import, so only load it when the researcher is built
+        from crewai_tools import SerperDevTool
+
+        search_tool = SerperDevTool()
         return Agent(
             config=self.agents_config['researcher'], # type: ignore[index]
-            tools=[search_tool, fetch_ticker_price, get_latest_klines], # type: ignore[list-item]
-            llm="gemini/gemini-2.5-pro",
+            tools=[search_tool, scan_market_momentum, fetch_ticker_price, fetch_ticker_prices, get_latest_klines], # type: ignore[list-item]
+            llm=self.agent_llm('researcher'),
+            cache=self.cache,
             verbose=True
         )
 
@@ -55,16 +166,18 @@ class CryptAgent():
         return Agent(
             config=self.agents_config['analyst'], # type: ignore[index]
             verbose=True,
-            llm="gemini/gemini-2.5-pro",
-            tools=[calculate_technical_indicators, math_tool] # type: ignore[list-item]
+            llm=self.agent_llm('analyst'),
+            cache=self.cache,
+            tools=[calculate_batch_indicators, calculate_technical_indicators, math_tool] # type: ignore[list-item]
         )
 
     @agent
     def strategist(self) -> Agent:
         return Agent(
             config=self.agents_config['strategist'], # type: ignore[index]
-            tools=[fetch_ticker_price, check_wallet_balance],
-            llm="gemini/gemini-2.5-pro",
+            tools=[fetch_ticker_price, fetch_ticker_prices, check_wallet_balance],
+            llm=self.agent_llm('strategist'),
+            cache=self.cache,
             verbose=True
         )
 
@@ -73,7 +186,8 @@ class CryptAgent():
         return Agent(
             config=self.agents_config['trader'], # type: ignore[index]
             tools=[place_market_order, execute_multiple_orders, advanced_sliced_executor],
-            llm="gemini/gemini-2.5-pro",
+            llm=self.agent_llm('trader'),
+            cache=self.cache,
             verbose=True
         )
 
@@ -81,7 +195,8 @@ class CryptAgent():
     def reporter(self) -> Agent:
         return Agent(
             config=self.agents_config['reporter'], # type: ignore[index]
-            llm="gemini/gemini-2.5-pro",
+            llm=self.agent_llm('reporter'),
+            cache=self.cache,
             verbose=True
         )
 
@@ -89,6 +204,7 @@ class CryptAgent():
     def research_task(self) -> Task:
         return Task(
             config=self.tasks_config['research_task'], # type: ignore[index]
+            callback=self.analyze_watchlist if analysis_mode() != "agent" else None,
         )
 
     @task
@@ -102,7 +218,7 @@ class CryptAgent():
         return Task(
             config=self.tasks_config['strategist_task'], # type: ignore[index]
             output_pydantic=TradeSignal,
-            output_file='output/trade_signal.json'
+            output_file=self.output_path('trade_signal.json')
         )
 
     @task
@@ -115,16 +231,51 @@ class CryptAgent():
     def report_task(self) -> Task:
         return Task(
             config=self.tasks_config['report_task'], # type: ignore[index]
-            output_file='output/trade_report.md'
+            output_file=self.output_path('trade_report.md')
         )
 
+    def analyze_watchlist(self, output):
+        """research_task callback for the python and parallel analysis modes:
+        analyzes the researched symbols and hands the results to the strategist."""
+        symbols = extract_symbols(output.raw)
+        if analysis_mode() == "parallel":
+            results = fan_out(symbols, self.analyze_symbol)
+        else:
+            results = compute_analysis(symbols)
+        inject_analysis(self.strategist_task(), results)
+
+    def analyze_symbol(self, symbol: str) -> str:
+        """Runs a one-task analyst crew for a single symbol (parallel mode).
+        Every call builds its own agent so concurrent sub-crews share no state."""
+        analyst = Agent(
+            config=self.agents_config['analyst'], # type: ignore[index]
+            verbose=True,
+            llm=self.agent_llm('analyst', transient=True),
+            cache=self.cache,
+            tools=[calculate_technical_indicators, math_tool] # type: ignore[list-item]
+        )
+        task = Task(
+            config=self.tasks_config['symbol_analysis_task'], # type: ignore[index]
+            agent=analyst,
+        )
+        crew = Crew(agents=[analyst], tasks=[task], process=Process.sequential, verbose=True)
+        return crew.kickoff(inputs={"symbol": symbol}).raw
+
     @crew
     def crew(self) -> Crew:
         """Creates the CryptAgent crew"""
+        agents = self.agents # Automatically created by the @agent decorator
+        tasks = self.tasks # Automatically created by the @task decorator
+
+        if analysis_mode() != "agent":
+            # The sequential analyst step is replaced by analyze_watchlist
+            agents = [a for a in agents if a is not self.analyst()]
+            tasks = [t for t in tasks if t is not self.analysis_task()]
 
         return Crew(
-            agents=self.agents, # Automatically created by the @agent decorator
-            tasks=self.tasks, # Automatically created by the @task decorator
+            agents=agents,
+            tasks=tasks,
             process=Process.sequential,
             verbose=True,
+            cache=self.cache,
         )
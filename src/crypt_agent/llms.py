@@ -0,0 +1,265 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from crewai import LLM
+from crewai.agents.parser import AgentAction, OutputParserError, parse
+from crewai.llms.base_llm import BaseLLM
+
+
+class ResponseCache:
+    """
+    Content-addressed store of LLM responses in a local SQLite file.
+
+    Entries older than `ttl` seconds are ignored (and purged), and the least
+    recently used entries are evicted once more than `max_entries` are stored.
+    """
+
+    def __init__(self, path: str = None, ttl: float = None, max_entries: int = None):
+        self.path = path or os.getenv("CRYPT_AGENT_LLM_CACHE_PATH", os.path.join(".cache", "llm_responses.sqlite3"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("CRYPT_AGENT_LLM_CACHE_TTL", str(6 * 3600)))
+        self.max_entries = max_entries or int(os.getenv("CRYPT_AGENT_LLM_CACHE_MAX_ENTRIES", "5000"))
+        self._lock = threading.Lock()
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, response TEXT, created REAL, accessed REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._db.commit()
+
+    @staticmethod
+    def key(model: str, messages, tools=None, response_model=None) -> str:
+        """Hashes everything that determines the response: the model, the fully
+        rendered messages (which include earlier tool outputs) and the tool schemas."""
+        payload = {
+            "model": model,
+            "messages": messages,
+            "tools": tools,
+            "response_model": response_model.model_json_schema() if response_model else None,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return row[0]
+
+    def put(self, key: str, model: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now),
+            )
+            self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def response_cache() -> ResponseCache:
+    """Returns the shared response cache, opening it on first use."""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
+
+
+def llm_cache_enabled() -> bool:
+    """CRYPT_AGENT_LLM_CACHE=0 turns the cache off for every agent."""
+    return os.getenv("CRYPT_AGENT_LLM_CACHE", "1").lower() not in ("0", "false", "no")
+
+
+# Model used for each tier in agents.yaml; either can point at a local stand-in (e.g. "ollama/llama3.1")
+DEFAULT_TIER_MODELS = {
+    "standard": "gemini/gemini-2.5-pro",
+    "fast": "gemini/gemini-2.5-flash",
+}
+
+
+def tier_model(tier: str) -> str:
+    """Returns the model of a tier, overridable with CRYPT_AGENT_LLM_<TIER>."""
+    tier = (tier or "standard").lower()
+    if tier not in DEFAULT_TIER_MODELS:
+        raise ValueError(f"Unknown LLM tier '{tier}', expected one of {sorted(DEFAULT_TIER_MODELS)}")
+    return os.getenv(f"CRYPT_AGENT_LLM_{tier.upper()}", DEFAULT_TIER_MODELS[tier])
+
+
+class MeteredLLM(BaseLLM):
+    """
+    Wraps a crewAI LLM and records the number of calls, their wall-clock
+    latency and errors, so each agent's cost can be reported after a run.
+
+    `inner` wraps an already built LLM (e.g. a scripted stand-in for
+    benchmarks) instead of crewAI's LLM for `model`.
+    """
+
+    def __init__(self, model: str, agent_name: str = None, inner: BaseLLM = None, **kwargs):
+        # The wrapped LLM must exist before BaseLLM assigns `stop`
+        self._inner = inner if inner is not None else LLM(model=model, **kwargs)
+        self.agent_name = agent_name
+        self.calls = 0
+        self.errors = 0
+        self.latency = 0.0
+        self._baseline = {}
+        self._stats_lock = threading.Lock()
+        super().__init__(model=model, provider=self._inner.provider)
+
+    @property
+    def stop(self):
+        return self._inner.stop
+
+    @stop.setter
+    def stop(self, value):
+        self._inner.stop = value
+
+    def __getattr__(self, name):
+        # Anything not defined on the wrapper (stream, is_litellm, ...) comes from the wrapped LLM
+        if name == "_inner":
+            raise AttributeError(name)
+        return getattr(self._inner, name)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        started = time.perf_counter()
+        try:
+            return self._inner.call(messages, tools=tools, callbacks=callbacks,
+                                    available_functions=available_functions, from_task=from_task,
+                                    from_agent=from_agent, response_model=response_model)
+        except Exception:
+            with self._stats_lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._stats_lock:
+                self.calls += 1
+                self.latency += time.perf_counter() - started
+
+    def supports_function_calling(self) -> bool:
+        return self._inner.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self._inner.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self._inner.get_context_window_size()
+
+    def get_token_usage_summary(self):
+        return self._inner.get_token_usage_summary()
+
+    def _totals(self) -> dict:
+        tokens = self.get_token_usage_summary()
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "latency_s": self.latency,
+            "prompt_tokens": tokens.prompt_tokens,
+            "completion_tokens": tokens.completion_tokens,
+            "cache_hits": getattr(self, "cache_hits", 0),
+        }
+
+    def usage(self, reset: bool = False) -> dict:
+        """Usage since the last reset (or since creation). A long-lived crew
+        resets after every report so each cycle is reported on its own."""
+        totals = self._totals()
+        usage = {field: value - self._baseline.get(field, 0) for field, value in totals.items()}
+        if reset:
+            self._baseline = totals
+        return {"agent": self.agent_name, "model": self.model, **usage}
+
+
+def calls_tool(response: str) -> bool:
+    """Whether crewAI's ReAct executor would run a tool for this reply."""
+    try:
+        return isinstance(parse(response), AgentAction)
+    except OutputParserError:
+        return False
+
+
+class CachedLLM(MeteredLLM):
+    """
+    MeteredLLM that answers repeated calls from a ResponseCache.
+
+    Only plain text completions that do not call a tool are cached. crewAI's
+    ReAct executor runs the tool named in an "Action:" reply, so a cached
+    action would run the tool again (placing orders twice) without the model
+    deciding to; such replies always come from the model. Calls that hand the
+    LLM callables to execute (`available_functions`, native function calling)
+    are not cached at all.
+    """
+
+    def __init__(self, model: str, agent_name: str = None, cache: ResponseCache = None, inner: BaseLLM = None, **kwargs):
+        self._cache = cache or response_cache()
+        self.cache_hits = 0
+        super().__init__(model=model, agent_name=agent_name, inner=inner, **kwargs)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        if available_functions:
+            return super().call(messages, tools=tools, callbacks=callbacks,
+                                available_functions=available_functions, from_task=from_task,
+                                from_agent=from_agent, response_model=response_model)
+
+        key = self._cache.key(self.model, messages, tools, response_model)
+        cached = self._cache.get(key)
+        if cached is not None:
+            with self._stats_lock:
+                self.cache_hits += 1
+            return cached
+
+        response = super().call(messages, tools=tools, callbacks=callbacks,
+                                available_functions=available_functions, from_task=from_task,
+                                from_agent=from_agent, response_model=response_model)
+        if isinstance(response, str) and response and not calls_tool(response):
+            self._cache.put(key, self.model, response)
+        return response
+
+
+def usage_report(llms, reset: bool = False) -> list:
+    """Aggregates MeteredLLM usage per agent (several instances may serve one agent)."""
+    rows = {}
+    for llm in llms:
+        usage = llm.usage(reset=reset)
+        row = rows.setdefault(usage["agent"], dict(usage, calls=0, errors=0, latency_s=0.0,
+                                                   prompt_tokens=0, completion_tokens=0, cache_hits=0))
+        for field in ("calls", "errors", "latency_s", "prompt_tokens", "completion_tokens", "cache_hits"):
+            row[field] += usage[field]
+    for row in rows.values():
+        row["latency_s"] = round(row["latency_s"], 3)
+        row["avg_latency_s"] = round(row["latency_s"] / row["calls"], 3) if row["calls"] else 0.0
+    return list(rows.values())
+
+
+def format_usage_report(rows: list) -> str:
+    """Renders usage_report rows as a fixed-width table."""
+    header = f"{'agent':<12} {'model':<28} {'calls':>5} {'hits':>5} {'total s':>8} {'avg s':>7} {'prompt tok':>10} {'compl tok':>9}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{str(row['agent']):<12} {row['model']:<28} {row['calls']:>5} {row['cache_hits']:>5} "
+            f"{row['latency_s']:>8.2f} {row['avg_latency_s']:>7.2f} {row['prompt_tokens']:>10} {row['completion_tokens']:>9}"
+        )
+    return "\n".join(lines)
@@ -4,14 +4,14 @@ import warnings
 
 from datetime import datetime
 
-from crypt_agent.crew import CryptAgent
-
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
 # This main file is intended to be a way for you to run your
 # crew locally, so refrain from adding unnecessary logic into this file.
 # Replace with inputs you want to test with, it will automatically
 # interpolate any tasks and agents information
+# CryptAgent is imported inside each entry point so the heavy crewAI import
+# only happens once a command actually needs the crew.
 
 def run():
     """
@@ -22,6 +22,8 @@ def run():
         'current_year': str(datetime.now().year)
     }
 
+    from crypt_agent.crew import CryptAgent
+
     try:
         CryptAgent().crew().kickoff(inputs=inputs)
     except Exception as e:
@@ -36,6 +38,8 @@ def train():
         "topic": "AI LLMs",
         'current_year': str(datetime.now().year)
     }
+    from crypt_agent.crew import CryptAgent
+
     try:
         CryptAgent().crew().train(n_iterations=int(sys.argv[1]), filename=sys.argv[2], inputs=inputs)
 
@@ -46,6 +50,8 @@ def replay():
     """
     Replay the crew execution from a specific task.
     """
+    from crypt_agent.crew import CryptAgent
+
     try:
         CryptAgent().crew().replay(task_id=sys.argv[1])
 
@@ -61,12 +67,24 @@ def test():
         "current_year": str(datetime.now().year)
     }
 
+    from crypt_agent.crew import CryptAgent
+
     try:
         CryptAgent().crew().test(n_iterations=int(sys.argv[1]), eval_llm=sys.argv[2], inputs=inputs)
 
     except Exception as e:
         raise Exception(f"An error occurred while testing the crew: {e}")
 
+def trigger_inputs(trigger_payload):
+    """
+    Build the crew inputs for a trigger payload.
+    """
+    return {
+        "crewai_trigger_payload": trigger_payload,
+        "topic": "",
+        "current_year": ""
+    }
+
 def run_with_trigger():
     """
     Run the crew with trigger payload.
@@ -81,14 +99,114 @@ def run_with_trigger():
     except json.JSONDecodeError:
         raise Exception("Invalid JSON payload provided as argument")
 
-    inputs = {
-        "crewai_trigger_payload": trigger_payload,
-        "topic": "",
-        "current_year": ""
-    }
+    inputs = trigger_inputs(trigger_payload)
+
+    from crypt_agent.crew import CryptAgent
 
     try:
         result = CryptAgent().crew().kickoff(inputs=inputs)
         return result
     except Exception as e:
         raise Exception(f"An error occurred while running the crew with trigger: {e}")
+
+def run_daemon():
+    """
+    Run the crew continuously in one process, keeping the crew, the Bybit
+    session and the market-data caches warm between cycles.
+
+    Optional argument: a Bybit interval (e.g. "15") to run right after every
+    candle close, or a number of seconds with an "s" suffix (e.g. "300s").
+    Defaults to CRYPT_AGENT_CYCLE (or "15").
+    """
+    import os
+
+    from crypt_agent.crew import CryptAgent
+    from crypt_agent.scheduler import CycleScheduler
+    from crypt_agent.tools.instruments import instrument_cache
+    from crypt_agent.tools.session import get_session, warm_up
+
+    schedule = sys.argv[1] if len(sys.argv) > 1 else os.getenv("CRYPT_AGENT_CYCLE", "15")
+
+    # Without crewAI's tool cache, so every cycle sees fresh tool results
+    crew_base = CryptAgent(cache=False)
+    crew = crew_base.crew()
+    try:
+        # Open pooled connections and load instrument metadata before the first cycle
+        session = get_session()
+        warm_up(session)
+        instrument_cache.all(session)
+    except Exception as e:
+        print(f"Warm-up failed, continuing cold: {e}")
+
+    def cycle():
+        try:
+            crew.kickoff(inputs={
+                'topic': 'AI LLMs',
+                'current_year': str(datetime.now().year)
+            })
+        finally:
+            # A failed cycle's metrics and LLM usage must not roll into the next one
+            crew_base.end_cycle()
+
+    if schedule.endswith("s"):
+        scheduler = CycleScheduler(cycle, interval_seconds=float(schedule[:-1]))
+    else:
+        scheduler = CycleScheduler(cycle, candle_interval=schedule)
+
+    try:
+        scheduler.run_forever(run_immediately=True)
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+def serve_triggers():
+    """
+    Serve trigger payloads over local HTTP instead of one process per alert.
+
+    POST /jobs with a JSON payload queues a crew run and returns a job id;
+    GET /jobs/<id> returns its status and result. Up to
+    CRYPT_AGENT_TRIGGER_CONCURRENCY (default 2) crews run at once via
+    kickoff_async; each job writes its signal, report and metrics logs to
+    output/jobs/<job id>/. Optional argument: port (default CRYPT_AGENT_TRIGGER_PORT or 8787).
+    """
+    import os
+
+    from crypt_agent.crew import CryptAgent
+    from crypt_agent.trigger_server import TriggerService, serve
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else int(os.getenv("CRYPT_AGENT_TRIGGER_PORT", "8787"))
+    service = TriggerService(
+        crew_factory=lambda job_id: CryptAgent(output_dir=os.path.join("output", "jobs", job_id), label=job_id).crew(),
+        build_inputs=trigger_inputs,
+        max_concurrency=int(os.getenv("CRYPT_AGENT_TRIGGER_CONCURRENCY", "2")),
+    )
+    serve(service, host=os.getenv("CRYPT_AGENT_TRIGGER_HOST", "127.0.0.1"), port=port)
+
+def backtest():
+    """
+    Backtest the RSI/MACD strategy offline on Bybit history.
+
+    History is backfilled into CRYPT_AGENT_HISTORY_DIR (default .cache/history)
+    and replayed locally; see `backtest --help` for the options.
+    """
+    from crypt_agent.backtest import main
+
+    main(sys.argv[1:])
+
+def sweep():
+    """
+    Sweep RSI window, MACD spans and RSI thresholds over local Bybit history
+    with a process pool and print the ranked settings; see `sweep --help`.
+    """
+    from crypt_agent.sweep import main
+
+    main(sys.argv[1:])
+
+def bench():
+    """
+    Benchmark the tool hot paths and a full crew cycle offline (simulated
+    exchange, scripted LLMs); reports go to output/benchmarks and are compared
+    with the previous run. See `bench --help`.
+    """
+    from crypt_agent.bench import main
+
+    main(sys.argv[1:])
@@ -0,0 +1,317 @@
+"""
+Timers and counters for the tools, the exchange session and the LLMs.
+
+Every tool is wrapped with `instrumented` and the shared session with
+`InstrumentedSession`. Exchange requests are attributed to the tool that
+issued them, including requests made from the tools' thread pools (see
+`in_context`). The crew prints a per-cycle breakdown of where the time
+went (LLM, tool code, exchange I/O), counted in a per-cycle registry so
+concurrent crews do not see each other's calls (see `cycle_scope`), and
+writes the running totals as a Prometheus text file for node_exporter's
+textfile collector.
+"""
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+
+# Counters in Prometheus text format, refreshed after every cycle ("" disables the file)
+METRICS_FILE = os.getenv("CRYPT_AGENT_METRICS_FILE", os.path.join("output", "metrics", "crypt_agent.prom"))
+
+
+def metrics_enabled() -> bool:
+    """CRYPT_AGENT_METRICS=0 turns the instrumentation off."""
+    return os.getenv("CRYPT_AGENT_METRICS", "1").lower() not in ("0", "false", "no")
+
+
+class _ToolCall:
+    """Exchange requests issued by one running tool call."""
+
+    __slots__ = ("requests", "exchange_s")
+
+    def __init__(self):
+        self.requests = 0
+        self.exchange_s = 0.0
+
+
+_current_call = contextvars.ContextVar("crypt_agent_tool_call", default=None)
+
+
+class MetricsRegistry:
+    """
+    Thread-safe running totals keyed by (kind, name), where kind is "tool",
+    "exchange" or "llm". Every entry counts calls, errors, seconds (total and
+    max) and, for tools, the exchange requests they issued and their time.
+    """
+
+    FIELDS = ("calls", "errors", "seconds", "max_seconds", "requests", "exchange_seconds")
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, name: str, seconds: float, errors: int = 0, calls: int = 1,
+               requests: int = 0, exchange_seconds: float = 0.0):
+        with self._lock:
+            stats = self._stats.setdefault((kind, name), dict.fromkeys(self.FIELDS, 0))
+            stats["calls"] += calls
+            stats["errors"] += errors
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds / max(calls, 1))
+            stats["requests"] += requests
+            stats["exchange_seconds"] += exchange_seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {key: dict(stats) for key, stats in self._stats.items()}
+
+    def since(self, baseline: dict) -> dict:
+        """The totals accumulated after `baseline` (a previous snapshot)."""
+        delta = {}
+        for key, stats in self.snapshot().items():
+            before = baseline.get(key, {})
+            change = {field: stats[field] - before.get(field, 0) for field in self.FIELDS if field != "max_seconds"}
+            if change["calls"]:
+                delta[key] = dict(change, max_seconds=stats["max_seconds"])
+        return delta
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+registry = MetricsRegistry()
+
+# Registry of the crew cycle running in this context, if any
+_cycle = contextvars.ContextVar("crypt_agent_cycle", default=None)
+
+
+def record(kind: str, name: str, seconds: float, **fields):
+    """Records into the process-wide registry and the running cycle's registry."""
+    registry.record(kind, name, seconds, **fields)
+    cycle = _cycle.get()
+    if cycle is not None:
+        cycle.record(kind, name, seconds, **fields)
+
+
+def cycle_scope(cycle: MetricsRegistry):
+    """Makes `cycle` collect everything recorded in the current context from
+    now on, including thread-pool work submitted with `in_context`. Returns
+    the token for `end_cycle_scope`. A crew run with kickoff_async runs in
+    its own copy of the context, so concurrent runs keep separate cycles."""
+    return _cycle.set(cycle)
+
+
+def end_cycle_scope(token):
+    _cycle.reset(token)
+
+
+def failed(result) -> bool:
+    """
+    Whether a tool result reports a failure: a JSON result (or dict) with
+    status "error" or "partial", an OrderBatch with failed orders, or a
+    batch whose "results" include a failure. Lists fail if any item does.
+    Plain-text results fail when they start with "Error" (math_calculator,
+    request_demo_funds).
+    """
+    if isinstance(result, str):
+        if not result.startswith(("{", "[")):
+            return result.startswith("Error")
+        try:
+            result = json.loads(result)
+        except ValueError:
+            return False
+    if isinstance(result, list):
+        return any(failed(item) for item in result)
+    if isinstance(result, dict):
+        return (result.get("status") in ("error", "partial") or bool(result.get("failed"))
+                or any(failed(item) for item in result.get("results") or []))
+    return False
+
+
+def instrumented(name: str):
+    """
+    Times a tool and counts the exchange requests it issues, under `name`
+    (the tool name the agents see). Goes between `@tool` and the function;
+    functools.wraps keeps the docstring and the annotations crewAI builds
+    the tool description and schema from. Results that report a failure
+    (see `failed`) and exceptions count as errors.
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not metrics_enabled():
+                return fn(*args, **kwargs)
+            call = _ToolCall()
+            token = _current_call.set(call)
+            started = time.perf_counter()
+            error = True
+            try:
+                result = fn(*args, **kwargs)
+                error = failed(result)
+                return result
+            finally:
+                _current_call.reset(token)
+                record("tool", name, time.perf_counter() - started, errors=int(error),
+                       requests=call.requests, exchange_seconds=call.exchange_s)
+
+        return wrapper
+
+    return decorator
+
+
+def in_context(fn):
+    """Runs `fn` in a copy of the caller's context, so work submitted to a
+    thread pool is still attributed to the tool that submitted it."""
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+
+    return wrapper
+
+
+class InstrumentedSession:
+    """Proxy of an exchange session that times every method call."""
+
+    def __init__(self, session):
+        self._session = session
+
+    @property
+    def wrapped(self):
+        return self._session
+
+    def __getattr__(self, name):
+        attr = getattr(self._session, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            if not metrics_enabled():
+                return attr(*args, **kwargs)
+            started = time.perf_counter()
+            error = True
+            try:
+                result = attr(*args, **kwargs)
+                error = False
+                return result
+            finally:
+                elapsed = time.perf_counter() - started
+                record("exchange", name, elapsed, errors=int(error))
+                tool_call = _current_call.get()
+                if tool_call is not None:
+                    tool_call.requests += 1
+                    tool_call.exchange_s += elapsed
+
+        return call
+
+
+def record_llm_usage(rows: list):
+    """Adds a cycle's usage_report rows to the LLM totals."""
+    for row in rows:
+        if row["calls"]:
+            record("llm", str(row["agent"]), row["latency_s"], errors=row["errors"], calls=row["calls"])
+
+
+def cycle_breakdown(delta: dict, wall_s: float) -> dict:
+    """
+    Splits a cycle's wall time between the LLMs, tool code and exchange I/O.
+    Tool and request times are summed over threads, so with parallel tools
+    they can add up to more than the wall time; `other_s` (crewAI itself and
+    work outside the tools) is clipped at zero.
+    """
+    def total(kind, field="seconds"):
+        return sum(stats[field] for (k, _), stats in delta.items() if k == kind)
+
+    llm_s = total("llm")
+    tool_s = total("tool")
+    tool_io_s = total("tool", "exchange_seconds")
+    exchange_s = total("exchange")
+    return {
+        "wall_s": round(wall_s, 3),
+        "llm_s": round(llm_s, 3),
+        "tool_s": round(tool_s, 3),
+        "tool_compute_s": round(max(tool_s - tool_io_s, 0.0), 3),
+        "exchange_s": round(exchange_s, 3),
+        "exchange_requests": int(total("exchange", "calls")),
+        "other_s": round(max(wall_s - llm_s - tool_s - (exchange_s - tool_io_s), 0.0), 3),
+        "tools": {name: stats for (kind, name), stats in delta.items() if kind == "tool"},
+        "exchange": {name: stats for (kind, name), stats in delta.items() if kind == "exchange"},
+    }
+
+
+def format_breakdown(breakdown: dict) -> str:
+    """Renders a cycle_breakdown as a summary line and two tables."""
+    wall = breakdown["wall_s"] or 1e-9
+
+    def share(seconds):
+        return f"{seconds:.2f}s ({seconds / wall:.0%})"
+
+    lines = [
+        f"Cycle {breakdown['wall_s']:.2f}s: LLM {share(breakdown['llm_s'])}, "
+        f"tool code {share(breakdown['tool_compute_s'])}, exchange I/O {share(breakdown['exchange_s'])} "
+        f"in {breakdown['exchange_requests']} requests, other {share(breakdown['other_s'])}",
+        f"{'tool':<32} {'calls':>5} {'errors':>6} {'total s':>8} {'avg ms':>8} {'requests':>8} {'I/O s':>7}",
+    ]
+    for name, s in sorted(breakdown["tools"].items(), key=lambda item: -item[1]["seconds"]):
+        lines.append(
+            f"{name:<32} {s['calls']:>5} {s['errors']:>6} {s['seconds']:>8.2f} "
+            f"{s['seconds'] / s['calls'] * 1000:>8.1f} {s['requests']:>8} {s['exchange_seconds']:>7.2f}"
+        )
+    lines.append(f"{'exchange request':<32} {'calls':>5} {'errors':>6} {'total s':>8} {'avg ms':>8}")
+    for name, s in sorted(breakdown["exchange"].items(), key=lambda item: -item[1]["seconds"]):
+        lines.append(
+            f"{name:<32} {s['calls']:>5} {s['errors']:>6} {s['seconds']:>8.2f} {s['seconds'] / s['calls'] * 1000:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+# (metric suffix, registry field, help text) exported for every kind
+_EXPORTED = (
+    ("calls_total", "calls", "Calls"),
+    ("errors_total", "errors", "Failed calls"),
+    ("seconds_total", "seconds", "Time spent in calls"),
+)
+
+_LABELS = {"tool": "tool", "exchange": "method", "llm": "agent"}
+
+
+def prometheus_text(snapshot: dict = None, last_cycle: dict = None) -> str:
+    """The registry totals (and the last cycle's breakdown) in Prometheus text format."""
+    snapshot = registry.snapshot() if snapshot is None else snapshot
+    lines = []
+    for kind, label in _LABELS.items():
+        entries = sorted((name, stats) for (k, name), stats in snapshot.items() if k == kind)
+        exported = _EXPORTED + ((("exchange_requests_total", "requests", "Exchange requests issued"),) if kind == "tool" else ())
+        for suffix, field, help_text in exported:
+            metric = f"crypt_agent_{kind}_{suffix}"
+            lines.append(f"# HELP {metric} {help_text} per {label}.")
+            lines.append(f"# TYPE {metric} counter")
+            for name, stats in entries:
+                value = stats[field]
+                lines.append(f'{metric}{{{label}="{name}"}} {value:.6f}' if isinstance(value, float)
+                             else f'{metric}{{{label}="{name}"}} {value}')
+    if last_cycle:
+        for field in ("wall_s", "llm_s", "tool_compute_s", "exchange_s", "other_s"):
+            metric = f"crypt_agent_last_cycle_{field[:-2]}_seconds"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {last_cycle[field]}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str = None, last_cycle: dict = None):
+    """Writes prometheus_text atomically (the textfile collector may read at any time)."""
+    path = METRICS_FILE if path is None else path
+    if not path:
+        return
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(prometheus_text(last_cycle=last_cycle))
+    os.replace(tmp_path, path)
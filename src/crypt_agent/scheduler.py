@@ -0,0 +1,66 @@
+import threading
+import time
+
+from crypt_agent.tools.kline_store import candle_open_ms, next_open_ms
+
+
+class CycleScheduler:
+    """
+    Runs `run_cycle()` repeatedly in a long-lived process, either every
+    `interval_seconds` or `offset_seconds` after every candle close of
+    `candle_interval` (a Bybit interval such as "15").
+
+    Cycles never overlap: a tick that arrives while a cycle is still running
+    is skipped, and boundaries missed by a long cycle are not replayed.
+    """
+
+    def __init__(self, run_cycle, interval_seconds: float = None, candle_interval: str = None, offset_seconds: float = 2):
+        if not interval_seconds and not candle_interval:
+            raise ValueError("Either interval_seconds or candle_interval is required")
+        self.run_cycle = run_cycle
+        self.interval_seconds = interval_seconds
+        self.candle_interval = candle_interval
+        self.offset_seconds = offset_seconds
+        self.cycles = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def next_run(self, now: float) -> float:
+        """Returns the epoch time of the next cycle after `now`."""
+        if self.candle_interval:
+            # Weekly and monthly candles are aligned like Bybit's (Monday, 1st of the month)
+            current = candle_open_ms(now * 1000, self.candle_interval)
+            return next_open_ms(current, self.candle_interval) / 1000 + self.offset_seconds
+        return now + self.interval_seconds
+
+    def trigger(self) -> bool:
+        """Runs one cycle unless one is already in progress. Returns whether it ran."""
+        if not self._lock.acquire(blocking=False):
+            self.skipped += 1
+            print("Previous cycle still running, skipping this one.")
+            return False
+        try:
+            self.cycles += 1
+            started = time.time()
+            self.run_cycle()
+            print(f"Cycle {self.cycles} finished in {time.time() - started:.1f}s")
+            return True
+        except Exception as e:
+            # Keep the daemon alive, the next cycle starts from fresh exchange data
+            print(f"Cycle {self.cycles} failed: {e}")
+            return False
+        finally:
+            self._lock.release()
+
+    def run_forever(self, max_cycles: int = None, run_immediately: bool = False):
+        """Blocks and runs cycles on schedule until `stop()` (or `max_cycles`)."""
+        if run_immediately:
+            self.trigger()
+        while not self._stopped.is_set() and (max_cycles is None or self.cycles < max_cycles):
+            if self._stopped.wait(max(0.0, self.next_run(time.time()) - time.time())):
+                break
+            self.trigger()
+
+    def stop(self):
+        self._stopped.set()
@@ -0,0 +1,252 @@
+"""
+Parameter sweep for the indicator settings of the RSI/MACD strategy.
+
+Every combination of RSI window, MACD spans and RSI thresholds is
+backtested on every symbol. The aligned price arrays are loaded once into
+shared memory and a process pool evaluates (settings, symbol chunk) tasks
+against them, so workers neither reload history nor copy prices.
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from crypt_agent.backtest import (
+    StrategyParams,
+    align,
+    liquid_symbols,
+    load_history,
+    simulate,
+    stored_symbols,
+    strategy_indicators,
+    summarize,
+    target_positions,
+)
+from crypt_agent.tools.indicators import IndicatorSettings
+from crypt_agent.tools.kline_store import INTERVAL_MINUTES, interval_ms
+
+# Worker processes used by the sweep (defaults to one per CPU)
+SWEEP_WORKERS = int(os.getenv("CRYPT_AGENT_SWEEP_WORKERS", str(os.cpu_count() or 1)))
+
+# Settings fields reported with every result
+SETTING_FIELDS = ("rsi_window", "macd_fast", "macd_slow", "macd_signal", "rsi_buy", "rsi_sell")
+
+# Shared (open, close) price arrays of the current worker process
+_shared = None
+_prices = None
+
+
+def _attach(name: str, shape: tuple):
+    """Pool initializer: maps the shared price block as two (symbols, bars) arrays."""
+    global _shared, _prices
+    _shared = shared_memory.SharedMemory(name=name)
+    block = np.ndarray((2,) + tuple(shape), dtype=np.float64, buffer=_shared.buf)
+    _prices = (block[0], block[1])
+
+
+def _evaluate(variants: list, start: int, stop: int, symbols: list, bars_per_year: float) -> list:
+    """Backtests parameter sets sharing the same indicator settings on rows
+    [start, stop) of the shared prices; RSI/MACD are computed once for all of them."""
+    open_, close = _prices[0][start:stop], _prices[1][start:stop]
+    indicators = strategy_indicators(close, variants[0])
+    results = []
+    for params in variants:
+        net, held = simulate(open_, close, target_positions(close, params, indicators), params)
+        settings = {field: getattr(params, field) for field in SETTING_FIELDS}
+        results.extend(dict(settings, **result) for result in summarize(symbols, net, held, bars_per_year))
+    return results
+
+
+def parameter_grid(rsi_windows, macd_spans, rsi_buys, rsi_sells, base: StrategyParams = None) -> list:
+    """Every combination of the given values, skipping invalid MACD spans."""
+    base = base or StrategyParams()
+    grid = []
+    for rsi_window, (fast, slow, signal), rsi_buy, rsi_sell in itertools.product(rsi_windows, macd_spans, rsi_buys, rsi_sells):
+        try:
+            IndicatorSettings(rsi_window, fast, slow, signal)
+        except ValueError:
+            continue
+        if rsi_buy >= rsi_sell:
+            continue
+        grid.append(replace(base, rsi_window=rsi_window, macd_fast=fast, macd_slow=slow,
+                            macd_signal=signal, rsi_buy=rsi_buy, rsi_sell=rsi_sell))
+    return grid
+
+
+def rank(results: list, rank_by: str = "sharpe") -> list:
+    """Aggregates the per-symbol results of each parameter set, best first."""
+    groups = {}
+    for result in results:
+        groups.setdefault(tuple(result[field] for field in SETTING_FIELDS), []).append(result)
+    table = []
+    for key, group in groups.items():
+        returns = np.array([r["total_return"] for r in group])
+        table.append(dict(
+            zip(SETTING_FIELDS, key),
+            symbols=len(group),
+            mean_return=round(float(returns.mean()), 6),
+            median_return=round(float(np.median(returns)), 6),
+            profitable=round(float((returns > 0).mean()), 4),
+            sharpe=round(float(np.mean([r["sharpe"] for r in group])), 3),
+            trades=int(sum(r["trades"] for r in group)),
+        ))
+    key = "mean_return" if rank_by == "return" else "sharpe"
+    return sorted(table, key=lambda row: row[key], reverse=True)
+
+
+def best_per_symbol(results: list, rank_by: str = "sharpe") -> dict:
+    """The best parameter set of every symbol."""
+    key = "total_return" if rank_by == "return" else "sharpe"
+    best = {}
+    for result in results:
+        if result["symbol"] not in best or result[key] > best[result["symbol"]][key]:
+            best[result["symbol"]] = result
+    return best
+
+
+def run_sweep(symbols: list, grid: list, interval: str = "15", days: float = 90, session=None,
+              workers: int = None, chunk_size: int = 25, rank_by: str = "sharpe", end: int = None) -> dict:
+    """Backtests every parameter set of `grid` on every symbol and returns the
+    ranked table, the best set per symbol and all individual results."""
+    interval = str(interval)
+    step = interval_ms(interval)
+    end = int(end if end is not None else time.time() * 1000) // step * step - step
+    bars = int(days * 86_400_000 // step)
+    start = end - (bars - 1) * step
+    bars_per_year = 525_600 / INTERVAL_MINUTES[interval]
+
+    started = time.perf_counter()
+    history = load_history(symbols, interval, start, end, session=session)
+    names = list(history)
+    results = []
+    if names and grid:
+        open_, close = align([history[name] for name in names], start, bars, interval)
+        del history
+        shared = shared_memory.SharedMemory(create=True, size=2 * open_.nbytes)
+        try:
+            block = np.ndarray((2,) + open_.shape, dtype=np.float64, buffer=shared.buf)
+            block[0], block[1] = open_, close
+            del open_, close, block
+
+            # Parameter sets that only differ in thresholds share one RSI/MACD computation
+            families = {}
+            for params in grid:
+                families.setdefault((params.rsi_window, params.macd_fast, params.macd_slow, params.macd_signal), []).append(params)
+            tasks = [
+                (variants, offset, min(offset + chunk_size, len(names)))
+                for variants in families.values() for offset in range(0, len(names), chunk_size)
+            ]
+            with ProcessPoolExecutor(
+                max_workers=max(1, min(workers or SWEEP_WORKERS, len(tasks))),
+                initializer=_attach,
+                initargs=(shared.name, (len(names), bars)),
+            ) as pool:
+                futures = [
+                    pool.submit(_evaluate, variants, lo, hi, names[lo:hi], bars_per_year)
+                    for variants, lo, hi in tasks
+                ]
+                for done, future in enumerate(futures, 1):
+                    results.extend(future.result())
+                    if done % max(1, len(futures) // 10) == 0:
+                        print(f"Evaluated {done}/{len(futures)} tasks")
+        finally:
+            shared.close()
+            shared.unlink()
+
+    return {
+        "interval": interval,
+        "start": start,
+        "end": end,
+        "bars": bars,
+        "symbols": len(names),
+        "combinations": len(grid),
+        "rank_by": rank_by,
+        "costs": {"fee": grid[0].fee, "slippage_bps": grid[0].slippage_bps} if grid else {},
+        "ranked": rank(results, rank_by),
+        "best_per_symbol": best_per_symbol(results, rank_by),
+        "results": results,
+        "elapsed_s": round(time.perf_counter() - started, 2),
+    }
+
+
+def format_report(report: dict, rows: int = 15) -> str:
+    lines = [
+        f"Sweep of {report['combinations']} settings x {report['symbols']} symbols on "
+        f"{report['bars']} x {report['interval']}m candles in {report['elapsed_s']}s (ranked by {report['rank_by']})",
+        f"{'rsi':>4} {'macd':>10} {'buy/sell':>9} {'mean ret':>9} {'median':>9} {'profit%':>8} {'sharpe':>7} {'trades':>7}",
+    ]
+    for r in report["ranked"][:rows]:
+        macd_spans = f"{r['macd_fast']}/{r['macd_slow']}/{r['macd_signal']}"
+        thresholds = f"{r['rsi_buy']:g}/{r['rsi_sell']:g}"
+        lines.append(
+            f"{r['rsi_window']:>4} {macd_spans:>10} {thresholds:>9} {r['mean_return']:>+9.2%} "
+            f"{r['median_return']:>+9.2%} {r['profitable']:>8.0%} {r['sharpe']:>7.2f} {r['trades']:>7}"
+        )
+    return "\n".join(lines)
+
+
+def _numbers(text: str, cast=float) -> list:
+    return [cast(value) for value in text.split(",") if value.strip()]
+
+
+def parser() -> argparse.ArgumentParser:
+    defaults = StrategyParams()
+    p = argparse.ArgumentParser(prog="sweep", description="Sweep RSI/MACD settings over Bybit history.")
+    p.add_argument("--symbols", help="comma-separated symbols (default: the --top most liquid USDT perpetuals)")
+    p.add_argument("--top", type=int, default=50)
+    p.add_argument("--interval", default="15")
+    p.add_argument("--days", type=float, default=90)
+    p.add_argument("--rsi-windows", default="7,14,21")
+    p.add_argument("--macd", default="12/26/9,8/21/5,5/35/5", help="comma-separated fast/slow/signal spans")
+    p.add_argument("--rsi-buy", default="25,30,35")
+    p.add_argument("--rsi-sell", default="65,70,75")
+    p.add_argument("--allow-short", action="store_true")
+    p.add_argument("--fee", type=float, default=defaults.fee)
+    p.add_argument("--slippage-bps", type=float, default=defaults.slippage_bps)
+    p.add_argument("--rank-by", choices=("sharpe", "return"), default="sharpe")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--chunk-size", type=int, default=25)
+    p.add_argument("--offline", action="store_true", help="only use history already in the local store")
+    p.add_argument("--output", default=os.path.join("output", "sweeps"))
+    return p
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    base = StrategyParams(allow_short=args.allow_short, fee=args.fee, slippage_bps=args.slippage_bps)
+    grid = parameter_grid(
+        _numbers(args.rsi_windows, int),
+        [tuple(int(span) for span in spans.split("/")) for spans in args.macd.split(",") if spans.strip()],
+        _numbers(args.rsi_buy),
+        _numbers(args.rsi_sell),
+        base,
+    )
+
+    session = None
+    if not args.offline:
+        from crypt_agent.tools.session import get_session
+
+        session = get_session()
+    if args.symbols:
+        symbols = [symbol.strip().upper() for symbol in args.symbols.split(",") if symbol.strip()]
+    elif session is not None:
+        symbols = liquid_symbols(session, args.top)
+    else:
+        symbols = stored_symbols(args.interval)
+
+    report = run_sweep(symbols, grid, args.interval, args.days, session=session, workers=args.workers,
+                       chunk_size=args.chunk_size, rank_by=args.rank_by)
+    print(format_report(report))
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"sweep_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {path}")
+    return report
@@ -1,98 +1,311 @@
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
 from crewai.tools import tool
-from pybit.unified_trading import HTTP
-import pandas as pd
+from pybit.exceptions import InvalidRequestError
 
 from typing import List
 
-# Securely initialize session
-session = HTTP(
-    testnet=False,
-    demo=True,
-    api_key=os.getenv("BYBIT_DEMO_API_KEY"),
-    api_secret=os.getenv("BYBIT_DEMO_API_SECRET"),
-    recv_window=10000
+import numpy as np
+
+from crypt_agent.metrics import in_context, instrumented
+from crypt_agent.tools.indicators import IndicatorSettings, IndicatorStates, kline_features, latest_indicators, momentum_scores, rsi, stack_series
+from crypt_agent.tools.instruments import instrument_cache
+from crypt_agent.tools.kline_store import downsample_rows, kline_store
+from crypt_agent.tools.market_stream import market_stream, market_stream_enabled
+from crypt_agent.tools.orders import BATCH_ORDERS, submit_orders
+from crypt_agent.tools.rate_limit import order_rate_limiter
+from crypt_agent.tools.schemas import (
+    IndicatorBatch,
+    IndicatorResult,
+    KlineColumns,
+    KlineSummary,
+    MarketScan,
+    OrderBatch,
+    OrderResult,
+    ScanCandidate,
+    SlicedExecution,
+    TickerPrices,
+    ToolError,
+    WalletBalance,
+    dump,
+    significant,
 )
+from crypt_agent.tools.session import get_session
+from crypt_agent.tools.tickers import ticker_snapshot
+
+# Maximum number of parallel kline fetches for batched tools
+KLINE_FETCH_WORKERS = int(os.getenv("CRYPT_AGENT_KLINE_WORKERS", "8"))
+
+# Running RSI/MACD state per symbol/interval for calculate_technical_indicators
+indicator_states = IndicatorStates()
+
+# Contracts with less 24h turnover (USDT) are left out of market scans
+SCAN_MIN_TURNOVER = float(os.getenv("CRYPT_AGENT_SCAN_MIN_TURNOVER", "1000000"))
+
+# Candles synced less than this many seconds ago are reused by market scans
+SCAN_MAX_AGE = float(os.getenv("CRYPT_AGENT_SCAN_MAX_AGE", "60"))
+
+
+def load_klines(symbol: str, interval: str, limit: int = 100, max_age: float = 0):
+    """Returns the latest `limit` candles (oldest first), from the live stream
+    when it has them, otherwise from the incrementally synced kline store
+    (without a request if synced less than `max_age` seconds ago)."""
+    if market_stream_enabled:
+        rows = market_stream.klines(symbol, interval, limit)
+        if rows is not None:
+            return rows
+    rows = kline_store.sync(get_session(), symbol=symbol, interval=interval, category="linear", limit=limit, max_age=max_age)
+    if market_stream_enabled:
+        market_stream.watch_klines(symbol, interval, rows)
+    return rows
+
+def load_tickers(symbols: List[str], category: str = "linear") -> dict:
+    """Returns symbol -> ticker for the requested symbols (missing ones are
+    left out), from the live stream when possible, otherwise the snapshot."""
+    tickers = {}
+    if market_stream_enabled and category == "linear":
+        for symbol in symbols:
+            ticker = market_stream.ticker(symbol)
+            if ticker is not None:
+                tickers[symbol] = ticker
+        market_stream.watch_ticker([symbol for symbol in symbols if symbol not in tickers])
+    if len(tickers) < len(symbols):
+        table = ticker_snapshot.table(get_session(), category=category)
+        tickers.update({symbol: table[symbol] for symbol in symbols if symbol not in tickers and symbol in table})
+    return tickers
+
+def ticker_prices(symbols: List[str], category: str = "linear") -> TickerPrices:
+    """Last prices of the symbols; symbols not listed in the category are reported as missing."""
+    table = load_tickers(symbols, category=category)
+    prices = {symbol: float(table[symbol]['lastPrice']) for symbol in symbols if symbol in table}
+    missing = [symbol for symbol in symbols if symbol not in table]
+    return TickerPrices(category=category, prices=prices, missing=missing or None)
+
+def kline_summary(symbol: str, interval: str, rows) -> KlineSummary:
+    """Summarizes candle rows (kline_store layout) into a KlineSummary."""
+    if not len(rows):
+        raise ValueError(f"no kline data for {symbol}")
+    features = kline_features(rows[:, 2], rows[:, 3], rows[:, 4], rows[:, 5])
+    return KlineSummary.from_features(symbol, interval, len(rows), features)
 
 @tool("get_latest_klines")
-def get_latest_klines(symbol="BTCUSDT", interval="1"):
-    """ Fetches the latest kline for the specified coin
+@instrumented("get_latest_klines")
+def get_latest_klines(symbol: str = "BTCUSDT", interval: str = "1", mode: str = "summary", points: int = 0):
+    """ Fetches the latest 100 klines for the specified coin
         
         Required args:
             symbol (string): symbol Name.
             interval (string): kline interval. 1,3,5,15,30,60,120,240,360,720,D,M,W
-
-        Returns results as dictionary
+            mode (string): "summary" (default) returns derived features: returns over
+                1/5/15/60 candles, ATR, volume z-score, high/low range and VWAP.
+                "raw" returns the candles oldest first as JSON columns:
+                timestamp, open, high, low, close, volume
+            points (int): raw mode only, merge candles so at most this many are
+                returned (0 returns all 100)
     """
-    # Use pybit to get kline data
-    return session.get_kline(category="linear", symbol=symbol, limit=100, interval=interval)
+    try:
+        # Serve from the local candle store, only syncing candles newer than the last stored one
+        rows = load_klines(symbol, interval, limit=100)
+        if mode == "raw":
+            return dump(KlineColumns.from_rows(symbol, str(interval), downsample_rows(rows, int(points or 0))))
+        return dump(kline_summary(symbol, str(interval), rows))
+    except Exception as e:
+        return dump(ToolError(message=str(e)))
 
 @tool("calculate_technical_indicators")
-def calculate_technical_indicators(symbol: str):
+@instrumented("calculate_technical_indicators")
+def calculate_technical_indicators(symbol: str, interval: str = "15", rsi_window: int = 14,
+                                   macd_fast: int = 12, macd_slow: int = 26, macd_signal: int = 9):
     """
         Fetches historical kline data for a symbol and calculates 
-        RSI and MACD indicators using pandas.
+        RSI and MACD indicators incrementally.
 
         Required args:
             symbol (string): symbol Name.
-            interval (string): kline interval. 1,3,5,15,30,60,120,240,360,720,D,M,W
+            interval (string): kline interval, "15" unless told otherwise. 1,3,5,15,30,60,120,240,360,720,D,M,W
+            rsi_window (int): RSI window, 14 unless told otherwise
+            macd_fast, macd_slow, macd_signal (int): MACD spans, 12, 26 and 9 unless told otherwise
     """
+    interval = str(interval)
     try:
-        # 1. Fetch 100 candles (enough for RSI-14 and MACD-26)
-        kline_data = session.get_kline(
-            category="linear",
+        settings = IndicatorSettings(rsi_window, macd_fast, macd_slow, macd_signal)
+
+        # 1. Fetch enough candles for the RSI window and the MACD spans from the stream or the local store
+        rows = load_klines(symbol, interval=interval, limit=settings.candles_needed)
+
+        # 2. Apply only the candles closed since the last call to the running
+        # RSI / MACD state, then evaluate the forming candle
+        latest = indicator_states.latest(symbol, interval, rows, settings)
+
+        return dump(IndicatorResult(
             symbol=symbol,
-            interval="15", # 15-minute timeframe
-            limit=100
+            interval=interval,
+            current_price=latest['current_price'],
+            rsi=round(latest['rsi'], 2),
+            macd_value=round(latest['macd'], 4),
+            macd_signal=round(latest['signal'], 4),
+            macd_histogram=round(latest['histogram'], 4),
+        ))
+
+    except Exception as e:
+        return dump(IndicatorResult(symbol=symbol, interval=interval, status="error", message=str(e)))
+
+def batch_indicators(symbols: List[str], intervals: List[str] = None, settings: IndicatorSettings = None) -> List[IndicatorResult]:
+    """Computes RSI and MACD (RSI(14) / MACD(12, 26, 9) by default) for every
+    symbol/interval pair, fetching klines concurrently and evaluating all pairs
+    in one vectorized pass. Plain function behind calculate_batch_indicators,
+    also used outside the agents."""
+    settings = settings or IndicatorSettings()
+    pairs = [(symbol, str(interval)) for symbol in symbols for interval in (intervals or ["15"])]
+    if not pairs:
+        return []
+
+    def fetch(pair):
+        symbol, interval = pair
+        try:
+            return load_klines(symbol, interval, limit=settings.candles_needed)
+        except Exception as e:
+            return e
+
+    # 1. Fetch the candles of every pair concurrently
+    with ThreadPoolExecutor(max_workers=min(KLINE_FETCH_WORKERS, len(pairs))) as pool:
+        fetched = list(pool.map(in_context(fetch), pairs))
+
+    # 2. Compute the indicators for all pairs in one vectorized pass
+    ok = [i for i, rows in enumerate(fetched) if not isinstance(rows, Exception) and len(rows)]
+    latest = latest_indicators(stack_series([fetched[i][:, 4] for i in ok]), settings) if ok else {}
+    row_of = {i: j for j, i in enumerate(ok)}
+
+    # 3. Build the per-pair results in input order
+    results = []
+    for i, (symbol, interval) in enumerate(pairs):
+        if i not in row_of:
+            error = fetched[i] if isinstance(fetched[i], Exception) else "no kline data"
+            results.append(IndicatorResult(symbol=symbol, interval=interval, status="error", message=str(error)))
+            continue
+        j = row_of[i]
+        results.append(IndicatorResult(
+            symbol=symbol,
+            interval=interval,
+            current_price=float(latest["current_price"][j]),
+            rsi=round(float(latest["rsi"][j]), 2),
+            macd_value=round(float(latest["macd"][j]), 4),
+            macd_signal=round(float(latest["signal"][j]), 4),
+            macd_histogram=round(float(latest["histogram"][j]), 4),
+        ))
+    return results
+
+def scan_market(top_n: int = 10, interval: str = "15", side: str = "long") -> MarketScan:
+    """
+    Ranks every trading USDT perpetual by momentum and returns the top `top_n`.
+
+    One ticker snapshot and one instrument index cover the whole market; the
+    candles of every liquid contract are loaded concurrently and all metrics
+    are computed for all contracts at once. The still-forming candle is
+    closed at the snapshot's last price.
+    """
+    session = get_session()
+    tickers = ticker_snapshot.table(session, category="linear")
+    instruments = instrument_cache.all(session)
+    symbols = [
+        symbol for symbol, info in instruments.items()
+        if info.get('status') == "Trading"
+        and info.get('contractType', "LinearPerpetual") == "LinearPerpetual"
+        and info.get('quoteCoin', "USDT") == "USDT"
+        and symbol in tickers
+        and float(tickers[symbol].get('turnover24h') or 0) >= SCAN_MIN_TURNOVER
+    ]
+    if not symbols:
+        return MarketScan(interval=str(interval), side=side, scanned=0, candidates=[])
+
+    def fetch(symbol):
+        try:
+            return load_klines(symbol, str(interval), limit=50, max_age=SCAN_MAX_AGE)
+        except Exception:
+            return np.empty((0, 7))
+
+    # 1. Load the candles of every contract concurrently (mostly local once synced)
+    with ThreadPoolExecutor(max_workers=min(KLINE_FETCH_WORKERS, len(symbols))) as pool:
+        fetched = list(pool.map(in_context(fetch), symbols))
+
+    # 2. Stack all contracts and compute every metric in one pass
+    last_price = np.array([float(tickers[symbol]['lastPrice']) for symbol in symbols])
+    high, low, close, volume = (stack_series([rows[:, column] for rows in fetched]) for column in (2, 3, 4, 5))
+    close[:, -1] = np.where(np.isnan(close[:, -1]), np.nan, last_price)
+    features = kline_features(high, low, close, volume, horizons=(4, 16))
+    metrics = {
+        "return_short": features["returns"][4],
+        "return_long": features["returns"][16],
+        "change_24h": np.array([float(tickers[symbol].get('price24hPcnt') or "nan") for symbol in symbols]),
+        "volume_z": features["volume_z"],
+        "turnover": np.array([float(tickers[symbol].get('turnover24h') or 0) for symbol in symbols]),
+        "atr_pct": features["atr_pct"],
+    }
+    ranked = dict(metrics)
+    if side == "short":
+        # Falling contracts rank highest on the return metrics
+        for name in ("return_short", "return_long", "change_24h"):
+            ranked[name] = -metrics[name]
+    scores = momentum_scores(ranked)
+    rsi_values = rsi(close)[:, -1]
+
+    # 3. Keep the top N
+    top = np.argsort(-scores, kind="stable")[:max(1, int(top_n))]
+    candidates = [
+        ScanCandidate(
+            symbol=symbols[i],
+            score=round(float(scores[i]), 4),
+            last_price=float(last_price[i]),
+            change_24h=significant(metrics["change_24h"][i]),
+            turnover_24h=significant(metrics["turnover"][i]),
+            return_short=significant(metrics["return_short"][i]),
+            return_long=significant(metrics["return_long"][i]),
+            rsi=significant(rsi_values[i], 4),
+            volume_z=significant(metrics["volume_z"][i], 4),
+            atr_pct=significant(metrics["atr_pct"][i], 4),
         )
-        
-        # 2. Extract the list of candles from the Bybit response
-        # Bybit returns: [startTime, open, high, low, close, volume, turnover]
-        raw_list = kline_data['result']['list']
-        
-        # 3. Create a Pandas DataFrame
-        df = pd.DataFrame(raw_list, columns=[
-            'timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover'
-        ])
-        
-        # Convert 'close' to numeric (Bybit returns strings)
-        df['close'] = pd.to_numeric(df['close'])
-        
-        # Bybit returns data from NEWEST to OLDEST, we need to flip it for pandas
-        df = df.iloc[::-1].reset_index(drop=True)
-
-        # 4. CALCULATE RSI (14-period)
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['rsi'] = 100 - (100 / (1 + rs))
-
-        # 5. CALCULATE MACD (12, 26, 9)
-        exp1 = df['close'].ewm(span=12, adjust=False).mean()
-        exp2 = df['close'].ewm(span=26, adjust=False).mean()
-        df['macd'] = exp1 - exp2
-        df['signal'] = df['macd'].ewm(span=9, adjust=False).mean()
-        df['histogram'] = df['macd'] - df['signal']
-
-        # 6. Get the most recent values (the last row)
-        latest = df.iloc[-1]
-        
-        return {
-            "symbol": symbol,
-            "current_price": latest['close'],
-            "rsi": round(latest['rsi'], 2),
-            "macd_value": round(latest['macd'], 4),
-            "macd_signal": round(latest['signal'], 4),
-            "macd_histogram": round(latest['histogram'], 4),
-            "status": "success"
-        }
+        for i in top
+    ]
+    return MarketScan(interval=str(interval), side=side, scanned=len(symbols), candidates=candidates)
+
+@tool("scan_market_momentum")
+@instrumented("scan_market_momentum")
+def scan_market_momentum(top_n: int = 10, interval: str = "15", side: str = "long"):
+    """
+        Scans every liquid Bybit USDT perpetual in one call and returns the top
+        momentum coins, ranked on short/long returns, 24h change, volume surge,
+        turnover and volatility. Use this before researching individual coins.
 
+        Required args:
+            top_n (int): number of coins to return, e.g. 10
+            interval (string): candle interval of the momentum metrics, default "15"
+            side (string): "long" ranks rising coins first, "short" falling ones
+    """
+    try:
+        return dump(scan_market(top_n, interval, side))
     except Exception as e:
-        return {"status": "error", "message": str(e)}
+        return dump(ToolError(message=str(e)))
+
+@tool("calculate_batch_indicators")
+@instrumented("calculate_batch_indicators")
+def calculate_batch_indicators(symbols: List[str], intervals: List[str] = None):
+    """
+        Calculates RSI and MACD for several symbols (and intervals) in a single call.
+        Use this instead of calling calculate_technical_indicators once per coin.
+
+        Required args:
+            symbols (list): symbol names, e.g. ["BTCUSDT", "ETHUSDT"]
+            intervals (list): kline intervals, defaults to ["15"]. 1,3,5,15,30,60,120,240,360,720,D,M,W
+
+        Returns one result per symbol/interval pair.
+    """
+    return dump(IndicatorBatch(results=batch_indicators(symbols, intervals)))
 
 @tool("math_calculator")
+@instrumented("math_calculator")
 def math_tool(expression: str) -> str:
     """Evaluates a mathematical expression and returns the result."""
     try:
@@ -103,26 +316,36 @@ def math_tool(expression: str) -> str:
 
 
 @tool("request_demo_funds")
+@instrumented("request_demo_funds")
 def request_demo_funds() -> str:
     """Requests demo trading funds for the Unified Trading Account."""
     try:
-        response = session.request_demo_trading_funds()
+        response = get_session().request_demo_trading_funds()
         return f"Demo Trading Funds Response: {response['result']}"
     except Exception as e:
         return f"Error requesting demo funds: {str(e)}"
 
 @tool("check_wallet_balance")
+@instrumented("check_wallet_balance")
 def check_wallet_balance(coin: str = "USDT") -> str:
     """Checks the balance of a specific coin in the Unified Trading Account."""
     try:
-        response = session.get_wallet_balance(accountType="UNIFIED", coin=coin)
+        response = get_session().get_wallet_balance(accountType="UNIFIED", coin=coin)
         data = response['result']['list'][0]['coin'][0]
-        return f"Current {coin} Balance: {data['walletBalance']}"
+        return dump(WalletBalance(coin=coin, wallet_balance=float(data['walletBalance'])))
     except Exception as e:
-        return f"Error fetching balance: {str(e)}"
+        return dump(ToolError(message=f"Error fetching balance: {str(e)}"))
+
+
+def _positive_quantity(quantity) -> bool:
+    try:
+        return Decimal(str(quantity)) > 0
+    except ArithmeticError:
+        return False
 
 
 @tool("execute_multiple_orders")
+@instrumented("execute_multiple_orders")
 def execute_multiple_orders(orders: List[dict]):
     """
     Receives an array of order objects and executes them.
@@ -133,23 +356,46 @@ def execute_multiple_orders(orders: List[dict]):
             - side (string): "Buy" or "Sell"
             - quantity (string): Order quantity
     """
-    results = []
-    for order in orders:
+    if not orders:
+        return dump(OrderBatch.from_results([]))
+
+    results = [None] * len(orders)
+    pending = []
+    for index, order in enumerate(orders):
+        result = OrderResult(symbol=str(order.get('symbol')), status="error",
+                             side=order.get('side'), qty=str(order.get('quantity')))
         try:
-            response = session.place_order(
-                category="linear",
-                symbol=order['symbol'],
-                side=order['side'],
-                orderType="Market",
-                qty=order['quantity'],
-            )
-            results.append(f"Success: {order['symbol']} OrderID: {response['result']['orderId']}")
+            if not order.get('symbol'):
+                result.message = "symbol is required."
+            elif order.get('side') not in ("Buy", "Sell"):
+                result.message = "side must be Buy or Sell."
+            elif not _positive_quantity(order.get('quantity')):
+                result.message = "quantity must be a positive number."
+            else:
+                # Validate against the cached instrument list (no extra round-trip)
+                instrument_info = instrument_cache.get(get_session(), order['symbol'])
+                if instrument_info is None:
+                    result.message = "not a valid Bybit symbol for the linear category."
+                elif instrument_info['status'] != "Trading":
+                    result.message = f"currently {instrument_info['status']}."
+                else:
+                    pending.append(index)
         except Exception as e:
-            results.append(f"Failed: {order['symbol']} Error: {str(e)}")
-    
-    return "\n".join(results)
+            result.message = str(e)
+        results[index] = result
+
+    # Valid orders go out in concurrent batch requests; results keep the input order
+    placed = submit_orders([
+        {"symbol": orders[i]['symbol'], "side": orders[i]['side'], "orderType": "Market", "qty": str(orders[i]['quantity'])}
+        for i in pending
+    ])
+    for index, result in zip(pending, placed):
+        results[index] = result
+
+    return dump(OrderBatch.from_results(results))
 
 @tool("place_market_order")
+@instrumented("place_market_order")
 def place_market_order(symbol: str, side: str, qty: str,  tp_price: str, sl_price: str, category: str = "linear" ) -> str:
     """This method supports to place order for spot and linear.
         
@@ -160,39 +406,45 @@ def place_market_order(symbol: str, side: str, qty: str,  tp_price: str, sl_pric
             tp_price(string): Take profit price (e.g., "70000.50")
             sl_price(string): Stop loss price (e.g., "65000.00")
     """
+    result = OrderResult(symbol=symbol, status="error", side=side, qty=str(qty))
     try:
-        # 1. SYMBOL VALIDATION (The Failsafe)
-        instruments = session.get_instruments_info(
-            category="linear",
-            symbol=symbol
-        )
-        
-        # Check if the result list is empty (symbol doesn't exist)
-        if not instruments['result']['list']:
-            return f"Error: '{symbol}' is not a valid Bybit symbol for the linear category."
-        
-        instrument_info = instruments['result']['list'][0]
-        
+        # 1. SYMBOL VALIDATION (The Failsafe) from the shared instrument cache
+        instrument_info = instrument_cache.get(get_session(), symbol)
+
+        # Check if the symbol doesn't exist
+        if instrument_info is None:
+            result.message = f"'{symbol}' is not a valid Bybit symbol for the linear category."
+            return dump(result)
+
         # Check if the coin is currently tradable
         if instrument_info['status'] != "Trading":
-            return f"Error: {symbol} exists but is currently {instrument_info['status']}."
-        response = session.place_order(
-            category=category,
-            symbol=symbol,
-            side=side,
-            orderType="Market",
-            qty=qty,
-            takeProfit=tp_price, # e.g., "70000.50"
-            stopLoss=sl_price,   # e.g., "65000.00"
-            tpTriggerBy="MarkPrice", # Recommended for safety
-            slTriggerBy="MarkPrice",
-            tpslMode="Full", # Entire position closes when hit
-        )
-        return f"Success! {side} {qty} {symbol}. Order ID: {response['result']['orderId']}"
+            result.message = f"{symbol} exists but is currently {instrument_info['status']}."
+            return dump(result)
+        with order_rate_limiter.request():
+            response = get_session().place_order(
+                category=category,
+                symbol=symbol,
+                side=side,
+                orderType="Market",
+                qty=qty,
+                takeProfit=tp_price, # e.g., "70000.50"
+                stopLoss=sl_price,   # e.g., "65000.00"
+                tpTriggerBy="MarkPrice", # Recommended for safety
+                slTriggerBy="MarkPrice",
+                tpslMode="Full", # Entire position closes when hit
+            )
+        result.status = "success"
+        result.order_id = response['result']['orderId']
+    except InvalidRequestError as e:
+        # Rejected by the exchange: the cached metadata may be stale
+        instrument_cache.invalidate()
+        result.message = f"Trade failed: {str(e)}"
     except Exception as e:
-        return f"Trade failed: {str(e)}"
+        result.message = f"Trade failed: {str(e)}"
+    return dump(result)
 
 @tool("fetch_ticker_price")
+@instrumented("fetch_ticker_price")
 def fetch_ticker_price(symbol: str, category: str = "linear") -> str:
     """Fetches real-time price of a ticker.
 
@@ -201,18 +453,31 @@ def fetch_ticker_price(symbol: str, category: str = "linear") -> str:
             symbol(string): symbol name
     """
     try:
-        response = session.get_tickers(category=category, symbol=symbol)
-        price = response['result']['list'][0]['lastPrice']
-        return f"Current price of {symbol}: {price}"
+        # Served from the live stream or the shared all-tickers snapshot (one request per TTL)
+        return dump(ticker_prices([symbol], category=category))
     except Exception as e:
-        return f"Error: {str(e)}"
+        return dump(ToolError(message=str(e)))
+
+@tool("fetch_ticker_prices")
+@instrumented("fetch_ticker_prices")
+def fetch_ticker_prices(symbols: List[str], category: str = "linear") -> str:
+    """Fetches real-time prices of several tickers in a single call.
+
+        Required args:
+            symbols(list): symbol names, e.g. ["BTCUSDT", "ETHUSDT"]
+            category(string): spot, linear
+    """
+    try:
+        return dump(ticker_prices(symbols, category=category))
+    except Exception as e:
+        return dump(ToolError(message=str(e)))
 
 if __name__ == "__main__":
 
 
     print(f'ENV keys: {os.getenv("BYBIT_DEMO_API_KEY")}, {os.getenv("BYBIT_DEMO_API_SECRET")}')
     coin = "USDT"
-    response = session.get_wallet_balance(accountType="UNIFIED", coin=coin)
+    response = get_session().get_wallet_balance(accountType="UNIFIED", coin=coin)
     data = response['result']['list'][0]['coin'][0]
     print(f"Current {coin} Balance: {data['walletBalance']}")
 
@@ -228,12 +493,94 @@ if __name__ == "__main__":
 
 
 
+def plan_slices(total_qty: float, max_qty: str, min_qty: str, qty_step: str) -> List[Decimal]:
+    """Splits `total_qty` (rounded down to `qty_step`) into the fewest slices
+    of at most `max_qty`, as even as the step allows. Returns no slices when
+    the rounded quantity is below `min_qty`, or when even slices would be
+    (no split into slices of at least `min_qty` exists then)."""
+    step = Decimal(qty_step)
+    steps = int(Decimal(str(total_qty)) / step)
+    if steps <= 0 or steps * step < Decimal(min_qty):
+        return []
+    count = -(-steps // max(1, int(Decimal(max_qty) / step)))
+    base, extra = divmod(steps, count)
+    if base * step < Decimal(min_qty):
+        return []
+    return [(base + (i < extra)) * step for i in range(count)]
+
+
+def sliced_execution(symbol: str, side: str, total_qty: float, tp_price: str, sl_price: str,
+                     via_batch: bool = None, progress=print) -> SlicedExecution:
+    """
+    Executes a market order as exchange-sized slices, submitted concurrently
+    through `orders.submit_orders` (in batch requests unless `via_batch` is
+    False or BYBIT_BATCH_ORDERS=0). `progress` receives a line per completed
+    slice; once the exchange rejects a slice, slices not sent yet are skipped.
+    """
+    started = time.perf_counter()
+    via_batch = BATCH_ORDERS if via_batch is None else via_batch
+    execution = SlicedExecution(symbol=symbol, side=side, status="error", total_qty=total_qty)
+    instrument = instrument_cache.get(get_session(), symbol)
+    if instrument is None:
+        execution.message = f"{symbol} not found."
+        return execution
+
+    # Market orders are capped by maxMktOrderQty; maxOrderQty only applies to limit orders
+    lot_filter = instrument['lotSizeFilter']
+    max_qty = lot_filter.get('maxMktOrderQty') or lot_filter['maxOrderQty']
+    slices = plan_slices(total_qty, max_qty, lot_filter['minOrderQty'], lot_filter['qtyStep'])
+    if not slices:
+        if Decimal(str(total_qty)) < Decimal(lot_filter['minOrderQty']):
+            execution.message = f"Quantity {total_qty} is below the minimum required ({lot_filter['minOrderQty']})."
+        else:
+            execution.message = (f"Quantity {total_qty} cannot be split into market orders of "
+                                 f"{lot_filter['minOrderQty']} to {max_qty}.")
+        return execution
+
+    progress(f"Executing total {side} order for {sum(slices)} {symbol} in {len(slices)} slices "
+             f"(max {max_qty} per market order{', batched' if via_batch else ''})")
+    orders = [{
+        "symbol": symbol,
+        "side": side,
+        "orderType": "Market",
+        "qty": str(qty),
+        "takeProfit": tp_price,  # e.g., "70000.50"
+        "stopLoss": sl_price,    # e.g., "65000.00"
+        "tpTriggerBy": "MarkPrice",  # Recommended for safety
+        "slTriggerBy": "MarkPrice",
+        "tpslMode": "Full",  # Entire position closes when hit
+    } for qty in slices]
+    lock = threading.Lock()
+    filled = [Decimal(0), 0]
+
+    def report(index, result):
+        with lock:
+            filled[1] += 1
+            if result.status == "success":
+                filled[0] += slices[index]
+            progress(f"{symbol} slice {filled[1]}/{len(slices)} {result.status}: "
+                     f"{filled[0]}/{sum(slices)} filled ({filled[0] / sum(slices):.0%})")
+
+    results = submit_orders(orders, via_batch=via_batch, stop_on_reject=True, on_result=report)
+    execution.slices = results
+    execution.executed_qty = float(filled[0])
+    execution.fill_ratio = round(float(filled[0]) / total_qty, 6) if total_qty else 0.0
+    succeeded = sum(1 for result in results if result.status == "success")
+    execution.status = "success" if succeeded == len(results) else "partial" if succeeded else "error"
+    if execution.status != "success":
+        execution.message = f"{len(results) - succeeded} of {len(results)} slices failed."
+    execution.elapsed_s = round(time.perf_counter() - started, 3)
+    return execution
+
+
 @tool("advanced_sliced_executor")
+@instrumented("advanced_sliced_executor")
 def advanced_sliced_executor(symbol: str, side: str, total_qty: float, tp_price: str, sl_price: str):
     """
     Executes trades on Bybit Perpetuals. If the total_qty exceeds the 
     exchange's maximum allowed per order, it automatically slices the 
-    trade into multiple valid orders.
+    trade into multiple valid orders, submitted concurrently, and reports
+    how much of the total was filled.
 
         Required args:
             symbol(string): symbol name
@@ -243,60 +590,12 @@ def advanced_sliced_executor(symbol: str, side: str, total_qty: float, tp_price:
             sl_price(string): Stop loss price (e.g., "65000.00")
     """
     try:
-        # 1. Fetch the max limits for the specific coin
-        instrument = session.get_instruments_info(
-            category="linear",
-            symbol=symbol
-        )
-        
-        if not instrument['result']['list']:
-            return f"Error: {symbol} not found."
-
-        lot_filter = instrument['result']['list'][0]['lotSizeFilter']
-        max_order_qty = float(lot_filter['maxOrderQty'])
-        min_order_qty = float(lot_filter['minOrderQty'])
-        
-        # 2. Safety Check: Is the order too small?
-        if total_qty < min_order_qty:
-            return f"Failed: Quantity {total_qty} is below the minimum required ({min_order_qty})."
-
-        # 3. Execution Logic: Slicing the Order
-        orders_executed = []
-        remaining_qty = total_qty
-        
-        print(f"Executing total {side} order for {total_qty} {symbol}. Max per order: {max_order_qty}")
-
-        while remaining_qty > 0:
-            # Determine size for this specific slice
-            current_slice_qty = min(remaining_qty, max_order_qty)
-            
-            # Place the order slice
-            order = session.place_order(
-                category="linear",
-                symbol=symbol,
-                side=side,
-                orderType="Market",
-                qty=current_slice_qty,
-                takeProfit=tp_price, # e.g., "70000.50"
-                stopLoss=sl_price,   # e.g., "65000.00"
-                tpTriggerBy="MarkPrice", # Recommended for safety
-                slTriggerBy="MarkPrice",
-                tpslMode="Full", # Entire position closes when hit
-                timeInForce="GTC"
-            )
-            
-            order_id = order['result']['orderId']
-            orders_executed.append(f"{current_slice_qty} units (ID: {order_id})")
-            
-            # Update remaining amount
-            remaining_qty -= current_slice_qty
-            
-            # Small sleep to prevent hitting rate limits during rapid slicing
-            if remaining_qty > 0:
-                time.sleep(0.1) 
-
-        return f"SUCCESS: Fully executed {total_qty} {symbol} in {len(orders_executed)} slices:\n" + "\n".join(orders_executed)
-
+        return dump(sliced_execution(symbol, side, total_qty, tp_price, sl_price))
+    except InvalidRequestError as e:
+        # Rejected by the exchange: the cached metadata may be stale
+        instrument_cache.invalidate()
+        return dump(SlicedExecution(symbol=symbol, side=side, status="error", total_qty=total_qty,
+                                    message=f"CRITICAL FAILURE: {str(e)}"))
     except Exception as e:
-        return f"CRITICAL FAILURE: {str(e)}"
-
+        return dump(SlicedExecution(symbol=symbol, side=side, status="error", total_qty=total_qty,
+                                    message=f"CRITICAL FAILURE: {str(e)}"))
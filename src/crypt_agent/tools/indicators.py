@@ -0,0 +1,353 @@
+import threading
+import time
+import warnings
+from collections import deque
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from crypt_agent.tools.kline_store import contiguous, next_open_ms
+
+
+@dataclass(frozen=True)
+class IndicatorSettings:
+    """RSI window and MACD spans; the defaults are the classic RSI(14) / MACD(12, 26, 9)."""
+
+    rsi_window: int = 14
+    macd_fast: int = 12
+    macd_slow: int = 26
+    macd_signal: int = 9
+
+    def __post_init__(self):
+        if min(self.rsi_window, self.macd_fast, self.macd_slow, self.macd_signal) < 1:
+            raise ValueError("Indicator windows must be positive")
+        if self.macd_fast >= self.macd_slow:
+            raise ValueError("macd_fast must be shorter than macd_slow")
+
+    @property
+    def candles_needed(self) -> int:
+        """Candles to load so RSI is defined and the EMAs have mostly converged."""
+        return max(100, self.rsi_window + 1, 3 * (self.macd_slow + self.macd_signal))
+
+
+def stack_series(series_list) -> np.ndarray:
+    """Stacks 1-D series of different lengths into a 2-D array (one row per
+    series), aligned on the most recent value and left-padded with NaN."""
+    length = max((len(s) for s in series_list), default=0)
+    out = np.full((len(series_list), length), np.nan)
+    for i, s in enumerate(series_list):
+        if len(s):
+            out[i, length - len(s):] = s
+    return out
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing rolling mean along the last axis (NaN until `window` values are seen)."""
+    values = np.atleast_2d(values)
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] < window:
+        return out
+    csum = np.cumsum(values, axis=1)
+    out[:, window - 1] = csum[:, window - 1]
+    out[:, window:] = csum[:, window:] - csum[:, :-window]
+    out[:, window - 1:] /= window
+    return out
+
+
+def ewm_mean(values: np.ndarray, span: int) -> np.ndarray:
+    """Exponential moving average along the last axis, equivalent to pandas'
+    `ewm(span=span, adjust=False).mean()` applied to every row. Leading NaNs
+    are skipped and gaps carry the previous average forward."""
+    values = np.atleast_2d(values)
+    alpha = 2.0 / (span + 1.0)
+    out = np.empty(values.shape)
+    state = np.full(values.shape[0], np.nan)
+    for t in range(values.shape[1]):
+        x = values[:, t]
+        state = np.where(
+            np.isnan(state), x,
+            np.where(np.isnan(x), state, alpha * x + (1.0 - alpha) * state),
+        )
+        out[:, t] = state
+    return out
+
+
+def rsi(close: np.ndarray, window: int = 14) -> np.ndarray:
+    """Simple-moving-average RSI for every row of `close` (same definition as
+    the pandas rolling version used by calculate_technical_indicators)."""
+    close = np.atleast_2d(close)
+    delta = np.diff(close, axis=1, prepend=np.nan)
+    # Like pandas' `where`, the undefined first difference counts as zero
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    avg_gain = rolling_mean(gain, window)
+    avg_loss = rolling_mean(loss, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 100 - (100 / (1 + avg_gain / avg_loss))
+    # Padded rows only get a value once `window` real closes are available
+    enough = rolling_mean(np.isfinite(close).astype(float), window) == 1.0
+    out[~enough] = np.nan
+    return out
+
+
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9):
+    """Returns (macd, signal, histogram) arrays for every row of `close`."""
+    close = np.atleast_2d(close)
+    macd_line = ewm_mean(close, fast) - ewm_mean(close, slow)
+    signal_line = ewm_mean(macd_line, signal)
+    return macd_line, signal_line, macd_line - signal_line
+
+
+def latest_indicators(close: np.ndarray, settings: IndicatorSettings = None) -> dict:
+    """Computes RSI and MACD (RSI(14) / MACD(12, 26, 9) unless `settings` says
+    otherwise) for all rows in one pass and returns the most recent value of
+    each as 1-D arrays."""
+    settings = settings or IndicatorSettings()
+    close = np.atleast_2d(close)
+    rsi_values = rsi(close, settings.rsi_window)
+    macd_line, signal_line, histogram = macd(close, settings.macd_fast, settings.macd_slow, settings.macd_signal)
+    return {
+        "current_price": close[:, -1],
+        "rsi": rsi_values[:, -1],
+        "macd": macd_line[:, -1],
+        "signal": signal_line[:, -1],
+        "histogram": histogram[:, -1],
+    }
+
+
+def kline_features(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray,
+                   horizons=(1, 5, 15, 60), atr_window: int = 14, volume_window: int = 20) -> dict:
+    """
+    Summarizes candle series (one row per series, NaN left-padded as by
+    `stack_series`) into features at the most recent candle, as 1-D arrays:
+
+        returns:   {horizon: close / close `horizon` candles ago - 1}
+        atr:       mean true range of the last `atr_window` candles (atr_pct relative to close)
+        volume_z:  latest volume against the mean/std of the `volume_window` candles before it
+        range_*:   high/low of the whole window, its width relative to close and
+                   where the close sits in it (0 = at the low, 1 = at the high)
+        vwap:      volume-weighted typical price of the window (vwap_distance = close / vwap - 1)
+    """
+    high, low, close, volume = (np.atleast_2d(a) for a in (high, low, close, volume))
+    last = close[:, -1]
+    length = close.shape[1]
+
+    returns = {}
+    for horizon in horizons:
+        past = close[:, -1 - horizon] if horizon < length else np.full(len(close), np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns[horizon] = last / past - 1
+
+    prev_close = np.concatenate([np.full((len(close), 1), np.nan), close[:, :-1]], axis=1)
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    # NaN (not enough candles) unless the last `atr_window` candles are all real
+    atr = true_range[:, -atr_window:].mean(axis=1) if length >= atr_window else np.full(len(close), np.nan)
+
+    window = volume[:, -1 - volume_window:-1]
+    with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        volume_z = (volume[:, -1] - np.nanmean(window, axis=1)) / np.nanstd(window, axis=1)
+        range_high = np.nanmax(high, axis=1)
+        range_low = np.nanmin(low, axis=1)
+        typical = (high + low + close) / 3
+        vwap = np.nansum(typical * volume, axis=1) / np.nansum(np.where(np.isnan(typical), np.nan, volume), axis=1)
+        return {
+            "current_price": last,
+            "returns": returns,
+            "atr": atr,
+            "atr_pct": atr / last,
+            "volume_z": volume_z,
+            "range_high": range_high,
+            "range_low": range_low,
+            "range_pct": (range_high - range_low) / last,
+            "range_position": (last - range_low) / (range_high - range_low),
+            "vwap": vwap,
+            "vwap_distance": last / vwap - 1,
+        }
+
+
+# Weight of each metric's cross-sectional rank in the momentum score
+MOMENTUM_WEIGHTS = {
+    "return_short": 0.2,
+    "return_long": 0.2,
+    "change_24h": 0.15,
+    "volume_z": 0.15,
+    "turnover": 0.15,
+    "atr_pct": 0.15,
+}
+
+
+def percentile_rank(values: np.ndarray) -> np.ndarray:
+    """Ranks values across symbols into [0, 1] (1 = highest); NaN ranks 0."""
+    values = np.asarray(values, dtype=float)
+    finite = np.isfinite(values)
+    out = np.zeros(len(values))
+    if finite.sum() > 1:
+        ranks = np.argsort(np.argsort(values[finite], kind="stable"), kind="stable")
+        out[finite] = ranks / (finite.sum() - 1)
+    elif finite.any():
+        out[finite] = 1.0
+    return out
+
+
+def momentum_scores(metrics: dict, weights: dict = None) -> np.ndarray:
+    """Composite score per symbol: the weighted sum of each metric's percentile
+    rank across all symbols. Rank-based, so outliers and units do not matter."""
+    weights = weights or MOMENTUM_WEIGHTS
+    score = np.zeros(len(next(iter(metrics.values()))))
+    for name, weight in weights.items():
+        score += weight * percentile_rank(metrics[name])
+    return score / sum(weights.values())
+
+
+class IncrementalIndicators:
+    """
+    Streaming RSI and MACD for one symbol/interval.
+
+    Holds the last `rsi_window` gains/losses with their running sums and the
+    three EMA states, so each closed candle is applied in O(1). Values follow
+    the same definitions as `rsi` and `macd` above; seed the state from
+    history with `seed`, commit closed candles with `update` and evaluate the
+    still-forming candle with `peek`.
+    """
+
+    def __init__(self, rsi_window: int = 14, macd_fast: int = 12, macd_slow: int = 26, macd_signal: int = 9):
+        self.rsi_window = rsi_window
+        self.macd_fast = macd_fast
+        self.macd_slow = macd_slow
+        self.macd_signal = macd_signal
+        self.alpha_fast = 2.0 / (macd_fast + 1.0)
+        self.alpha_slow = 2.0 / (macd_slow + 1.0)
+        self.alpha_signal = 2.0 / (macd_signal + 1.0)
+        self.reset()
+
+    def reset(self):
+        self.last_close = None
+        self.last_timestamp = None
+        self._gains = deque(maxlen=self.rsi_window)
+        self._losses = deque(maxlen=self.rsi_window)
+        self._gain_sum = 0.0
+        self._loss_sum = 0.0
+        self._updates = 0
+        self._ema_fast = None
+        self._ema_slow = None
+        self._ema_signal = None
+
+    def seed(self, closes, timestamps=None):
+        """Resets the state and replays a history of closed candles (oldest first)."""
+        self.reset()
+        for i, close in enumerate(closes):
+            self.update(close, timestamps[i] if timestamps is not None else None)
+        return self
+
+    def _step(self, close):
+        """Returns the state that results from appending `close`, without committing it."""
+        # Like the vectorized version, the first difference counts as zero
+        delta = 0.0 if self.last_close is None else close - self.last_close
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        gain_sum, loss_sum = self._gain_sum + gain, self._loss_sum + loss
+        if len(self._gains) == self.rsi_window:
+            gain_sum -= self._gains[0]
+            loss_sum -= self._losses[0]
+
+        if self._ema_fast is None:
+            ema_fast = ema_slow = close
+        else:
+            ema_fast = self.alpha_fast * close + (1 - self.alpha_fast) * self._ema_fast
+            ema_slow = self.alpha_slow * close + (1 - self.alpha_slow) * self._ema_slow
+        macd_value = ema_fast - ema_slow
+        if self._ema_signal is None:
+            ema_signal = macd_value
+        else:
+            ema_signal = self.alpha_signal * macd_value + (1 - self.alpha_signal) * self._ema_signal
+        return gain, loss, gain_sum, loss_sum, ema_fast, ema_slow, ema_signal
+
+    def update(self, close, timestamp=None) -> dict:
+        """Commits one closed candle and returns the resulting indicator values."""
+        close = float(close)
+        gain, loss, self._gain_sum, self._loss_sum, self._ema_fast, self._ema_slow, self._ema_signal = self._step(close)
+        self._gains.append(gain)
+        self._losses.append(loss)
+        self._updates += 1
+        if self._updates % self.rsi_window == 0:
+            # Re-sum once per window so floating point drift never accumulates
+            self._gain_sum, self._loss_sum = sum(self._gains), sum(self._losses)
+        self.last_close = close
+        self.last_timestamp = timestamp
+        return self._values(close, len(self._gains), self._gain_sum, self._loss_sum,
+                            self._ema_fast, self._ema_slow, self._ema_signal)
+
+    def peek(self, close) -> dict:
+        """Returns the indicator values as if `close` were the next candle (state is unchanged)."""
+        close = float(close)
+        _, _, gain_sum, loss_sum, ema_fast, ema_slow, ema_signal = self._step(close)
+        return self._values(close, min(len(self._gains) + 1, self.rsi_window), gain_sum, loss_sum,
+                            ema_fast, ema_slow, ema_signal)
+
+    def current(self) -> dict:
+        """Returns the indicator values of the last committed candle."""
+        if self.last_close is None:
+            raise ValueError("Indicator state has not been seeded")
+        return self._values(self.last_close, len(self._gains), self._gain_sum, self._loss_sum,
+                            self._ema_fast, self._ema_slow, self._ema_signal)
+
+    def _values(self, close, count, gain_sum, loss_sum, ema_fast, ema_slow, ema_signal) -> dict:
+        if count < self.rsi_window or (gain_sum <= 0 and loss_sum <= 0):
+            rsi_value = float("nan")
+        elif loss_sum <= 0:
+            rsi_value = 100.0
+        else:
+            rsi_value = 100 - (100 / (1 + gain_sum / loss_sum))
+        macd_value = ema_fast - ema_slow
+        return {
+            "current_price": close,
+            "rsi": rsi_value,
+            "macd": macd_value,
+            "signal": ema_signal,
+            "histogram": macd_value - ema_signal,
+        }
+
+
+def _after_last_gap(rows: np.ndarray, interval: str) -> np.ndarray:
+    """The rows after the last gap, i.e. the newest contiguous run of candles."""
+    if len(rows) < 2:
+        return rows
+    gaps = np.flatnonzero(next_open_ms(rows[:-1, 0], interval) != rows[1:, 0])
+    return rows[gaps[-1] + 1:] if len(gaps) else rows
+
+
+class IndicatorStates:
+    """
+    One IncrementalIndicators per symbol/interval/settings, kept in sync with
+    candle rows in the KlineStore layout. Only candles closed since the previous call are
+    applied; a gap in the history re-seeds the state from the candles after it.
+    Monthly candles close at the next calendar month, like the KlineStore's.
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def latest(self, symbol: str, interval: str, rows: np.ndarray, settings: IndicatorSettings = None) -> dict:
+        """Returns the indicator values at the newest row (closed or still forming)."""
+        settings = settings or IndicatorSettings()
+        closed_count = int(np.searchsorted(next_open_ms(rows[:, 0], interval), time.time() * 1000, side="right"))
+        closed, forming = rows[:closed_count], rows[closed_count:]
+        key = (symbol, str(interval), settings)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = IncrementalIndicators(**asdict(settings))
+            if (
+                state.last_timestamp is None
+                or not len(closed)
+                or not closed[0, 0] <= state.last_timestamp <= closed[-1, 0]
+                # The candles to apply, from the last applied one, must not skip any
+                or not contiguous(closed[closed[:, 0] >= state.last_timestamp], interval)
+            ):
+                closed = _after_last_gap(closed, interval)
+                state.seed(closed[:, 4], closed[:, 0])
+            else:
+                for row in closed[closed[:, 0] > state.last_timestamp]:
+                    state.update(row[4], row[0])
+            return state.peek(forming[-1, 4]) if len(forming) else state.current()
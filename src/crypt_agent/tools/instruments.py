@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+
+
+class InstrumentCache:
+    """
+    In-memory index of Bybit instrument metadata (status, lotSizeFilter,
+    priceFilter, ...) keyed by symbol.
+
+    The whole category is bulk-loaded once through the paginated
+    get_instruments_info endpoint and reloaded when the TTL expires or after
+    `invalidate()` (e.g. when the exchange rejects an order).
+    """
+
+    def __init__(self, category: str = "linear", ttl: float = 3600, miss_refresh_interval: float = 60):
+        self.category = category
+        self.ttl = ttl
+        self.miss_refresh_interval = miss_refresh_interval
+        self._by_symbol = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _expired(self) -> bool:
+        # monotonic() starts near zero at boot, so "never loaded" is None rather than 0
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def refresh(self, session):
+        """Reloads every instrument of the category, following nextPageCursor."""
+        by_symbol = {}
+        cursor = None
+        while True:
+            params = {"category": self.category, "limit": 1000}
+            if cursor:
+                params["cursor"] = cursor
+            response = session.get_instruments_info(**params)
+            for item in response['result']['list']:
+                by_symbol[item['symbol']] = item
+            cursor = response['result'].get('nextPageCursor')
+            if not cursor:
+                break
+        self._by_symbol = by_symbol
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Forces a reload on the next lookup."""
+        self._loaded_at = None
+
+    def all(self, session) -> dict:
+        """Returns the symbol -> instrument index, loading it if needed."""
+        with self._lock:
+            if self._expired():
+                self.refresh(session)
+            return self._by_symbol
+
+    def get(self, session, symbol: str):
+        """Returns the instrument info for `symbol`, or None if Bybit does not list it.
+
+        An unknown symbol triggers at most one early reload per
+        `miss_refresh_interval` so newly listed contracts are picked up.
+        """
+        instrument = self.all(session).get(symbol)
+        if instrument is None:
+            with self._lock:
+                if self._loaded_at is None or time.monotonic() - self._loaded_at > self.miss_refresh_interval:
+                    self.refresh(session)
+                instrument = self._by_symbol.get(symbol)
+        return instrument
+
+
+# Shared linear instrument cache used by all order tools
+instrument_cache = InstrumentCache(
+    category="linear",
+    ttl=float(os.getenv("CRYPT_AGENT_INSTRUMENTS_TTL", "3600")),
+)
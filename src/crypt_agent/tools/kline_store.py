@@ -0,0 +1,271 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+# Bybit returns at most 1000 candles per get_kline request
+MAX_KLINE_LIMIT = 1000
+
+# Candle length in minutes per Bybit interval ("M" is approximated to 30 days)
+INTERVAL_MINUTES = {
+    "1": 1, "3": 3, "5": 5, "15": 15, "30": 30, "60": 60, "120": 120,
+    "240": 240, "360": 360, "720": 720, "D": 1440, "W": 10080, "M": 43200,
+}
+
+# Weekly candles open on Monday 00:00 UTC; the epoch was a Thursday
+WEEK_OFFSET_MS = 4 * 86_400_000
+
+# Column layout of a stored candle row, same order as Bybit's kline list
+COLUMNS = ("timestamp", "open", "high", "low", "close", "volume", "turnover")
+
+
+def interval_ms(interval: str) -> int:
+    """Returns the length of one candle of the given interval in milliseconds."""
+    try:
+        return INTERVAL_MINUTES[str(interval)] * 60_000
+    except KeyError:
+        raise ValueError(f"Unsupported kline interval: {interval}")
+
+
+def candle_open_ms(time_ms: float, interval: str) -> int:
+    """Open time of the candle of `interval` that contains `time_ms`, aligned
+    like Bybit's: weeks start on Monday and months on the 1st (UTC)."""
+    interval = str(interval)
+    if interval == "M":
+        return int(np.datetime64(int(time_ms), "ms").astype("datetime64[M]").astype("datetime64[ms]").astype("int64"))
+    period = interval_ms(interval)
+    offset = WEEK_OFFSET_MS if interval == "W" else 0
+    return int((time_ms - offset) // period * period + offset)
+
+
+def next_open_ms(open_ms, interval: str):
+    """Open time of the candle after the one opened at `open_ms` (a number or
+    an array); monthly candles follow the calendar."""
+    if str(interval) != "M":
+        return open_ms + interval_ms(interval)
+    opens = np.asarray(open_ms, dtype="int64").astype("datetime64[ms]")
+    following = (opens.astype("datetime64[M]") + 1).astype("datetime64[ms]").astype("int64")
+    return following if np.ndim(open_ms) else int(following)
+
+
+def contiguous(rows: np.ndarray, interval: str) -> bool:
+    """Whether the rows are consecutive candles of `interval`, without gaps."""
+    if len(rows) < 2:
+        return True
+    return bool(np.all(next_open_ms(rows[:-1, 0], interval) == rows[1:, 0]))
+
+
+def parse_kline_list(raw_list) -> np.ndarray:
+    """Converts Bybit's kline list (newest first, string fields) into an
+    oldest-first float array with the COLUMNS layout."""
+    if not raw_list:
+        return np.empty((0, len(COLUMNS)))
+    return np.asarray(raw_list, dtype=float)[::-1]
+
+
+def format_kline_rows(rows: np.ndarray) -> list:
+    """Converts stored rows back into Bybit's newest-first list of strings."""
+    return [
+        [str(int(row[0]))] + [np.format_float_positional(v, trim="-") for v in row[1:]]
+        for row in rows[::-1]
+    ]
+
+
+def downsample_rows(rows: np.ndarray, points: int) -> np.ndarray:
+    """Merges consecutive candles so at most `points` rows remain, each bucket
+    taking the first open time/open, the max high, min low, last close and the
+    summed volume/turnover. Buckets are aligned on the newest candle."""
+    if points <= 0 or len(rows) <= points:
+        return rows
+    factor = -(-len(rows) // points)
+    rows = rows[len(rows) % factor:] if len(rows) % factor else rows
+    buckets = rows.reshape(-1, factor, rows.shape[1])
+    return np.column_stack([
+        buckets[:, 0, 0],
+        buckets[:, 0, 1],
+        buckets[:, :, 2].max(axis=1),
+        buckets[:, :, 3].min(axis=1),
+        buckets[:, -1, 4],
+        buckets[:, :, 5].sum(axis=1),
+        buckets[:, :, 6].sum(axis=1),
+    ])
+
+
+class KlineStore:
+    """
+    Persistent on-disk candle store, one file per category/interval/symbol.
+
+    Candles are kept oldest first as a float array. `sync` only asks Bybit for
+    the candles starting at the last stored open time (which refreshes the
+    still-forming candle) and serves the rest of the history locally.
+    `backfill` pages backward through older history for offline use.
+
+    keep_frames: keep loaded candles in memory (disable for large histories
+        that are read once per run)
+    """
+
+    def __init__(self, root: str = None, max_rows: int = 5000, keep_frames: bool = True):
+        self.root = root or os.getenv("CRYPT_AGENT_KLINE_DIR", os.path.join(".cache", "klines"))
+        self.max_rows = max_rows
+        self.keep_frames = keep_frames
+        self._frames = {}
+        self._synced_at = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _path(self, category: str, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, category, str(interval), f"{symbol}.npy")
+
+    def _lock(self, key) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def load(self, symbol: str, interval: str, category: str = "linear") -> np.ndarray:
+        """Returns every stored candle for the key without touching the network."""
+        key = (category, symbol, str(interval))
+        rows = self._frames.get(key)
+        if rows is None:
+            path = self._path(*key)
+            rows = np.load(path) if os.path.exists(path) else np.empty((0, len(COLUMNS)))
+            if self.keep_frames:
+                self._frames[key] = rows
+        return rows
+
+    def save(self, symbol: str, interval: str, rows: np.ndarray, category: str = "linear"):
+        """Replaces the stored candles for the key (written atomically)."""
+        key = (category, symbol, str(interval))
+        rows = rows[-self.max_rows:]
+        path = self._path(*key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, rows)
+        os.replace(tmp_path, path)
+        if self.keep_frames:
+            self._frames[key] = rows
+
+    @staticmethod
+    def merge(rows: np.ndarray, fetched: np.ndarray) -> np.ndarray:
+        """Appends freshly fetched candles, replacing stored ones with the same or later open time."""
+        if not len(fetched):
+            return rows
+        if not len(rows):
+            return fetched
+        keep = rows[rows[:, 0] < fetched[0, 0]]
+        return np.concatenate([keep, fetched])
+
+    @staticmethod
+    def combine(rows: np.ndarray, fetched: np.ndarray) -> np.ndarray:
+        """Unions two candle arrays in open-time order; fetched candles win on duplicates."""
+        both = np.concatenate([fetched, rows])
+        _, first = np.unique(both[:, 0], return_index=True)
+        return both[first]
+
+    def _fetch_range(self, session, symbol: str, interval: str, category: str, start: int, end: int, limiter=None) -> np.ndarray:
+        """Fetches every candle opened in [start, end], one page at a time from
+        `end` backward (Bybit returns the newest candles of a range first)."""
+        pages = []
+        cursor = int(end)
+        while cursor >= start:
+            if limiter is not None:
+                limiter.acquire()
+            response = session.get_kline(
+                category=category,
+                symbol=symbol,
+                interval=interval,
+                start=int(start),
+                end=cursor,
+                limit=MAX_KLINE_LIMIT,
+            )
+            page = parse_kline_list(response['result']['list'])
+            if not len(page):
+                break
+            pages.append(page)
+            if page[0, 0] <= start:
+                break
+            cursor = int(page[0, 0]) - 1
+        return np.concatenate(pages[::-1]) if pages else np.empty((0, len(COLUMNS)))
+
+    def backfill(self, session, symbol: str, interval: str, start: int, end: int = None,
+                 category: str = "linear", limiter=None) -> np.ndarray:
+        """
+        Makes sure the store holds every candle opened between `start` and `end`
+        (epoch ms, `end` defaults to now) and returns them.
+
+        Only the ranges before the first and after the last stored candle are
+        requested, so extending a backtest window costs only the new pages.
+        `limiter` (e.g. a TokenBucket) is acquired before every request.
+        """
+        interval = str(interval)
+        end = int(end if end is not None else time.time() * 1000)
+        key = (category, symbol, interval)
+        with self._lock(key):
+            rows = self.load(symbol, interval, category)
+            if len(rows):
+                parts = []
+                if start < rows[0, 0]:
+                    parts.append(self._fetch_range(session, symbol, interval, category, start, rows[0, 0] - 1, limiter))
+                if rows[-1, 0] < end:
+                    # Starts at the last stored candle, which may have been stored while still forming
+                    parts.append(self._fetch_range(session, symbol, interval, category, rows[-1, 0], end, limiter))
+                fetched = np.concatenate(parts) if parts else rows[:0]
+            else:
+                fetched = self._fetch_range(session, symbol, interval, category, start, end, limiter)
+            if len(fetched):
+                rows = self.combine(rows, fetched)
+                self.save(symbol, interval, rows, category)
+            return rows[(rows[:, 0] >= start) & (rows[:, 0] <= end)]
+
+    def sync(self, session, symbol: str, interval: str, category: str = "linear", limit: int = 100,
+             max_age: float = 0) -> np.ndarray:
+        """
+        Brings the stored candles up to date and returns the latest `limit` of them.
+
+        A full fetch only happens when nothing (or not enough) is stored or the
+        gap since the last stored candle is larger than one Bybit page. With
+        `max_age`, candles synced by this process less than `max_age` seconds
+        ago are returned without any request.
+        """
+        interval = str(interval)
+        limit = min(int(limit), self.max_rows)
+        key = (category, symbol, interval)
+        with self._lock(key):
+            rows = self.load(symbol, interval, category)
+            synced_at = self._synced_at.get(key)
+            if max_age and synced_at is not None and time.monotonic() - synced_at < max_age and len(rows) >= limit:
+                return rows[-limit:]
+            now_ms = time.time() * 1000
+            missing = (now_ms - rows[-1, 0]) // interval_ms(interval) + 1 if len(rows) else None
+
+            if missing is None or missing > MAX_KLINE_LIMIT or len(rows) < limit:
+                # 1. Cold start, stale store or more history requested: fetch the latest page
+                response = session.get_kline(
+                    category=category,
+                    symbol=symbol,
+                    interval=interval,
+                    limit=min(max(limit, 1), MAX_KLINE_LIMIT),
+                )
+                fetched = parse_kline_list(response['result']['list'])
+                if len(rows) and len(fetched) and fetched[0, 0] > next_open_ms(rows[-1, 0], interval):
+                    # The stored history is no longer contiguous with the new page
+                    rows = rows[:0]
+            else:
+                # 2. Incremental sync: only candles from the last stored open time onward
+                response = session.get_kline(
+                    category=category,
+                    symbol=symbol,
+                    interval=interval,
+                    start=int(rows[-1, 0]),
+                    limit=MAX_KLINE_LIMIT,
+                )
+                fetched = parse_kline_list(response['result']['list'])
+
+            rows = self.merge(rows, fetched)
+            self.save(symbol, interval, rows, category)
+            self._synced_at[key] = time.monotonic()
+            return rows[-limit:]
+
+
+# Shared store used by all market-data tools
+kline_store = KlineStore()
@@ -0,0 +1,228 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from crypt_agent.tools.kline_store import COLUMNS, KlineStore, contiguous, next_open_ms
+
+# Bybit's public stream for USDT perpetuals (demo trading uses mainnet market data)
+DEFAULT_STREAM_URL = "wss://stream.bybit.com/v5/public/linear"
+
+# Bybit accepts at most 10 topics per subscribe request
+SUBSCRIBE_BATCH = 10
+
+# Streamed tickers older than this many seconds are not served (same as the snapshot TTL)
+TICKER_MAX_AGE = float(os.getenv("CRYPT_AGENT_STREAM_TICKER_MAX_AGE", "5"))
+
+
+class MarketStream:
+    """
+    Optional live market-data buffer fed by Bybit's public WebSocket.
+
+    Symbols are added to the watchlist with `watch_ticker` / `watch_klines`;
+    the stream then keeps the latest ticker fields and candles in memory so
+    tools can read them without any network round-trip. Reads return None
+    whenever the buffer cannot be trusted (not connected, not seeded yet,
+    stale, or with missing candles), in which case callers fall back to REST.
+    A gap between buffered and pushed candles drops the candles before it,
+    so the buffer is re-seeded from REST rather than served with a hole.
+
+    The connection uses websocket-client directly rather than pybit's
+    WebSocket, so `url` can point at a local fake server; `handle_message` /
+    `replay` accept recorded stream messages directly. `clock` returns the
+    current time in seconds (freshness checks compare it with exchange times).
+    """
+
+    def __init__(self, url: str = None, ping_interval: float = 20, max_candles: int = 1000,
+                 ticker_max_age: float = TICKER_MAX_AGE, clock=time.time):
+        self.url = url or os.getenv("CRYPT_AGENT_STREAM_URL", DEFAULT_STREAM_URL)
+        self.ping_interval = ping_interval
+        self.max_candles = max_candles
+        self.ticker_max_age = ticker_max_age
+        self.clock = clock
+        self.connected = False
+        self._tickers = {}
+        self._ticker_ts = {}
+        self._candles = {}
+        self._topics = set()
+        self._lock = threading.RLock()
+        self._ws = None
+        self._thread = None
+        self._running = False
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self):
+        """Opens the WebSocket connection in a background thread (idempotent)."""
+        import websocket  # installed with pybit
+
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._ws = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=lambda ws, message: self.handle_message(message),
+                on_close=self._on_close,
+                on_error=lambda ws, error: self._on_close(ws),
+            )
+            self._thread = threading.Thread(target=self._run, name="market-stream", daemon=True)
+            self._thread.start()
+            threading.Thread(target=self._heartbeat, name="market-stream-ping", daemon=True).start()
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            self.connected = False
+            if self._ws is not None:
+                self._ws.close()
+
+    def _run(self):
+        while self._running:
+            self._ws.run_forever()
+            if self._running:
+                time.sleep(1)
+
+    def _heartbeat(self):
+        while self._running:
+            time.sleep(self.ping_interval)
+            if self.connected:
+                self._send({"op": "ping"})
+
+    def _on_open(self, ws):
+        self.connected = True
+        self._subscribe(sorted(self._topics))
+
+    def _on_close(self, ws, *args):
+        with self._lock:
+            self.connected = False
+            # Candles may be missed while disconnected, so buffers must be re-seeded
+            self._candles.clear()
+            self._tickers.clear()
+            self._ticker_ts.clear()
+
+    def _send(self, payload: dict):
+        try:
+            self._ws.send(json.dumps(payload))
+        except Exception:
+            self.connected = False
+
+    def _subscribe(self, topics):
+        for i in range(0, len(topics), SUBSCRIBE_BATCH):
+            self._send({"op": "subscribe", "args": list(topics[i:i + SUBSCRIBE_BATCH])})
+
+    def _add_topics(self, topics):
+        with self._lock:
+            new_topics = [topic for topic in topics if topic not in self._topics]
+            self._topics.update(new_topics)
+        self.start()
+        if new_topics and self.connected:
+            self._subscribe(new_topics)
+
+    # -- watchlist -----------------------------------------------------------
+
+    def watch_ticker(self, symbols):
+        """Subscribes to the ticker topic of every symbol."""
+        self._add_topics([f"tickers.{symbol}" for symbol in symbols])
+
+    def watch_klines(self, symbol: str, interval: str, history: np.ndarray):
+        """Subscribes to a kline topic and seeds its buffer with REST history
+        (oldest-first rows in the KlineStore layout)."""
+        key = (symbol, str(interval))
+        with self._lock:
+            streamed = self._candles.get(key)
+            rows = history[-self.max_candles:]
+            if streamed is not None and len(streamed):
+                rows = self._append(rows, streamed[streamed[:, 0] >= rows[-1, 0]] if len(rows) else streamed, interval)
+            self._candles[key] = rows
+        self._add_topics([f"kline.{interval}.{symbol}"])
+
+    # -- reads -----------------------------------------------------------------
+
+    def ticker(self, symbol: str):
+        """Returns the latest ticker fields of `symbol`, or None if not live or
+        last updated more than `ticker_max_age` seconds ago."""
+        if not self.connected:
+            return None
+        with self._lock:
+            ticker, ts = self._tickers.get(symbol), self._ticker_ts.get(symbol, 0)
+        if ticker is None or self.clock() * 1000 - ts > self.ticker_max_age * 1000:
+            return None
+        return ticker
+
+    def klines(self, symbol: str, interval: str, limit: int = 100):
+        """Returns the latest `limit` candles of `symbol`, or None if not live,
+        if the newest candle is older than one interval (pushes stopped) or if
+        candles are missing in between."""
+        if not self.connected:
+            return None
+        rows = self._candles.get((symbol, str(interval)))
+        if rows is None or len(rows) < limit:
+            return None
+        rows = rows[-limit:]
+        if self.clock() * 1000 >= next_open_ms(rows[-1, 0], interval) or not contiguous(rows, interval):
+            return None
+        return rows
+
+    # -- message handling --------------------------------------------------------
+
+    def handle_message(self, message):
+        """Applies one raw (str) or decoded stream message to the buffers."""
+        if isinstance(message, (str, bytes)):
+            message = json.loads(message)
+        topic = message.get("topic", "")
+        if topic.startswith("tickers."):
+            self._apply_ticker(message)
+        elif topic.startswith("kline."):
+            self._apply_kline(topic, message["data"])
+
+    def replay(self, messages):
+        """Feeds recorded messages (an iterable, or a JSON-lines file path) through the buffers."""
+        if isinstance(messages, str):
+            with open(messages) as f:
+                messages = [line for line in f if line.strip()]
+        for message in messages:
+            self.handle_message(message)
+
+    def _apply_ticker(self, message):
+        data = message["data"]
+        with self._lock:
+            self._ticker_ts[data["symbol"]] = message.get("ts", self.clock() * 1000)
+            if message.get("type") == "snapshot" or data["symbol"] not in self._tickers:
+                self._tickers[data["symbol"]] = dict(data)
+            else:
+                # Deltas only carry the fields that changed
+                self._tickers[data["symbol"]].update(data)
+
+    def _apply_kline(self, topic, candles):
+        _, interval, symbol = topic.split(".", 2)
+        key = (symbol, interval)
+        fetched = np.array(
+            [[float(c["start"])] + [float(c[name]) for name in COLUMNS[1:]] for c in candles]
+        ).reshape(-1, len(COLUMNS))
+        with self._lock:
+            rows = self._candles.get(key)
+            if rows is None:
+                # Not seeded yet: keep the candles so seeding can merge them
+                self._candles[key] = fetched
+                return
+            if len(rows):
+                # Never let a late message rewind the buffer
+                fetched = fetched[fetched[:, 0] >= rows[-1, 0]]
+            self._candles[key] = self._append(rows, fetched, interval)[-self.max_candles:]
+
+    @staticmethod
+    def _append(rows: np.ndarray, fetched: np.ndarray, interval: str) -> np.ndarray:
+        """Merges newer candles into the buffer; when they do not follow on
+        from it (candles were missed), only the newer candles are kept."""
+        if len(rows) and len(fetched) and fetched[0, 0] > next_open_ms(rows[-1, 0], interval):
+            return fetched
+        return KlineStore.merge(rows, fetched)
+
+
+# Shared stream, only used when CRYPT_AGENT_MARKET_STREAM is enabled
+market_stream = MarketStream()
+market_stream_enabled = os.getenv("CRYPT_AGENT_MARKET_STREAM", "").lower() in ("1", "true", "yes")
@@ -0,0 +1,134 @@
+"""
+Order submission through Bybit's batch-order endpoint.
+
+place_batch_order takes up to BATCH_ORDER_SIZE linear orders per request
+and reports on every order separately (result.list and retExtInfo.list).
+`submit_orders` groups orders into such requests, sends them concurrently
+and maps the outcomes back onto the input orders. A request that fails as a
+whole, and orders that fail with a transient error code, are resent one by
+one with place_order. Every order carries an orderLinkId, so a resent order
+that the batch request did place is rejected as a duplicate instead of
+being filled twice.
+"""
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from pybit.exceptions import InvalidRequestError
+
+from crypt_agent.metrics import in_context
+from crypt_agent.tools.instruments import instrument_cache
+from crypt_agent.tools.rate_limit import batch_order_rate_limiter, order_rate_limiter
+from crypt_agent.tools.schemas import OrderResult
+from crypt_agent.tools.session import get_session
+
+# Maximum number of requests in flight at once (the rate limiters still cap req/s)
+ORDER_CONCURRENCY = int(os.getenv("BYBIT_ORDER_CONCURRENCY", "5"))
+
+# Orders per place_batch_order request (Bybit accepts up to 20 for linear contracts)
+BATCH_ORDER_SIZE = int(os.getenv("BYBIT_BATCH_SIZE", "20"))
+
+# BYBIT_BATCH_ORDERS=0 sends every order with its own place_order request
+BATCH_ORDERS = os.getenv("BYBIT_BATCH_ORDERS", "1").lower() not in ("0", "false", "no")
+
+# Per-order codes worth resending on their own: server timeout, recv_window,
+# rate limit, internal error
+RETRYABLE_CODES = {10000, 10002, 10006, 10016}
+
+# The orderLinkId was already used, i.e. the order exists
+DUPLICATE_LINK_ID = 110072
+
+
+def new_link_id() -> str:
+    """A client order id (Bybit allows up to 36 characters)."""
+    return f"ca-{uuid.uuid4().hex[:30]}"
+
+
+def _result(order: dict, **fields) -> OrderResult:
+    return OrderResult(symbol=str(order.get("symbol")), side=order.get("side"), qty=str(order.get("qty")), **fields)
+
+
+def _place_single(category: str, order: dict) -> tuple:
+    """Places one order; returns (result, rejected by the exchange)."""
+    try:
+        with order_rate_limiter.request():
+            response = get_session().place_order(category=category, **order)
+        return _result(order, status="success", order_id=response['result']['orderId']), False
+    except InvalidRequestError as e:
+        if e.status_code == DUPLICATE_LINK_ID:
+            return _result(order, status="success", message=f"placed by an earlier request ({order['orderLinkId']})"), False
+        return _result(order, status="error", message=str(e)), True
+    except Exception as e:
+        return _result(order, status="error", message=str(e)), False
+
+
+def _place_batch(category: str, chunk: List[dict]) -> list:
+    """Places a chunk of orders with one place_batch_order request, resending
+    orders one by one when the request fails or their error is transient."""
+    try:
+        with batch_order_rate_limiter.request():
+            response = get_session().place_batch_order(category=category, request=chunk)
+    except Exception:
+        # The request failed as a whole: the orderLinkIds make resending safe
+        return [_place_single(category, order) for order in chunk]
+
+    items = response['result'].get('list', [])
+    infos = response.get('retExtInfo', {}).get('list', [])
+    infos = infos + [{}] * (len(items) - len(infos))
+    by_link_id = {item.get('orderLinkId'): (item, info) for item, info in zip(items, infos)}
+    outcomes = []
+    for order in chunk:
+        item, info = by_link_id.get(order['orderLinkId'], (None, None))
+        code = (info or {}).get('code', 0)
+        if item is not None and code == 0 and item.get('orderId'):
+            outcomes.append((_result(order, status="success", order_id=item['orderId']), False))
+        elif item is None or code in RETRYABLE_CODES:
+            outcomes.append(_place_single(category, order))
+        else:
+            outcomes.append((_result(order, status="error", message=f"{info.get('msg')} (ErrCode: {code})"), True))
+    return outcomes
+
+
+def submit_orders(orders: List[dict], category: str = "linear", via_batch: bool = None,
+                  stop_on_reject: bool = False, on_result: Callable = None) -> List[OrderResult]:
+    """
+    Places `orders` (place_order parameters without the category) and returns
+    their results in input order.
+
+    via_batch: group them into place_batch_order requests (default BYBIT_BATCH_ORDERS)
+    stop_on_reject: skip orders not sent yet once the exchange rejected one
+    on_result: called with (index, result) as each order completes, from the
+        worker threads
+    """
+    via_batch = BATCH_ORDERS if via_batch is None else via_batch
+    orders = [dict(order, orderLinkId=order.get("orderLinkId") or new_link_id()) for order in orders]
+    results = [None] * len(orders)
+    rejected = threading.Event()
+
+    def send(indexes):
+        if stop_on_reject and rejected.is_set():
+            outcomes = [(_result(orders[i], status="error", message="skipped after an earlier order was rejected"), False)
+                        for i in indexes]
+        elif len(indexes) > 1:
+            outcomes = _place_batch(category, [orders[i] for i in indexes])
+        else:
+            outcomes = [_place_single(category, orders[indexes[0]])]
+        for index, (result, was_rejected) in zip(indexes, outcomes):
+            if was_rejected:
+                rejected.set()
+            results[index] = result
+            if on_result:
+                on_result(index, result)
+
+    size = max(1, BATCH_ORDER_SIZE) if via_batch else 1
+    jobs = [list(range(i, min(i + size, len(orders)))) for i in range(0, len(orders), size)]
+    if jobs:
+        with ThreadPoolExecutor(max_workers=max(1, min(ORDER_CONCURRENCY, len(jobs)))) as pool:
+            list(pool.map(in_context(send), jobs))
+
+    if rejected.is_set():
+        # Rejected by the exchange: the cached metadata may be stale
+        instrument_cache.invalidate()
+    return results
@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows bursts of up to `capacity` calls and a
+    sustained rate of `rate` calls per second. `acquire` blocks until a token
+    is available.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0):
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SlidingWindowLimiter:
+    """
+    Thread-safe limiter allowing at most `calls` requests in any `period`
+    seconds, the way Bybit counts its per-UID limits. Unlike a TokenBucket
+    it has no burst on top of that.
+
+    Wrap each request in `with limiter.request():`. A request counts from
+    when it completes, the latest it can have reached the exchange, so
+    requests that leave late (a busy thread, network jitter) never let the
+    exchange see more than `calls` in a window. `acquire` counts from now,
+    for callers that cannot wrap the request.
+    """
+
+    def __init__(self, calls: int, period: float = 1.0):
+        self.calls = int(calls)
+        self.period = float(period)
+        self._slots = []  # [counted from] per request in the window, [None] while in flight
+        self._changed = threading.Condition()
+
+    def _take(self, tokens: int, in_flight: bool) -> list:
+        with self._changed:
+            while True:
+                now = time.monotonic()
+                self._slots = [slot for slot in self._slots if slot[0] is None or now - slot[0] < self.period]
+                if len(self._slots) + tokens <= self.calls:
+                    slots = [[None if in_flight else now] for _ in range(tokens)]
+                    self._slots.extend(slots)
+                    return slots
+                done = [slot[0] for slot in self._slots if slot[0] is not None]
+                # With every slot in flight, wait for a request to complete
+                self._changed.wait(self.period - (now - min(done)) if done else None)
+
+    def acquire(self, tokens: int = 1):
+        self._take(tokens, in_flight=False)
+
+    @contextmanager
+    def request(self, tokens: int = 1):
+        slots = self._take(tokens, in_flight=True)
+        try:
+            yield
+        finally:
+            with self._changed:
+                now = time.monotonic()
+                for slot in slots:
+                    slot[0] = now
+                self._changed.notify_all()
+
+
+# Bybit's default per-UID limit for /v5/order/create on linear contracts is 10 req/s
+order_rate_limiter = SlidingWindowLimiter(calls=int(os.getenv("BYBIT_ORDER_RATE_LIMIT", "10")))
+
+# /v5/order/create-batch has its own per-UID limit of 10 req/s (up to 20 orders each)
+batch_order_rate_limiter = SlidingWindowLimiter(calls=int(os.getenv("BYBIT_BATCH_ORDER_RATE_LIMIT", "10")))
+
+# Public market-data requests share Bybit's per-IP limit (600 per 5 s); history backfills stay well below it
+history_rate_limiter = TokenBucket(rate=float(os.getenv("BYBIT_HISTORY_RATE_LIMIT", "50")))
@@ -0,0 +1,177 @@
+"""
+Typed results returned by the tools.
+
+Tools hand agents `dump(model)`, compact JSON without the unset fields,
+instead of prose strings or raw Bybit payloads. Code that consumes a tool
+result can read it back with `Model.model_validate_json(...)`.
+"""
+import math
+from typing import Dict, List, Literal, Optional
+
+from pydantic import BaseModel
+
+Status = Literal["success", "error"]
+
+
+def dump(model: BaseModel) -> str:
+    """Serializes a tool result as compact JSON, leaving out unset fields."""
+    return model.model_dump_json(exclude_none=True)
+
+
+def significant(value, digits: int = 6):
+    """Rounds to `digits` significant digits; NaN and infinities become None."""
+    value = float(value)
+    if not math.isfinite(value):
+        return None
+    return float(f"{value:.{digits}g}")
+
+
+class ToolError(BaseModel):
+    status: Status = "error"
+    message: str
+
+
+class KlineColumns(BaseModel):
+    """Candles oldest first, one array per column (turnover is left out,
+    it is close to volume * price)."""
+
+    symbol: str
+    interval: str
+    category: str = "linear"
+    timestamp: List[int]
+    open: List[float]
+    high: List[float]
+    low: List[float]
+    close: List[float]
+    volume: List[float]
+
+    @classmethod
+    def from_rows(cls, symbol: str, interval: str, rows, category: str = "linear") -> "KlineColumns":
+        """Builds the columns from kline_store rows (timestamp, open, high, low, close, volume, turnover)."""
+        return cls(
+            symbol=symbol,
+            interval=interval,
+            category=category,
+            timestamp=rows[:, 0].astype("int64").tolist(),
+            open=rows[:, 1].tolist(),
+            high=rows[:, 2].tolist(),
+            low=rows[:, 3].tolist(),
+            close=rows[:, 4].tolist(),
+            volume=rows[:, 5].tolist(),
+        )
+
+
+class KlineSummary(BaseModel):
+    """Features of the latest candles (see indicators.kline_features); `returns`
+    is keyed by horizon in candles, e.g. "5" is the change over the last 5 candles."""
+
+    symbol: str
+    interval: str
+    candles: int
+    current_price: float
+    returns: Dict[str, Optional[float]]
+    atr: Optional[float] = None
+    atr_pct: Optional[float] = None
+    volume_z: Optional[float] = None
+    range_high: Optional[float] = None
+    range_low: Optional[float] = None
+    range_pct: Optional[float] = None
+    range_position: Optional[float] = None
+    vwap: Optional[float] = None
+    vwap_distance: Optional[float] = None
+
+    @classmethod
+    def from_features(cls, symbol: str, interval: str, candles: int, features: dict, row: int = 0) -> "KlineSummary":
+        """Builds the summary of one row of `kline_features` output, keeping 6
+        significant digits (NaN, i.e. not enough candles, becomes null)."""
+        values = {name: significant(column[row]) for name, column in features.items() if name != "returns"}
+        returns = {str(horizon): significant(column[row]) for horizon, column in features["returns"].items()}
+        return cls(symbol=symbol, interval=interval, candles=candles, returns=returns, **values)
+
+
+class IndicatorResult(BaseModel):
+    symbol: str
+    interval: str
+    status: Status = "success"
+    current_price: Optional[float] = None
+    rsi: Optional[float] = None
+    macd_value: Optional[float] = None
+    macd_signal: Optional[float] = None
+    macd_histogram: Optional[float] = None
+    message: Optional[str] = None
+
+
+class IndicatorBatch(BaseModel):
+    results: List[IndicatorResult]
+
+
+class ScanCandidate(BaseModel):
+    symbol: str
+    score: float
+    last_price: float
+    change_24h: Optional[float] = None
+    turnover_24h: Optional[float] = None
+    return_short: Optional[float] = None
+    return_long: Optional[float] = None
+    rsi: Optional[float] = None
+    volume_z: Optional[float] = None
+    atr_pct: Optional[float] = None
+
+
+class MarketScan(BaseModel):
+    """Top momentum candidates of a scan over `scanned` linear contracts;
+    return_short/return_long cover 4 and 16 candles of `interval`."""
+
+    interval: str
+    side: str
+    scanned: int
+    candidates: List[ScanCandidate]
+
+
+class TickerPrices(BaseModel):
+    """Last prices by symbol; symbols not listed in the category go to `missing`."""
+
+    category: str
+    prices: Dict[str, float]
+    missing: Optional[List[str]] = None
+
+
+class WalletBalance(BaseModel):
+    coin: str
+    wallet_balance: float
+    status: Status = "success"
+
+
+class OrderResult(BaseModel):
+    symbol: str
+    status: Status
+    side: Optional[str] = None
+    qty: Optional[str] = None
+    order_id: Optional[str] = None
+    message: Optional[str] = None
+
+
+class OrderBatch(BaseModel):
+    succeeded: int
+    failed: int
+    orders: List[OrderResult]
+
+    @classmethod
+    def from_results(cls, orders: List[OrderResult]) -> "OrderBatch":
+        succeeded = sum(1 for order in orders if order.status == "success")
+        return cls(succeeded=succeeded, failed=len(orders) - succeeded, orders=orders)
+
+
+class SlicedExecution(BaseModel):
+    """Outcome of a parent order split into exchange-sized slices; "partial"
+    means some slices were rejected and `fill_ratio` of total_qty was filled."""
+
+    symbol: str
+    side: str
+    status: Literal["success", "partial", "error"]
+    total_qty: float
+    executed_qty: float = 0.0
+    fill_ratio: Optional[float] = None
+    elapsed_s: Optional[float] = None
+    slices: List[OrderResult] = []
+    message: Optional[str] = None
@@ -0,0 +1,125 @@
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from crypt_agent.metrics import InstrumentedSession
+
+_session = None
+_session_lock = threading.Lock()
+
+
+@dataclass
+class TransportConfig:
+    """
+    Connection settings for the shared Bybit session, read from the environment.
+
+    pool_size: keep-alive connections kept per host (should cover the tool thread pools)
+    timeout: per-request timeout in seconds
+    max_retries / retry_delay: pybit's retries on retry_codes (10006 waits for the
+        rate-limit reset announced by Bybit)
+    connect_retries / backoff_factor: exponential-backoff retries for failed
+        connections, plus read errors and 429/5xx responses on idempotent GETs only
+        (order POSTs are never resent)
+    """
+
+    pool_size: int = field(default_factory=lambda: int(os.getenv("BYBIT_POOL_SIZE", "20")))
+    timeout: float = field(default_factory=lambda: float(os.getenv("BYBIT_TIMEOUT", "10")))
+    max_retries: int = field(default_factory=lambda: int(os.getenv("BYBIT_MAX_RETRIES", "3")))
+    retry_delay: float = field(default_factory=lambda: float(os.getenv("BYBIT_RETRY_DELAY", "0.5")))
+    connect_retries: int = field(default_factory=lambda: int(os.getenv("BYBIT_CONNECT_RETRIES", "3")))
+    backoff_factor: float = field(default_factory=lambda: float(os.getenv("BYBIT_BACKOFF_FACTOR", "0.2")))
+
+
+def _keep_alive_adapter(config: TransportConfig):
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection
+    from urllib3.util.retry import Retry
+
+    class KeepAliveAdapter(HTTPAdapter):
+        """HTTPAdapter whose pooled sockets use TCP keep-alive, so idle warm
+        connections survive between cycles instead of being re-handshaked."""
+
+        def init_poolmanager(self, *args, **kwargs):
+            kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+            ]
+            super().init_poolmanager(*args, **kwargs)
+
+    retry = Retry(
+        total=config.connect_retries,
+        connect=config.connect_retries,
+        read=config.connect_retries,
+        status=config.connect_retries,
+        backoff_factor=config.backoff_factor,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    return KeepAliveAdapter(
+        pool_connections=config.pool_size,
+        pool_maxsize=config.pool_size,
+        max_retries=retry,
+    )
+
+
+def configure_transport(session, config: TransportConfig = None):
+    """Mounts a pooled keep-alive adapter on a pybit HTTP session's requests client."""
+    config = config or TransportConfig()
+    adapter = _keep_alive_adapter(config)
+    session.client.mount("https://", adapter)
+    session.client.mount("http://", adapter)
+    return session
+
+
+def warm_up(session, connections: int = 4):
+    """Opens `connections` pooled connections ahead of time (TLS handshakes
+    included) with cheap public calls, so the first orders skip them."""
+    with ThreadPoolExecutor(max_workers=max(1, connections)) as pool:
+        list(pool.map(lambda _: session.get_server_time(), range(connections)))
+
+
+def get_session():
+    """
+    Returns the shared Bybit HTTP session, creating it on first use.
+
+    pybit is imported and the session is built lazily so that importing the
+    tools (and every CLI entry point) stays cheap and does not require
+    credentials until an exchange call is actually made.
+
+    With CRYPT_AGENT_EXCHANGE=sim the session is a local SimulatedExchange
+    (configured by the CRYPT_AGENT_SIM_* variables) instead of Bybit.
+    Either way it is wrapped in an InstrumentedSession, which times every request.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None and os.getenv("CRYPT_AGENT_EXCHANGE", "bybit").lower() == "sim":
+                from crypt_agent.tools.simulator import SimulatedExchange
+
+                _session = InstrumentedSession(SimulatedExchange.from_env())
+            elif _session is None:
+                from pybit.unified_trading import HTTP
+
+                config = TransportConfig()
+                # Securely initialize session
+                _session = InstrumentedSession(configure_transport(HTTP(
+                    testnet=False,
+                    demo=True,
+                    api_key=os.getenv("BYBIT_DEMO_API_KEY"),
+                    api_secret=os.getenv("BYBIT_DEMO_API_SECRET"),
+                    recv_window=10000,
+                    timeout=config.timeout,
+                    max_retries=config.max_retries,
+                    retry_delay=config.retry_delay,
+                ), config))
+    return _session
+
+
+def set_session(session):
+    """Replaces the shared session (e.g. with a stand-in for offline runs)."""
+    global _session
+    with _session_lock:
+        _session = InstrumentedSession(session) if session is not None and not isinstance(session, InstrumentedSession) else session
@@ -0,0 +1,382 @@
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from decimal import Decimal
+
+import numpy as np
+from pybit.exceptions import InvalidRequestError
+
+from crypt_agent.tools.kline_store import INTERVAL_MINUTES, MAX_KLINE_LIMIT, format_kline_rows
+
+# Well-known contracts listed first, with realistic starting prices
+MAJORS = {"BTCUSDT": 60000.0, "ETHUSDT": 3000.0, "SOLUSDT": 150.0, "XRPUSDT": 0.6, "DOGEUSDT": 0.15}
+
+# Default (calls, window seconds) per rate-limit group, after Bybit's documented limits
+DEFAULT_RATE_LIMITS = {
+    "market": (600, 5.0),   # public market data, per IP
+    "order": (10, 1.0),     # /v5/order/create, per UID
+    "batch": (10, 1.0),     # /v5/order/create-batch, per UID
+    "account": (50, 1.0),   # wallet and demo-funds endpoints
+}
+
+# Bybit's limit on orders per place_batch_order request for linear contracts
+MAX_BATCH_ORDERS = 20
+
+# Taker fee charged on simulated fills
+TAKER_FEE = 0.00055
+
+# Leverage used to compute the margin a new order needs
+LEVERAGE = 10
+
+
+class _PricePath:
+    """
+    Deterministic 1-minute random walk of one symbol from `start_ms` on,
+    extended lazily up to the current minute. Candles of any interval are
+    aggregated from it.
+    """
+
+    def __init__(self, seed: int, start_ms: int, price: float, volatility: float):
+        self.start_ms = start_ms
+        self._rng = np.random.default_rng(seed)
+        self._price = price
+        self._volatility = volatility
+        self.open = np.empty(0)
+        self.high = np.empty(0)
+        self.low = np.empty(0)
+        self.close = np.empty(0)
+        self.volume = np.empty(0)
+
+    def extend(self, minutes: int):
+        """Generates minutes until `minutes` are available."""
+        count = minutes - len(self.close)
+        if count <= 0:
+            return
+        steps = self._rng.normal(0.0, self._volatility, count)
+        wiggle = np.abs(self._rng.normal(0.0, self._volatility / 2, (2, count)))
+        close = self._price * np.exp(np.cumsum(steps))
+        open_ = np.concatenate([[self._price], close[:-1]])
+        self._price = float(close[-1])
+        self.open = np.concatenate([self.open, open_])
+        self.close = np.concatenate([self.close, close])
+        self.high = np.concatenate([self.high, np.maximum(open_, close) * (1 + wiggle[0])])
+        self.low = np.concatenate([self.low, np.minimum(open_, close) * (1 - wiggle[1])])
+        self.volume = np.concatenate([self.volume, self._rng.lognormal(3.0, 1.0, count) * 1000 / close])
+
+
+class SimulatedExchange:
+    """
+    In-process stand-in for pybit's unified-trading HTTP session, covering the
+    calls made by the tools: get_kline, get_tickers, get_instruments_info,
+    place_order, place_batch_order, get_wallet_balance,
+    request_demo_trading_funds and get_server_time.
+
+    Prices follow a seeded random walk per symbol, so runs are reproducible.
+    Every call waits `latency` seconds (+/- `jitter`) and counts against a
+    sliding-window rate limit per group (see DEFAULT_RATE_LIMITS). An exceeded
+    limit either waits for the window like pybit's retry on 10006
+    (`on_rate_limit="wait"`) or raises InvalidRequestError with code 10006
+    (`"reject"`); `rate_limits=None` disables them.
+
+    Responses use Bybit's payload layout, orders fill immediately at the last
+    price and `stats` counts calls, throttles and rejections per endpoint.
+    """
+
+    def __init__(self, symbols: int = 200, seed: int = 42, latency: float = 0.0, jitter: float = 0.0,
+                 rate_limits: dict = DEFAULT_RATE_LIMITS, on_rate_limit: str = "wait",
+                 balance: float = 10_000.0, history_minutes: int = 10_080, clock=None):
+        self.seed = seed
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limits = dict(rate_limits) if rate_limits else {}
+        self.on_rate_limit = on_rate_limit
+        self.clock = clock or time.time
+        self.balance = float(balance)
+        self.positions = {}
+        self.orders = []
+        self._link_ids = set()
+        self.stats = {}
+        self._random = random.Random(seed)
+        self._calls = {group: deque() for group in self.rate_limits}
+        self._lock = threading.Lock()
+
+        now_ms = int(self.clock() * 1000)
+        # Day-aligned so daily candles start on UTC midnight like Bybit's
+        self.start_ms = (now_ms - history_minutes * 60_000) // 86_400_000 * 86_400_000
+
+        rng = np.random.default_rng(seed)
+        names = list(MAJORS)[:symbols] + [f"SIM{i}USDT" for i in range(max(0, symbols - len(MAJORS)))]
+        self._paths = {}
+        self.instruments = {}
+        for i, name in enumerate(names):
+            price = MAJORS.get(name, float(np.exp(rng.uniform(np.log(0.001), np.log(500)))))
+            self._paths[name] = _PricePath(seed * 100_003 + i, self.start_ms, price, float(rng.uniform(0.0008, 0.003)))
+            self.instruments[name] = self._instrument(name, price)
+
+    @classmethod
+    def from_env(cls) -> "SimulatedExchange":
+        """Builds a simulator from CRYPT_AGENT_SIM_* environment variables."""
+        mode = os.getenv("CRYPT_AGENT_SIM_RATE_LIMIT", "wait").lower()
+        return cls(
+            symbols=int(os.getenv("CRYPT_AGENT_SIM_SYMBOLS", "200")),
+            seed=int(os.getenv("CRYPT_AGENT_SIM_SEED", "42")),
+            latency=float(os.getenv("CRYPT_AGENT_SIM_LATENCY_MS", "0")) / 1000,
+            jitter=float(os.getenv("CRYPT_AGENT_SIM_JITTER_MS", "0")) / 1000,
+            rate_limits=None if mode == "off" else DEFAULT_RATE_LIMITS,
+            on_rate_limit=mode if mode in ("wait", "reject") else "wait",
+            balance=float(os.getenv("CRYPT_AGENT_SIM_BALANCE", "10000")),
+        )
+
+    @staticmethod
+    def _instrument(symbol: str, price: float) -> dict:
+        qty_step = 10.0 ** np.floor(np.log10(5 / price))
+        max_market_qty = max(qty_step, round(200_000 / price / qty_step) * qty_step)
+        return {
+            "symbol": symbol,
+            "contractType": "LinearPerpetual",
+            "status": "Trading",
+            "baseCoin": symbol[:-4],
+            "quoteCoin": "USDT",
+            "priceFilter": {"tickSize": _fmt(10.0 ** (np.floor(np.log10(price)) - 4))},
+            "lotSizeFilter": {
+                "qtyStep": _fmt(qty_step),
+                "minOrderQty": _fmt(qty_step),
+                "maxMktOrderQty": _fmt(max_market_qty),
+                "maxOrderQty": _fmt(max_market_qty * 10),
+            },
+        }
+
+    # --- plumbing -----------------------------------------------------
+
+    def _enter(self, endpoint: str, group: str, cost: int = 1):
+        """Applies latency and the rate limit of `group`, and counts the call."""
+        delay = self.latency + (self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        while True:
+            with self._lock:
+                stats = self.stats.setdefault(endpoint, {"calls": 0, "throttled": 0, "rejected": 0})
+                limit = self.rate_limits.get(group)
+                if limit is None:
+                    stats["calls"] += 1
+                    return
+                calls, window = limit
+                now = time.monotonic()
+                history = self._calls[group]
+                while history and now - history[0] >= window:
+                    history.popleft()
+                if len(history) + cost <= calls:
+                    history.extend([now] * cost)
+                    stats["calls"] += 1
+                    return
+                if self.on_rate_limit == "reject":
+                    stats["rejected"] += 1
+                    raise InvalidRequestError(endpoint, "Too many visits. Exceeded the API Rate Limit.",
+                                              10006, _now_text(), {})
+                stats["throttled"] += 1
+                wait = window - (now - history[0])
+            time.sleep(max(wait, 0.001))
+
+    def _now_ms(self) -> int:
+        return int(self.clock() * 1000)
+
+    def _path(self, symbol: str) -> _PricePath:
+        path = self._paths.get(symbol)
+        if path is None:
+            raise InvalidRequestError("get_kline", "Not supported symbols", 10001, _now_text(), {})
+        path.extend((self._now_ms() - self.start_ms) // 60_000 + 1)
+        return path
+
+    def last_price(self, symbol: str) -> float:
+        with self._lock:
+            return float(self._path(symbol).close[-1])
+
+    # --- market data --------------------------------------------------
+
+    def get_server_time(self, **kwargs) -> dict:
+        self._enter("get_server_time", "market")
+        now = self.clock()
+        return _ok({"timeSecond": str(int(now)), "timeNano": str(int(now * 1e9))})
+
+    def get_kline(self, category: str = "linear", symbol: str = None, interval: str = "1",
+                  start: int = None, end: int = None, limit: int = 200, **kwargs) -> dict:
+        self._enter("get_kline", "market")
+        interval = str(interval)
+        if interval not in INTERVAL_MINUTES:
+            raise InvalidRequestError("get_kline", "Invalid period!", 10001, _now_text(), {})
+        step = INTERVAL_MINUTES[interval] * 60_000
+        limit = max(1, min(int(limit or 200), MAX_KLINE_LIMIT))
+        with self._lock:
+            path = self._path(symbol)
+            now_ms = self._now_ms()
+            # Candle open times in [start, end], newest `limit` of them
+            last = min(int(end) if end is not None else now_ms, now_ms) // step * step
+            first = max(self.start_ms + (-self.start_ms) % step, (int(start) + step - 1) // step * step if start is not None else 0)
+            first = max(first, last - (limit - 1) * step)
+            if first > last:
+                return _ok({"category": category, "symbol": symbol, "list": []})
+            opens = np.arange(first, last + 1, step, dtype=np.int64)
+            bounds = np.minimum((opens - self.start_ms) // 60_000, len(path.close) - 1)
+            ends = np.minimum(bounds + step // 60_000, len(path.close))
+            window = slice(0, ends[-1])
+            rows = np.column_stack([
+                opens.astype(float),
+                path.open[bounds],
+                np.maximum.reduceat(path.high[window], bounds),
+                np.minimum.reduceat(path.low[window], bounds),
+                path.close[ends - 1],
+                np.add.reduceat(path.volume[window], bounds),
+                np.add.reduceat((path.volume * path.close)[window], bounds),
+            ])
+        return _ok({
+            "category": category,
+            "symbol": symbol,
+            "list": format_kline_rows(rows),
+        })
+
+    def get_tickers(self, category: str = "linear", symbol: str = None, **kwargs) -> dict:
+        self._enter("get_tickers", "market")
+        tickers = []
+        with self._lock:
+            for name in ([symbol] if symbol else self._paths):
+                path = self._path(name)
+                day = slice(max(0, len(path.close) - 1440), None)
+                last = path.close[-1]
+                prev = path.open[day.start]
+                tick = float(self.instruments[name]["priceFilter"]["tickSize"])
+                tickers.append({
+                    "symbol": name,
+                    "lastPrice": _fmt(last),
+                    "markPrice": _fmt(last),
+                    "bid1Price": _fmt(last - tick),
+                    "ask1Price": _fmt(last + tick),
+                    "prevPrice24h": _fmt(prev),
+                    "price24hPcnt": _fmt(round(last / prev - 1, 6)),
+                    "highPrice24h": _fmt(path.high[day].max()),
+                    "lowPrice24h": _fmt(path.low[day].min()),
+                    "volume24h": _fmt(path.volume[day].sum()),
+                    "turnover24h": _fmt((path.volume[day] * path.close[day]).sum()),
+                })
+        return _ok({"category": category, "list": tickers})
+
+    def get_instruments_info(self, category: str = "linear", symbol: str = None, limit: int = 500,
+                             cursor: str = None, **kwargs) -> dict:
+        self._enter("get_instruments_info", "market")
+        if symbol:
+            items = [self.instruments[symbol]] if symbol in self.instruments else []
+            return _ok({"category": category, "list": items, "nextPageCursor": ""})
+        names = list(self.instruments)
+        offset = int(cursor or 0)
+        page = names[offset:offset + int(limit)]
+        next_cursor = str(offset + len(page)) if offset + len(page) < len(names) else ""
+        return _ok({"category": category, "list": [self.instruments[n] for n in page], "nextPageCursor": next_cursor})
+
+    # --- trading ------------------------------------------------------
+
+    def _fill(self, order: dict) -> dict:
+        """Validates and fills one order like Bybit would; must hold the lock."""
+        symbol = order.get("symbol")
+        link_id = order.get("orderLinkId")
+        if link_id and link_id in self._link_ids:
+            raise _rejected("place_order", "OrderLinkedID is duplicate", 110072)
+        instrument = self.instruments.get(symbol)
+        if instrument is None:
+            raise _rejected("place_order", "params error: symbol invalid", 10001)
+        side = order.get("side")
+        if side not in ("Buy", "Sell"):
+            raise _rejected("place_order", "params error: side invalid", 10001)
+        lot = instrument["lotSizeFilter"]
+        try:
+            qty = Decimal(str(order.get("qty")))
+        except Exception:
+            raise _rejected("place_order", "Qty invalid", 10001)
+        if qty < Decimal(lot["minOrderQty"]):
+            raise _rejected("place_order", "The number of contracts is below the minimum allowed", 110094)
+        if qty > Decimal(lot["maxMktOrderQty"]):
+            raise _rejected("place_order", "The quantity of a single order exceeds the maximum allowed", 10001)
+        if qty % Decimal(lot["qtyStep"]):
+            raise _rejected("place_order", "Qty invalid", 10001)
+
+        price = float(self._path(symbol).close[-1])
+        for field, above in (("takeProfit", side == "Buy"), ("stopLoss", side == "Sell")):
+            level = order.get(field)
+            if level not in (None, "") and (float(level) > price) != above:
+                raise _rejected("place_order", f"{field} set for {side} position should be "
+                                f"{'higher' if above else 'lower'} than base_price", 10001)
+
+        notional = float(qty) * price
+        fee = notional * TAKER_FEE
+        position = self.positions.get(symbol, 0.0)
+        increases = position == 0 or (position > 0) == (side == "Buy")
+        if increases and notional / LEVERAGE + fee > self.balance - self._used_margin():
+            raise _rejected("place_order", "ab not enough for new order", 110007)
+        self.balance -= fee
+        self.positions[symbol] = self.positions.get(symbol, 0.0) + (float(qty) if side == "Buy" else -float(qty))
+        if link_id:
+            self._link_ids.add(link_id)
+        order_id = str(uuid.uuid4())
+        self.orders.append({"orderId": order_id, "symbol": symbol, "side": side, "qty": str(qty),
+                            "avgPrice": _fmt(price), "fee": fee, "createdTime": self._now_ms()})
+        return {"orderId": order_id, "orderLinkId": order.get("orderLinkId", "")}
+
+    def _used_margin(self) -> float:
+        """Margin held by the open positions at their current prices; must hold the lock."""
+        return sum(abs(size) * float(self._paths[symbol].close[-1]) for symbol, size in self.positions.items()) / LEVERAGE
+
+    def place_order(self, category: str = "linear", **order) -> dict:
+        self._enter("place_order", "order")
+        with self._lock:
+            return _ok(self._fill(order))
+
+    def place_batch_order(self, category: str = "linear", request: list = None, **kwargs) -> dict:
+        self._enter("place_batch_order", "batch")
+        request = request or []
+        if len(request) > MAX_BATCH_ORDERS:
+            raise _rejected("place_batch_order", f"Batch size exceeds the limit of {MAX_BATCH_ORDERS}", 10001)
+        results, infos = [], []
+        with self._lock:
+            for order in request:
+                try:
+                    filled = self._fill(order)
+                    results.append(dict(filled, category=category, symbol=order.get("symbol"), createAt=str(self._now_ms())))
+                    infos.append({"code": 0, "msg": "OK"})
+                except InvalidRequestError as e:
+                    results.append({"category": category, "symbol": order.get("symbol"), "orderId": "",
+                                    "orderLinkId": order.get("orderLinkId", ""), "createAt": ""})
+                    infos.append({"code": e.status_code, "msg": e.message})
+        return {"retCode": 0, "retMsg": "OK", "result": {"list": results},
+                "retExtInfo": {"list": infos}, "time": self._now_ms()}
+
+    # --- account ------------------------------------------------------
+
+    def get_wallet_balance(self, accountType: str = "UNIFIED", coin: str = "USDT", **kwargs) -> dict:
+        self._enter("get_wallet_balance", "account")
+        with self._lock:
+            balance = self.balance if coin == "USDT" else 0.0
+        coin_info = {"coin": coin, "walletBalance": _fmt(balance), "equity": _fmt(balance)}
+        return _ok({"list": [{"accountType": accountType, "coin": [coin_info]}]})
+
+    def request_demo_trading_funds(self, **kwargs) -> dict:
+        self._enter("request_demo_trading_funds", "account")
+        with self._lock:
+            self.balance += 100_000.0
+        return _ok({})
+
+
+def _fmt(value) -> str:
+    return np.format_float_positional(float(value), precision=10, trim="-")
+
+
+def _now_text() -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _ok(result: dict) -> dict:
+    return {"retCode": 0, "retMsg": "OK", "result": result, "retExtInfo": {}, "time": int(time.time() * 1000)}
+
+
+def _rejected(endpoint: str, message: str, code: int) -> InvalidRequestError:
+    return InvalidRequestError(endpoint, message, code, _now_text(), {})
@@ -0,0 +1,47 @@
+import os
+import threading
+import time
+
+
+class TickerSnapshot:
+    """
+    Short-lived in-memory table of every ticker of a category, keyed by symbol.
+
+    One get_tickers(category) call returns all tickers of the category, so any
+    number of price lookups within `ttl` seconds cost a single request.
+    """
+
+    def __init__(self, ttl: float = 5):
+        self.ttl = ttl
+        self._tables = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, category: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(category, threading.Lock())
+
+    def table(self, session, category: str = "linear") -> dict:
+        """Returns the symbol -> ticker table, refreshing it once the TTL has passed."""
+        with self._lock(category):
+            fetched_at, table = self._tables.get(category, (0.0, None))
+            if table is None or time.monotonic() - fetched_at > self.ttl:
+                response = session.get_tickers(category=category)
+                table = {item['symbol']: item for item in response['result']['list']}
+                self._tables[category] = (time.monotonic(), table)
+            return table
+
+    def get(self, session, symbol: str, category: str = "linear"):
+        """Returns the ticker of `symbol`, or None if the category does not list it."""
+        return self.table(session, category).get(symbol)
+
+    def invalidate(self, category: str = None):
+        """Drops the cached table of one category (or all of them)."""
+        if category is None:
+            self._tables.clear()
+        else:
+            self._tables.pop(category, None)
+
+
+# Shared snapshot used by all price tools
+ticker_snapshot = TickerSnapshot(ttl=float(os.getenv("CRYPT_AGENT_TICKER_TTL", "5")))
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class TriggerService:
+    """
+    Queues trigger payloads and runs one crew per payload with
+    `Crew.kickoff_async`, at most `max_concurrency` at a time, on an asyncio
+    loop owned by a background thread.
+
+    crew_factory: crew_factory(job_id) builds a fresh crew for every job
+        (crews, and the files they write, are not shared between concurrent runs)
+    build_inputs: turns a trigger payload into kickoff inputs
+    """
+
+    def __init__(self, crew_factory, build_inputs, max_concurrency: int = 2, max_queued: int = 100, keep_jobs: int = 1000):
+        self.crew_factory = crew_factory
+        self.build_inputs = build_inputs
+        self.max_concurrency = max_concurrency
+        self.max_queued = max_queued
+        self.keep_jobs = keep_jobs
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._thread = threading.Thread(target=self._run_loop, name="trigger-jobs", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def submit(self, payload) -> str:
+        """Queues a payload and returns its job id."""
+        with self._lock:
+            queued = sum(1 for job in self.jobs.values() if job["status"] == "queued")
+            if queued >= self.max_queued:
+                raise QueueFullError(f"{queued} jobs already queued")
+            job_id = uuid.uuid4().hex
+            self.jobs[job_id] = {"id": job_id, "status": "queued", "submitted_at": time.time()}
+            self._prune()
+        asyncio.run_coroutine_threadsafe(self._run_job(job_id, payload), self._loop)
+        return job_id
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job["status"] in ("done", "failed")]
+        for job_id in finished[:max(0, len(self.jobs) - self.keep_jobs)]:
+            del self.jobs[job_id]
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self.jobs[job_id].update(fields)
+
+    async def _run_job(self, job_id, payload):
+        async with self._semaphore:
+            self._update(job_id, status="running", started_at=time.time())
+            try:
+                crew = await asyncio.to_thread(self.crew_factory, job_id)
+                result = await crew.kickoff_async(inputs=self.build_inputs(payload))
+                self._update(job_id, status="done", finished_at=time.time(), result=result.raw)
+            except Exception as e:
+                self._update(job_id, status="failed", finished_at=time.time(), error=str(e))
+
+
+def make_handler(service: TriggerService):
+    class TriggerHandler(BaseHTTPRequestHandler):
+        """POST /jobs with a JSON payload -> 202 {"job_id"}; GET /jobs/<id> -> job status/result."""
+
+        def _reply(self, status: int, body: dict):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/jobs":
+                return self._reply(404, {"error": "not found"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"null")
+            except (ValueError, json.JSONDecodeError):
+                return self._reply(400, {"error": "Invalid JSON payload"})
+            try:
+                job_id = service.submit(payload)
+            except QueueFullError as e:
+                return self._reply(429, {"error": str(e)})
+            self._reply(202, {"job_id": job_id})
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/health":
+                return self._reply(200, {"status": "ok"})
+            if self.path.startswith("/jobs/"):
+                job = service.get(self.path[len("/jobs/"):].strip("/"))
+                if job:
+                    return self._reply(200, job)
+            self._reply(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return TriggerHandler
+
+
+def serve(service: TriggerService, host: str = "127.0.0.1", port: int = 8787):
+    """Serves the trigger API until interrupted."""
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Trigger server listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
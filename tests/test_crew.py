@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from crypt_agent import metrics
+from crypt_agent.bench import ScriptedLLM, scripted_llms
+from crypt_agent.scheduler import CycleScheduler
+from crypt_agent.tools.session import set_session
+from crypt_agent.tools.simulator import SimulatedExchange
+
+
+class Outage(ScriptedLLM):
+    """Scripted LLM that raises while `down` is set, after the earlier agents ran."""
+
+    down = True
+
+    def call(self, *args, **kwargs):
+        if Outage.down:
+            raise RuntimeError("model unavailable")
+        return super().call(*args, **kwargs)
+
+
+@pytest.fixture
+def offline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CRYPT_AGENT_LLM_CACHE", "0")
+    monkeypatch.setenv("CREWAI_DISABLE_TELEMETRY", "true")
+    monkeypatch.setenv("OTEL_SDK_DISABLED", "true")
+    set_session(SimulatedExchange(symbols=50, balance=1e9))
+    yield tmp_path
+    set_session(None)
+
+
+def test_a_failed_cycle_is_not_reported_with_the_next_one(offline, monkeypatch):
+    from crypt_agent.crew import CryptAgent
+
+    monkeypatch.setattr(Outage, "down", True)
+    scripts = scripted_llms()
+    crew_base = CryptAgent(llm_factory=lambda name, model: (Outage if name == "trader" else ScriptedLLM)(*scripts[name]),
+                           cache=False)
+    crew = crew_base.crew()
+
+    def cycle():
+        try:
+            crew.kickoff(inputs={"topic": "test", "current_year": "2026"})
+        finally:
+            crew_base.end_cycle()
+
+    scheduler = CycleScheduler(cycle, interval_seconds=1)
+    assert scheduler.trigger() is False
+    assert metrics._cycle.get() is None
+    Outage.down = False
+    assert scheduler.trigger() is True
+
+    (line,) = (offline / "output" / "cycle_metrics.jsonl").read_text().splitlines()
+    assert json.loads(line)["tools"]["scan_market_momentum"]["calls"] == 1
+    (usage,) = (offline / "output" / "llm_usage.jsonl").read_text().splitlines()
+    researcher = next(row for row in json.loads(usage)["rows"] if row["agent"] == "researcher")
+    assert researcher["calls"] == len(scripts["researcher"][0]) + 1
@@ -0,0 +1,64 @@
+from decimal import Decimal
+
+import pytest
+
+from crypt_agent.tools.custom_tool import plan_slices, sliced_execution
+from crypt_agent.tools.session import set_session
+from crypt_agent.tools.simulator import SimulatedExchange
+
+
+def test_quantity_is_rounded_down_to_the_step():
+    assert plan_slices(1.2349, max_qty="100", min_qty="0.001", qty_step="0.001") == [Decimal("1.234")]
+    assert plan_slices(7.9, max_qty="100", min_qty="1", qty_step="1") == [Decimal("7")]
+
+
+def test_quantities_above_max_are_split_into_the_fewest_slices():
+    slices = plan_slices(25, max_qty="10", min_qty="1", qty_step="1")
+
+    assert len(slices) == 3
+    assert sum(slices) == 25
+    assert max(slices) <= 10
+
+
+def test_the_remainder_is_spread_over_the_first_slices():
+    assert plan_slices(0.23, max_qty="0.1", min_qty="0.01", qty_step="0.01") == \
+        [Decimal("0.08"), Decimal("0.08"), Decimal("0.07")]
+    assert plan_slices(20, max_qty="10", min_qty="1", qty_step="1") == [Decimal("10"), Decimal("10")]
+
+
+@pytest.mark.parametrize("total_qty, min_qty, qty_step", [
+    (0.0009, "0.001", "0.001"),  # rounds down to zero
+    (0.5, "1", "0.001"),         # below the minimum
+    (1.1, "0.6", "0.01"),        # two slices of 0.55 would each be below the minimum
+])
+def test_quantities_that_cannot_be_placed_get_no_slices(total_qty, min_qty, qty_step):
+    assert plan_slices(total_qty, max_qty="1", min_qty=min_qty, qty_step=qty_step) == []
+
+
+@pytest.fixture
+def exchange():
+    exchange = SimulatedExchange(symbols=3, balance=1e9)
+    set_session(exchange)
+    yield exchange
+    set_session(None)
+
+
+def test_sliced_execution_places_every_slice(exchange):
+    lot = exchange.instruments["BTCUSDT"]["lotSizeFilter"]
+    total_qty = float(Decimal(lot["maxMktOrderQty"]) * 2 + Decimal(lot["qtyStep"]))
+
+    execution = sliced_execution("BTCUSDT", "Buy", total_qty, "", "", progress=lambda line: None)
+
+    assert execution.status == "success"
+    assert len(execution.slices) == len(exchange.orders) == 3
+    assert sum(Decimal(order["qty"]) for order in exchange.orders) == Decimal(str(total_qty))
+
+
+def test_sliced_execution_rejects_a_quantity_below_the_minimum(exchange):
+    lot = exchange.instruments["BTCUSDT"]["lotSizeFilter"]
+
+    execution = sliced_execution("BTCUSDT", "Buy", float(lot["minOrderQty"]) / 2, "", "", progress=lambda line: None)
+
+    assert execution.status == "error"
+    assert "below the minimum" in execution.message
+    assert exchange.orders == []
@@ -0,0 +1,166 @@
+from dataclasses import asdict
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from crypt_agent.tools import indicators
+from crypt_agent.tools.indicators import IncrementalIndicators, IndicatorSettings, IndicatorStates, latest_indicators
+
+MINUTE = 60_000
+START = 1_700_000_040_000
+SETTINGS = [IndicatorSettings(), IndicatorSettings(rsi_window=7, macd_fast=5, macd_slow=35, macd_signal=5)]
+
+
+def closes(count, seed=7):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.01, count)))
+
+
+def pandas_indicators(close, settings=IndicatorSettings()) -> dict:
+    """The pandas formulas calculate_technical_indicators used before the
+    incremental state (RSI on rolling means, MACD on adjust=False EMAs)."""
+    df = pd.DataFrame({"close": close})
+    delta = df["close"].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=settings.rsi_window).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=settings.rsi_window).mean()
+    df["rsi"] = 100 - (100 / (1 + gain / loss))
+    exp1 = df["close"].ewm(span=settings.macd_fast, adjust=False).mean()
+    exp2 = df["close"].ewm(span=settings.macd_slow, adjust=False).mean()
+    df["macd"] = exp1 - exp2
+    df["signal"] = df["macd"].ewm(span=settings.macd_signal, adjust=False).mean()
+    df["histogram"] = df["macd"] - df["signal"]
+    latest = df.iloc[-1]
+    return {name: latest[name] for name in ("rsi", "macd", "signal", "histogram")}
+
+
+def assert_matches(values: dict, expected: dict):
+    for name, value in expected.items():
+        assert values[name] == pytest.approx(float(np.ravel(value)[0]), rel=1e-9, abs=1e-9), name
+
+
+@pytest.mark.parametrize("settings", SETTINGS)
+def test_updates_match_the_vectorized_and_pandas_formulas(settings):
+    series = closes(300)
+    state = IncrementalIndicators(**asdict(settings)).seed(series[:100])
+    assert_matches(state.current(), latest_indicators(series[:100], settings))
+
+    for end in range(101, len(series) + 1):
+        values = state.update(series[end - 1])
+        assert_matches(values, latest_indicators(series[:end], settings))
+    assert_matches(values, pandas_indicators(series, settings))
+
+
+@pytest.mark.parametrize("settings", SETTINGS)
+def test_peek_evaluates_the_forming_candle_without_committing_it(settings):
+    series = closes(150)
+    state = IncrementalIndicators(**asdict(settings)).seed(series[:-1])
+    before = state.current()
+
+    assert_matches(state.peek(series[-1]), pandas_indicators(series, settings))
+    assert_matches(state.peek(series[-1] * 1.01), latest_indicators(np.append(series[:-1], series[-1] * 1.01), settings))
+    assert state.current() == before
+
+
+def test_rsi_is_undefined_until_the_window_is_full():
+    state = IncrementalIndicators(rsi_window=14).seed(closes(13))
+    assert np.isnan(state.current()["rsi"])
+    assert not np.isnan(state.update(101.0)["rsi"])
+
+
+def test_running_sums_do_not_drift():
+    series = closes(20_000)
+    state = IncrementalIndicators().seed(series[:100])
+    for close in series[100:]:
+        state.update(close)
+    assert_matches(state.current(), {"rsi": pandas_indicators(series[-200:])["rsi"]})
+
+
+def rows_for(close, first_open=START):
+    opens = first_open + MINUTE * np.arange(len(close))
+    return np.column_stack([opens, close, close, close, close, np.ones(len(close)), close])
+
+
+@pytest.fixture
+def frozen_time(monkeypatch):
+    """Freezes indicators' clock inside the candle opened at the given time."""
+    def freeze(open_ms):
+        monkeypatch.setattr(indicators, "time", SimpleNamespace(time=lambda: (open_ms + 30_000) / 1000))
+
+    return freeze
+
+
+def test_states_apply_only_the_newly_closed_candles(frozen_time, monkeypatch):
+    series = closes(260)
+    rows = rows_for(series)
+    states = IndicatorStates()
+
+    frozen_time(rows[99, 0])  # rows[99] is still forming
+    assert_matches(states.latest("BTCUSDT", "1", rows[:100]), pandas_indicators(series[:100]))
+
+    seeds = []
+    monkeypatch.setattr(IncrementalIndicators, "seed", lambda self, *args: seeds.append(args))
+    for end in range(103, 261, 3):
+        # A sliding window of the latest 100 candles, as the kline store returns them
+        frozen_time(rows[end - 1, 0])
+        values = states.latest("BTCUSDT", "1", rows[end - 100:end])
+        # EMAs keep the history seen before the window, so compare with the whole series
+        assert_matches(values, pandas_indicators(series[:end]))
+    assert seeds == []
+
+
+def test_states_reseed_when_the_rows_do_not_continue_the_state(frozen_time):
+    series = closes(400)
+    rows = rows_for(series)
+    states = IndicatorStates()
+    frozen_time(rows[99, 0])
+    states.latest("BTCUSDT", "1", rows[:100])
+
+    # A gap: the new rows start after the last applied candle
+    frozen_time(rows[299, 0])
+    assert_matches(states.latest("BTCUSDT", "1", rows[200:300]), pandas_indicators(series[200:300]))
+
+    # Rows from before the state (out of range) re-seed as well
+    frozen_time(rows[149, 0])
+    assert_matches(states.latest("BTCUSDT", "1", rows[50:150]), pandas_indicators(series[50:150]))
+
+
+def test_states_are_kept_per_symbol_interval_and_settings(frozen_time):
+    series = closes(100)
+    rows = rows_for(series)
+    states = IndicatorStates()
+    frozen_time(rows[-1, 0] + MINUTE)  # every row is closed
+
+    assert_matches(states.latest("BTCUSDT", "1", rows), pandas_indicators(series))
+    custom = SETTINGS[1]
+    assert_matches(states.latest("BTCUSDT", "1", rows, custom), pandas_indicators(series, custom))
+    assert_matches(states.latest("ETHUSDT", "1", rows[:-10]), pandas_indicators(series[:-10]))
+    assert len(states._states) == 3
+
+
+def test_states_reseed_on_a_gap_after_the_last_applied_candle(frozen_time):
+    series = closes(300)
+    rows = rows_for(series)
+    states = IndicatorStates()
+    frozen_time(rows[99, 0])
+    states.latest("BTCUSDT", "1", rows[:100])
+
+    # The window still contains the last applied candle, but candles 150-169 are missing
+    window = np.concatenate([rows[90:150], rows[170:250]])
+    frozen_time(rows[249, 0])
+
+    assert_matches(states.latest("BTCUSDT", "1", window), pandas_indicators(series[170:250]))
+
+
+def test_monthly_candles_close_at_the_next_calendar_month(frozen_time):
+    opens = np.arange("2018-01", "2021-02", dtype="datetime64[M]").astype("datetime64[ms]").astype("int64")
+    series = closes(len(opens))
+    rows = rows_for(series)
+    rows[:, 0] = opens
+    states = IndicatorStates()
+
+    # January 2021 is still forming on the 31st; a fixed 30-day month would have closed it
+    frozen_time(opens[-1] + 30 * 86_400_000)
+    assert_matches(states.latest("BTCUSDT", "M", rows), pandas_indicators(series))
+    assert states._states[("BTCUSDT", "M", IndicatorSettings())].last_timestamp == opens[-2]
@@ -0,0 +1,127 @@
+import time
+
+import numpy as np
+import pytest
+
+from crypt_agent.tools.kline_store import KlineStore, contiguous, parse_kline_list
+from crypt_agent.tools.simulator import SimulatedExchange
+
+MINUTE = 60_000
+SYMBOL = "BTCUSDT"
+
+
+class RecordingExchange(SimulatedExchange):
+    """Keeps the arguments of every get_kline request."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.kline_requests = []
+
+    def get_kline(self, **kwargs):
+        self.kline_requests.append(kwargs)
+        return super().get_kline(**kwargs)
+
+
+@pytest.fixture
+def exchange():
+    now = [time.time()]
+    exchange = RecordingExchange(symbols=3, clock=lambda: now[0])
+    exchange.advance = lambda minutes: now.__setitem__(0, now[0] + minutes * 60)
+    return exchange
+
+
+def latest(exchange, limit):
+    return parse_kline_list(SimulatedExchange.get_kline(exchange, category="linear", symbol=SYMBOL,
+                                                        interval="1", limit=limit)["result"]["list"])
+
+
+def test_cold_sync_fetches_the_latest_page_and_stores_it(exchange, tmp_path):
+    store = KlineStore(root=str(tmp_path))
+
+    rows = store.sync(exchange, SYMBOL, "1", limit=100)
+
+    np.testing.assert_array_equal(rows, latest(exchange, 100))
+    assert len(exchange.kline_requests) == 1
+    np.testing.assert_array_equal(KlineStore(root=str(tmp_path)).load(SYMBOL, "1"), rows)
+
+
+def test_sync_only_requests_candles_from_the_last_stored_one(exchange, tmp_path):
+    store = KlineStore(root=str(tmp_path))
+    first = store.sync(exchange, SYMBOL, "1", limit=100)
+    exchange.advance(3)
+
+    rows = store.sync(exchange, SYMBOL, "1", limit=100)
+
+    assert exchange.kline_requests[-1]["start"] == int(first[-1, 0])
+    np.testing.assert_array_equal(rows, latest(exchange, 100))
+    # The candle that was still forming at the first sync is replaced by its final values
+    assert rows[-4, 0] == first[-1, 0]
+    assert len(store.load(SYMBOL, "1")) == 103
+
+
+def test_sync_reuses_recent_candles_with_max_age(exchange, tmp_path):
+    store = KlineStore(root=str(tmp_path))
+    first = store.sync(exchange, SYMBOL, "1", limit=100)
+    exchange.advance(1)
+
+    rows = store.sync(exchange, SYMBOL, "1", limit=100, max_age=60)
+
+    assert len(exchange.kline_requests) == 1
+    np.testing.assert_array_equal(rows, first)
+
+
+def test_stale_store_is_replaced_by_a_fresh_page(exchange, tmp_path):
+    store = KlineStore(root=str(tmp_path))
+    old = latest(exchange, 50)
+    old[:, 0] -= 2000 * MINUTE  # more than one page behind
+    store.save(SYMBOL, "1", old)
+
+    rows = store.sync(exchange, SYMBOL, "1", limit=100)
+
+    assert "start" not in exchange.kline_requests[-1]
+    np.testing.assert_array_equal(store.load(SYMBOL, "1"), rows)
+    assert rows[0, 0] > old[-1, 0]
+
+
+def test_asking_for_more_history_than_stored_refetches(exchange, tmp_path):
+    store = KlineStore(root=str(tmp_path))
+    store.sync(exchange, SYMBOL, "1", limit=50)
+
+    rows = store.sync(exchange, SYMBOL, "1", limit=200)
+
+    assert exchange.kline_requests[-1]["limit"] == 200
+    np.testing.assert_array_equal(rows, latest(exchange, 200))
+
+
+def candles(opens, close):
+    opens = np.asarray(opens, dtype=float)
+    return np.column_stack([opens] + [np.full(len(opens), float(close))] * 6)
+
+
+def test_merge_replaces_candles_from_the_first_fetched_one():
+    rows = candles([0, 1, 2, 3], close=1)
+    merged = KlineStore.merge(rows, candles([2, 3, 4], close=2))
+
+    np.testing.assert_array_equal(merged[:, 0], [0, 1, 2, 3, 4])
+    np.testing.assert_array_equal(merged[:, 4], [1, 1, 2, 2, 2])
+    np.testing.assert_array_equal(KlineStore.merge(rows, candles([], close=2)), rows)
+    np.testing.assert_array_equal(KlineStore.merge(candles([], close=1), rows), rows)
+
+
+def test_combine_unions_in_time_order_and_prefers_fetched_candles():
+    combined = KlineStore.combine(candles([3, 4, 5], close=1), candles([1, 2, 3], close=2))
+
+    np.testing.assert_array_equal(combined[:, 0], [1, 2, 3, 4, 5])
+    np.testing.assert_array_equal(combined[:, 4], [2, 2, 2, 1, 1])
+
+
+def test_larger_limit_after_a_gap_does_not_leave_a_hole(exchange, tmp_path):
+    store = KlineStore(root=str(tmp_path))
+    store.sync(exchange, SYMBOL, "1", limit=50)
+    exchange.advance(200)  # less than a page, more than the new limit
+
+    rows = store.sync(exchange, SYMBOL, "1", limit=100)
+
+    np.testing.assert_array_equal(rows, latest(exchange, 100))
+    assert contiguous(store.load(SYMBOL, "1"), "1")
+    np.testing.assert_array_equal(store.sync(exchange, SYMBOL, "1", limit=150), latest(exchange, 150))
@@ -0,0 +1,47 @@
+from crypt_agent.bench import ScriptedLLM
+from crypt_agent.llms import CachedLLM, ResponseCache, calls_tool
+
+MESSAGES = [{"role": "user", "content": "Place the orders."}]
+
+
+class CountingLLM(ScriptedLLM):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.calls = 0
+
+    def call(self, *args, **kwargs):
+        self.calls += 1
+        return super().call(*args, **kwargs)
+
+
+def cached_llm(tmp_path, actions, final="done"):
+    inner = CountingLLM(actions, final)
+    return CachedLLM("bench/scripted", agent_name="trader", inner=inner,
+                     cache=ResponseCache(path=str(tmp_path / "cache.sqlite3"))), inner
+
+
+def test_tool_calls_are_never_answered_from_the_cache(tmp_path):
+    llm, inner = cached_llm(tmp_path, [("execute_multiple_orders", {"orders": []})])
+
+    first = llm.call(MESSAGES)
+    second = llm.call(MESSAGES)
+
+    assert calls_tool(first) and second == first
+    assert inner.calls == 2
+    assert llm.cache_hits == 0
+
+
+def test_final_answers_are_cached(tmp_path):
+    llm, inner = cached_llm(tmp_path, [])
+
+    first = llm.call(MESSAGES)
+
+    assert llm.call(MESSAGES) == first
+    assert inner.calls == 1
+    assert llm.cache_hits == 1
+
+
+def test_calls_tool_only_matches_parsable_actions():
+    assert calls_tool('Thought: x\nAction: fetch_ticker_price\nAction Input: {"symbol": "BTCUSDT"}')
+    assert not calls_tool("Thought: x\nFinal Answer: 42")
+    assert not calls_tool("no format at all")
@@ -0,0 +1,204 @@
+import base64
+import hashlib
+import json
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from crypt_agent.tools.market_stream import MarketStream
+
+MINUTE = 60_000
+START = 1_700_000_040_000  # a minute boundary
+SYMBOL = "BTCUSDT"
+
+
+def candles(first_open, count, interval_ms=MINUTE, price=100.0):
+    """Rows in the KlineStore layout, one candle per interval from `first_open`."""
+    opens = first_open + interval_ms * np.arange(count)
+    close = price + np.arange(count, dtype=float)
+    return np.column_stack([opens, close, close + 1, close - 1, close, np.ones(count), close])
+
+
+def kline_message(row, interval="1", symbol=SYMBOL):
+    """A kline push as Bybit sends it."""
+    return {
+        "topic": f"kline.{interval}.{symbol}",
+        "type": "snapshot",
+        "ts": int(row[0]) + 1000,
+        "data": [{
+            "start": int(row[0]), "end": int(row[0]) + MINUTE - 1, "interval": interval,
+            "open": str(row[1]), "high": str(row[2]), "low": str(row[3]), "close": str(row[4]),
+            "volume": str(row[5]), "turnover": str(row[6]), "confirm": False, "timestamp": int(row[0]) + 1000,
+        }],
+    }
+
+
+def ticker_message(ts, last_price="100.5", symbol=SYMBOL):
+    return {"topic": f"tickers.{symbol}", "type": "snapshot", "ts": ts, "data": {"symbol": symbol, "lastPrice": last_price}}
+
+
+class FakeBybitStream:
+    """Minimal WebSocket server (RFC 6455 handshake and text frames) that
+    waits for the client's subscribe request, then replays `messages`."""
+
+    GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.subscribed = []
+        self.replayed = threading.Event()
+        self._server = socket.create_server(("127.0.0.1", 0))
+        self.url = f"ws://127.0.0.1:{self._server.getsockname()[1]}"
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def close(self):
+        self._server.close()
+
+    def _serve(self):
+        conn, _ = self._server.accept()
+        with conn:
+            request = b""
+            while b"\r\n\r\n" not in request:
+                request += conn.recv(4096)
+            key = next(line.split(":", 1)[1].strip() for line in request.decode().split("\r\n")
+                       if line.lower().startswith("sec-websocket-key"))
+            accept = base64.b64encode(hashlib.sha1((key + self.GUID).encode()).digest()).decode()
+            conn.sendall((
+                "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+            ).encode())
+            while not self.subscribed:
+                _, text = self._receive(conn)
+                payload = json.loads(text)
+                if payload.get("op") == "subscribe":
+                    self.subscribed.extend(payload["args"])
+            for message in self.messages:
+                self._send(conn, json.dumps(message))
+            self.replayed.set()
+            # Answer the client's close frame; ignore anything else (pings, more subscribes)
+            while self._receive(conn)[0] != 0x8:
+                pass
+            conn.sendall(bytes([0x88, 0]))
+
+    @staticmethod
+    def _receive(conn) -> tuple:
+        def read(n):
+            data = b""
+            while len(data) < n:
+                data += conn.recv(n - len(data))
+            return data
+
+        first, second = read(2)
+        length = second & 0x7F
+        if length == 126:
+            length = int.from_bytes(read(2), "big")
+        elif length == 127:
+            length = int.from_bytes(read(8), "big")
+        mask = read(4)  # client frames are always masked
+        return first & 0x0F, bytes(b ^ mask[i % 4] for i, b in enumerate(read(length))).decode(errors="replace")
+
+    @staticmethod
+    def _send(conn, text: str):
+        data = text.encode()
+        if len(data) < 126:
+            header = bytes([0x81, len(data)])
+        else:
+            header = bytes([0x81, 126]) + len(data).to_bytes(2, "big")
+        conn.sendall(header + data)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+def frozen(rows, seconds_into_candle=30):
+    """A clock inside the last candle of `rows`."""
+    return lambda: (rows[-1, 0] + seconds_into_candle * 1000) / 1000
+
+
+def test_replays_recorded_messages_from_a_websocket_server():
+    history = candles(START, 120)
+    pushed = candles(START + 119 * MINUTE, 3, price=300.0)  # updates the last seeded candle, then two new ones
+    clock = frozen(pushed)
+    server = FakeBybitStream([kline_message(row) for row in pushed] + [ticker_message(int(clock() * 1000))])
+    stream = MarketStream(url=server.url, ping_interval=60, clock=clock)
+    try:
+        stream.watch_klines(SYMBOL, "1", history)
+        stream.watch_ticker([SYMBOL])
+        assert server.replayed.wait(5)
+        wait_for(lambda: stream.ticker(SYMBOL) is not None)
+
+        assert "kline.1.BTCUSDT" in server.subscribed
+        rows = stream.klines(SYMBOL, "1", limit=100)
+        assert rows is not None
+        np.testing.assert_array_equal(rows[:-3], history[-98:-1])
+        np.testing.assert_array_equal(rows[-3:], pushed)
+        assert stream.ticker(SYMBOL)["lastPrice"] == "100.5"
+    finally:
+        stream.stop()
+        server.close()
+
+
+def live_stream(rows, interval="1", **kwargs):
+    stream = MarketStream(url="ws://127.0.0.1:9", clock=frozen(rows), **kwargs)
+    stream.connected = True
+    stream._add_topics = lambda topics: None  # buffers only, no connection
+    stream.watch_klines(SYMBOL, interval, rows)
+    return stream
+
+
+def test_klines_are_not_served_once_pushes_stop():
+    history = candles(START, 120)
+    stream = live_stream(history)
+    assert stream.klines(SYMBOL, "1", limit=100) is not None
+
+    stream.clock = lambda: (history[-1, 0] + MINUTE) / 1000  # the next candle should have opened
+    assert stream.klines(SYMBOL, "1", limit=100) is None
+
+
+def test_klines_with_missing_candles_are_not_served():
+    history = np.delete(candles(START, 121), 60, axis=0)
+    stream = live_stream(history)
+    assert stream.klines(SYMBOL, "1", limit=100) is None
+    assert stream.klines(SYMBOL, "1", limit=50) is not None
+
+
+def test_gap_after_the_seed_drops_the_seeded_candles():
+    history = candles(START, 120)
+    stream = live_stream(history)
+    late = candles(START + 125 * MINUTE, 1)
+    stream.handle_message(kline_message(late[0]))
+    stream.clock = frozen(late)
+    assert stream.klines(SYMBOL, "1", limit=100) is None
+
+    # Re-seeding from REST history that covers the gap makes the buffer usable again
+    stream.watch_klines(SYMBOL, "1", candles(START + 6 * MINUTE, 120))
+    rows = stream.klines(SYMBOL, "1", limit=100)
+    assert rows is not None and rows[-1, 0] == late[0, 0]
+
+
+def test_pushes_before_seeding_are_kept_only_if_they_follow_the_history():
+    stream = MarketStream(url="ws://127.0.0.1:9")
+    stream.connected = True
+    stream._add_topics = lambda topics: None
+    pushed = candles(START + 130 * MINUTE, 1)
+    stream.handle_message(kline_message(pushed[0]))
+    stream.clock = frozen(pushed)
+
+    stream.watch_klines(SYMBOL, "1", candles(START, 120))  # ends 10 candles before the push
+    assert stream.klines(SYMBOL, "1", limit=100) is None
+
+
+@pytest.mark.parametrize("age_s, served", [(1, True), (10, False)])
+def test_stale_tickers_are_not_served(age_s, served):
+    stream = MarketStream(url="ws://127.0.0.1:9", ticker_max_age=5, clock=lambda: START / 1000 + age_s)
+    stream.connected = True
+    stream.handle_message(ticker_message(START))
+    assert (stream.ticker(SYMBOL) is not None) == served
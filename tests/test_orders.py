@@ -0,0 +1,146 @@
+from decimal import Decimal
+
+import pytest
+
+from crypt_agent.tools import orders
+from crypt_agent.tools.session import set_session
+from crypt_agent.tools.simulator import SimulatedExchange
+
+SYMBOL = "BTCUSDT"
+
+
+class ShuffledBatches(SimulatedExchange):
+    """Answers batch requests with the per-order lists in reverse order."""
+
+    def place_batch_order(self, category="linear", request=None, **kwargs):
+        response = super().place_batch_order(category, request, **kwargs)
+        response["result"]["list"].reverse()
+        response["retExtInfo"]["list"].reverse()
+        return response
+
+
+class LostBatchResponses(SimulatedExchange):
+    """Places batch requests but fails before answering, like a read timeout."""
+
+    def place_batch_order(self, category="linear", request=None, **kwargs):
+        super().place_batch_order(category, request, **kwargs)
+        raise TimeoutError("read timed out")
+
+
+class ThrottledOrders(SimulatedExchange):
+    """Rejects every other order of a batch request with the rate-limit code, without placing it."""
+
+    def place_batch_order(self, category="linear", request=None, **kwargs):
+        placed = super().place_batch_order(category, request[::2], **kwargs)
+        items, infos = [], []
+        for i, order in enumerate(request):
+            if i % 2:
+                items.append({"category": category, "symbol": order["symbol"], "orderId": "",
+                              "orderLinkId": order["orderLinkId"], "createAt": ""})
+                infos.append({"code": 10006, "msg": "Too many visits"})
+            else:
+                items.append(placed["result"]["list"][i // 2])
+                infos.append(placed["retExtInfo"]["list"][i // 2])
+        placed["result"]["list"], placed["retExtInfo"]["list"] = items, infos
+        return placed
+
+
+@pytest.fixture
+def use_exchange():
+    def use(exchange_class=SimulatedExchange):
+        exchange = exchange_class(symbols=5, balance=1e9)
+        set_session(exchange)
+        return exchange
+
+    yield use
+    set_session(None)
+
+
+def market_orders(exchange, count, symbol=SYMBOL):
+    """`count` valid market orders with distinct quantities (1, 2, ... times the minimum)."""
+    min_qty = Decimal(exchange.instruments[symbol]["lotSizeFilter"]["minOrderQty"])
+    return [{"symbol": symbol, "side": "Buy", "orderType": "Market", "qty": str(min_qty * (i + 1))} for i in range(count)]
+
+
+def filled_qty(exchange, order_id):
+    return next(order["qty"] for order in exchange.orders if order["orderId"] == order_id)
+
+
+def test_batch_results_are_mapped_back_by_order_link_id(use_exchange):
+    exchange = use_exchange(ShuffledBatches)
+    requested = market_orders(exchange, 5)
+    requested[2]["orderLinkId"] = "my-order"
+
+    results = orders.submit_orders(requested, via_batch=True)
+
+    assert [result.status for result in results] == ["success"] * 5
+    for order, result in zip(requested, results):
+        assert Decimal(filled_qty(exchange, result.order_id)) == Decimal(order["qty"])
+    assert exchange.stats["place_batch_order"]["calls"] == 1
+    assert "place_order" not in exchange.stats
+    assert "my-order" in exchange._link_ids
+    assert all(len(link_id) <= 36 for link_id in exchange._link_ids)
+
+
+def test_failed_batch_request_is_resent_without_filling_twice(use_exchange):
+    exchange = use_exchange(LostBatchResponses)
+
+    results = orders.submit_orders(market_orders(exchange, 4), via_batch=True)
+
+    # The batch was placed before the request failed: every resent order is a duplicate orderLinkId
+    assert [result.status for result in results] == ["success"] * 4
+    assert all("placed by an earlier request" in result.message for result in results)
+    assert exchange.stats["place_order"]["calls"] == 4
+    assert len(exchange.orders) == 4
+
+
+def test_orders_failing_with_a_retryable_code_are_resent_one_by_one(use_exchange):
+    exchange = use_exchange(ThrottledOrders)
+    requested = market_orders(exchange, 6)
+
+    results = orders.submit_orders(requested, via_batch=True)
+
+    assert [result.status for result in results] == ["success"] * 6
+    assert exchange.stats["place_order"]["calls"] == 3
+    assert len(exchange.orders) == 6
+    for order, result in zip(requested, results):
+        assert Decimal(filled_qty(exchange, result.order_id)) == Decimal(order["qty"])
+
+
+def test_rejected_batch_orders_are_not_resent(use_exchange):
+    exchange = use_exchange()
+    requested = market_orders(exchange, 3)
+    requested[1]["qty"] = "0"
+
+    results = orders.submit_orders(requested, via_batch=True)
+
+    assert [result.status for result in results] == ["success", "error", "success"]
+    assert "110094" in results[1].message
+    assert "place_order" not in exchange.stats
+
+
+@pytest.mark.parametrize("via_batch", [False, True])
+def test_stop_on_reject_skips_orders_not_sent_yet(use_exchange, monkeypatch, via_batch):
+    monkeypatch.setattr(orders, "ORDER_CONCURRENCY", 1)
+    monkeypatch.setattr(orders, "BATCH_ORDER_SIZE", 2)
+    exchange = use_exchange()
+    requested = market_orders(exchange, 6)
+    requested[1]["qty"] = "0"
+
+    results = orders.submit_orders(requested, via_batch=via_batch, stop_on_reject=True)
+
+    assert [result.status for result in results] == ["success", "error"] + ["error"] * 4
+    assert all(result.message == "skipped after an earlier order was rejected" for result in results[2:])
+    assert len(exchange.orders) == 1
+
+
+def test_without_stop_on_reject_the_remaining_orders_are_sent(use_exchange, monkeypatch):
+    monkeypatch.setattr(orders, "ORDER_CONCURRENCY", 1)
+    exchange = use_exchange()
+    requested = market_orders(exchange, 4)
+    requested[1]["qty"] = "0"
+
+    results = orders.submit_orders(requested, via_batch=False)
+
+    assert [result.status for result in results] == ["success", "error", "success", "success"]
+    assert len(exchange.orders) == 3
@@ -0,0 +1,76 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from crypt_agent.tools.rate_limit import SlidingWindowLimiter
+
+PERIOD = 0.2
+
+
+def max_in_window(times, period=PERIOD):
+    times = sorted(times)
+    return max(sum(1 for other in times[i:] if other - start < period) for i, start in enumerate(times))
+
+
+def test_acquire_allows_at_most_calls_per_window():
+    limiter = SlidingWindowLimiter(calls=3, period=PERIOD)
+    started = time.monotonic()
+    times = []
+    for _ in range(7):
+        limiter.acquire()
+        times.append(time.monotonic())
+
+    assert max_in_window(times) == 3
+    # Calls 4 and 7 each wait for a window to pass
+    assert PERIOD * 2 <= time.monotonic() - started < PERIOD * 3
+
+
+def test_requests_count_from_their_completion():
+    limiter = SlidingWindowLimiter(calls=2, period=PERIOD)
+    with limiter.request():
+        time.sleep(PERIOD)  # a slow request is still in the window when it completes
+    limiter.acquire()
+
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started >= PERIOD * 0.9
+
+
+def test_in_flight_requests_hold_their_slot():
+    limiter = SlidingWindowLimiter(calls=1, period=PERIOD)
+    released = threading.Event()
+
+    def slow_request():
+        with limiter.request():
+            released.wait(5)
+
+    worker = threading.Thread(target=slow_request)
+    worker.start()
+    time.sleep(0.05)
+    waiter = threading.Thread(target=limiter.acquire)
+    waiter.start()
+    waiter.join(PERIOD * 2)
+    assert waiter.is_alive()  # no slot frees up while the first request is in flight
+
+    released.set()
+    worker.join()
+    waiter.join(PERIOD * 3)
+    assert not waiter.is_alive()
+
+
+def test_concurrent_requests_never_exceed_the_window():
+    limiter = SlidingWindowLimiter(calls=5, period=PERIOD)
+    completed = []
+    lock = threading.Lock()
+
+    def request(i):
+        with limiter.request():
+            time.sleep(0.01 * (i % 3))  # uneven request durations
+            with lock:
+                completed.append(time.monotonic())
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(request, range(20)))
+
+    assert len(completed) == 20
+    assert max_in_window(completed) <= 5
@@ -0,0 +1,30 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from crypt_agent.scheduler import CycleScheduler
+
+
+def at(text: str) -> float:
+    return datetime.fromisoformat(text).replace(tzinfo=timezone.utc).timestamp()
+
+
+@pytest.mark.parametrize("interval, now, expected", [
+    ("15", "2026-10-17T12:07:00", "2026-10-17T12:15:00"),
+    ("240", "2026-10-17T12:07:00", "2026-10-17T16:00:00"),
+    ("D", "2026-10-17T12:07:00", "2026-10-18T00:00:00"),
+    # Weekly candles open on Monday, monthly ones on the 1st
+    ("W", "2026-10-17T12:00:00", "2026-10-19T00:00:00"),
+    ("W", "2026-10-19T00:00:00", "2026-10-26T00:00:00"),
+    ("M", "2026-10-17T12:00:00", "2026-11-01T00:00:00"),
+    ("M", "2024-02-10T00:00:00", "2024-03-01T00:00:00"),
+    ("M", "2026-12-31T23:59:00", "2027-01-01T00:00:00"),
+])
+def test_cycles_start_after_the_candle_closes(interval, now, expected):
+    scheduler = CycleScheduler(lambda: None, candle_interval=interval, offset_seconds=2)
+    assert scheduler.next_run(at(now)) == at(expected) + 2
+
+
+def test_fixed_interval_cycles():
+    scheduler = CycleScheduler(lambda: None, interval_seconds=300)
+    assert scheduler.next_run(1000.0) == 1300.0
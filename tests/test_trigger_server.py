@@ -0,0 +1,76 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from crypt_agent.bench import ScriptedLLM, scripted_llms
+from crypt_agent.tools.session import set_session
+from crypt_agent.tools.simulator import SimulatedExchange
+from crypt_agent.trigger_server import TriggerService
+
+
+class GatedLLM(ScriptedLLM):
+    """Scripted LLM whose crew waits for the other job's crew twice: when the
+    researcher starts and when the reporter starts, so both cycles overlap."""
+
+    def __init__(self, name, gates, actions, final):
+        super().__init__(actions, final)
+        self.name = name
+        self.gates = gates
+
+    def call(self, messages, *args, **kwargs):
+        if self.name in self.gates and not any(m.get("role") == "assistant" for m in messages if isinstance(m, dict)):
+            self.gates[self.name].wait(timeout=60)
+        return super().call(messages, *args, **kwargs)
+
+
+@pytest.fixture
+def offline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CRYPT_AGENT_LLM_CACHE", "0")
+    monkeypatch.setenv("CREWAI_DISABLE_TELEMETRY", "true")
+    monkeypatch.setenv("OTEL_SDK_DISABLED", "true")
+    set_session(SimulatedExchange(symbols=50, balance=1e9))
+    yield tmp_path
+    set_session(None)
+
+
+def wait_done(service, job_ids, timeout=120):
+    deadline = time.monotonic() + timeout
+    while any(service.get(job_id)["status"] in ("queued", "running") for job_id in job_ids):
+        assert time.monotonic() < deadline, "jobs did not finish"
+        time.sleep(0.05)
+    return [service.get(job_id) for job_id in job_ids]
+
+
+def test_concurrent_jobs_keep_their_outputs_and_cycle_metrics_apart(offline):
+    from crypt_agent.crew import CryptAgent
+
+    gates = {"researcher": threading.Barrier(2), "reporter": threading.Barrier(2)}
+    scripts = scripted_llms()
+
+    def crew_factory(job_id):
+        agent = CryptAgent(llm_factory=lambda name, model: GatedLLM(name, gates, *scripts[name]),
+                           output_dir=os.path.join("output", "jobs", job_id), label=job_id)
+        return agent.crew()
+
+    service = TriggerService(crew_factory, build_inputs=lambda payload: {"topic": payload, "current_year": "2026"},
+                             max_concurrency=2)
+    job_ids = [service.submit("alert-1"), service.submit("alert-2")]
+
+    jobs = wait_done(service, job_ids)
+
+    assert [job["status"] for job in jobs] == ["done", "done"], jobs
+    for job_id in job_ids:
+        job_dir = offline / "output" / "jobs" / job_id
+        assert json.loads((job_dir / "trade_signal.json").read_text())["orders"]
+        assert (job_dir / "trade_report.md").exists()
+        (line,) = (job_dir / "cycle_metrics.jsonl").read_text().splitlines()
+        cycle = json.loads(line)
+        assert cycle["label"] == job_id
+        # Each job counts its own tool calls only, although both ran at the same time
+        assert cycle["tools"]["execute_multiple_orders"]["calls"] == 1
+        assert cycle["tools"]["scan_market_momentum"]["calls"] == 1
+    assert not (offline / "output" / "trade_signal.json").exists()